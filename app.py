@@ -1,12 +1,16 @@
 import discord
 from discord.ext import commands, tasks
-import requests
+import aiohttp
+import aiohttp.web
 import mysql.connector
 import asyncio
 import os
 from dotenv import load_dotenv
 import pytz
 import random
+import heapq
+import bisect
+from collections import deque
 import qbittorrentapi
 from proxmoxer import ProxmoxAPI
 import subprocess
@@ -14,6 +18,7 @@ import sys
 import zipfile
 import io
 import time
+import datetime
 from pathlib import Path
 import tempfile
 import shutil
@@ -21,6 +26,17 @@ import pymysql
 import json
 import psutil
 import platform
+import threading
+import queue
+import functools
+import traceback
+import uuid
+import hashlib
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 
 # =====================
 # ENV + VALIDATION
@@ -42,9 +58,31 @@ GUILD_IDS = [int(x.strip()) for x in get_env_var("GUILD_IDS").split(",")]
 REQUIRED_ROLE_IDS = [int(x) for x in get_env_var("REQUIRED_ROLE_IDS").split(",")]
 ADMIN_ROLE_IDS = [int(x) for x in get_env_var("ADMIN_ROLE_IDS").split(",")]
 SYNC_LOG_CHANNEL_ID = get_env_var("SYNC_LOG_CHANNEL_ID", int)
+ROLE_REVOCATION_ENABLED = os.getenv("ROLE_REVOCATION_ENABLED", "true").lower() == "true"
+ROLE_REVOCATION_DELAY = int(os.getenv("ROLE_REVOCATION_DELAY", 60))  # Grace seconds before deprovisioning
+CLEANUP_CONCURRENCY = int(os.getenv("CLEANUP_CONCURRENCY", 4))  # Parallel deletes per upstream
+CLEANUP_RETRIES = int(os.getenv("CLEANUP_RETRIES", 3))  # Attempts per deprovisioning step
+PROVISION_WORKERS = int(os.getenv("PROVISION_WORKERS", 4))  # Concurrent account creations
+PROVISION_MAX_ATTEMPTS = int(os.getenv("PROVISION_MAX_ATTEMPTS", 5))
+PROVISION_POLL_SECONDS = float(os.getenv("PROVISION_POLL_SECONDS", 5))
 
 JELLYFIN_URL = get_env_var("JELLYFIN_URL")
 JELLYFIN_API_KEY = get_env_var("JELLYFIN_API_KEY")
+JELLYFIN_DIRECTORY_REFRESH_MINUTES = int(os.getenv("JELLYFIN_DIRECTORY_REFRESH_MINUTES", 15))
+JELLYFIN_DIRECTORY_MIN_REFRESH = int(os.getenv("JELLYFIN_DIRECTORY_MIN_REFRESH", 60))  # Seconds between on-demand refreshes
+STREAMS_POLL_ACTIVE_SECONDS = float(os.getenv("STREAMS_POLL_ACTIVE_SECONDS", 10))  # /Sessions poll interval while something plays
+STREAMS_POLL_IDLE_SECONDS = float(os.getenv("STREAMS_POLL_IDLE_SECONDS", 60))  # ...and while nothing does
+STREAMS_DASHBOARD_MIN_EDIT_SECONDS = float(os.getenv("STREAMS_DASHBOARD_MIN_EDIT_SECONDS", 15))
+LOOP_WATCHDOG = os.getenv("LOOP_WATCHDOG", "false").lower() == "true"
+LOOP_WATCHDOG_THRESHOLD_MS = int(os.getenv("LOOP_WATCHDOG_THRESHOLD_MS", 500))
+LOOP_WATCHDOG_LOG_FILE = os.getenv("LOOP_WATCHDOG_LOG_FILE", "")
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9105))
+STATS_SAMPLE_SECONDS = int(os.getenv("STATS_SAMPLE_SECONDS", 10))
+LIBRARY_CACHE_MODE = os.getenv("LIBRARY_CACHE_MODE", "cache").lower()  # "cache" or "server"
+LIBRARY_CACHE_REFRESH_MINUTES = int(os.getenv("LIBRARY_CACHE_REFRESH_MINUTES", 60))
+LIBRARY_PAGE_SIZE = 1000
 ENABLE_TRIAL_ACCOUNTS = os.getenv("ENABLE_TRIAL_ACCOUNTS", "False").lower() == "true"
 TRIAL_TIME = int(os.getenv("TRIAL_TIME", 24))
 
@@ -66,10 +104,14 @@ ENABLE_SONARR = os.getenv("ENABLE_SONARR", "false").lower() == "true"
 SONARR_URL = os.getenv("SONARR_URL", "").rstrip("/")
 SONARR_API_KEY = os.getenv("SONARR_API_KEY", "")
 
+SERVARR_SYNC_MINUTES = int(os.getenv("SERVARR_SYNC_MINUTES", 5))
+SERVARR_FULL_SYNC_HOURS = int(os.getenv("SERVARR_FULL_SYNC_HOURS", 6))
+
 ENABLE_QBITTORRENT = os.getenv("ENABLE_QBITTORRENT", "False").lower() == "true"
 QBIT_HOST = os.getenv("QBIT_HOST")
 QBIT_USERNAME = os.getenv("QBIT_USERNAME")
 QBIT_PASSWORD = os.getenv("QBIT_PASSWORD")
+QBIT_POLL_SECONDS = float(os.getenv("QBIT_POLL_SECONDS", 5))  # sync/maindata poll interval for qbview and dashboards
 
 ENABLE_PROXMOX = os.getenv("ENABLE_PROXMOX", "False").lower() == "true"
 PROXMOX_HOST = os.getenv("PROXMOX_HOST")
@@ -84,11 +126,26 @@ DB_HOST = get_env_var("DB_HOST")
 DB_USER = get_env_var("DB_USER")
 DB_PASSWORD = get_env_var("DB_PASSWORD")
 DB_NAME = get_env_var("DB_NAME")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # Seconds before a connection is replaced
+DB_POOL_PING_INTERVAL = int(os.getenv("DB_POOL_PING_INTERVAL", 30))  # Idle seconds before a health check
+CLEANUP_LOG_RETENTION_DAYS = int(os.getenv("CLEANUP_LOG_RETENTION_DAYS", 90))  # 0 keeps every row
+MULTI_INSTANCE = os.getenv("MULTI_INSTANCE", "false").lower() == "true"  # Several bots share this database
+LEADER_CHECK_SECONDS = int(os.getenv("LEADER_CHECK_SECONDS", 10))  # How fast a dead leader is replaced
+INSTANCE_ID = uuid.uuid4().hex[:12]  # Identifies this process to the other instances
 
 LOCAL_TZ = pytz.timezone(get_env_var("LOCAL_TZ", str, required=False) or "America/Chicago")
 ENV_FILE = ".env"
 DEFAULT_ENV_FILE = ".env.example"
 BACKUP_DIR = Path("backups")
+BACKUP_STORE_DIR = BACKUP_DIR / "store"  # Content-addressed chunks for incremental backups
+BACKUP_MANIFEST_DIR = BACKUP_DIR / "manifests"
+BACKUP_MODE = os.getenv("BACKUP_MODE", "full").lower()  # "full" zips everything, "incremental" stores changed chunks
+BACKUP_ROWS_PER_INSERT = 500  # Rows per multi-row INSERT in database dumps
+BACKUP_PROGRESS_SECONDS = 5  # Minimum seconds between progress message edits
+BACKUP_MANIFEST_ENTRY = "backup_manifest.json"  # Row counts stored inside full (zip) backups
+RESTORE_COMMIT_ROWS = 10_000  # Rows per restore transaction
 
 BOT_VERSION = "1.1.0"
 VERSION_URL = "https://raw.githubusercontent.com/PenguCCN/Jellycord/main/version.txt"
@@ -96,7 +153,10 @@ RELEASES_URL = "https://github.com/PenguCCN/Jellycord/releases"
 CHANGELOG_URL = "https://raw.githubusercontent.com/PenguCCN/Jellycord/refs/heads/main/CHANGELOG.md"
 
 TRACKING_ENABLED = os.getenv("TRACKING_ENABLED", "False").lower() == "true"
+TRACKING_HEARTBEAT_SECONDS = int(os.getenv("TRACKING_HEARTBEAT_SECONDS", 60))
 PROMETHEUS_URL = "https://prometheus.pengucc.com/api/v1/query"
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 10))  # Default seconds per upstream request
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 8))  # Concurrent connections per upstream
 POST_ENDPOINTS = {
     "botinstance": "https://jellycordstats.pengucc.com/api/instance",
     "jellyseerr": "https://jellycordstats.pengucc.com/api/jellyseerr",
@@ -124,7 +184,14 @@ def log_event(message: str):
 intents = discord.Intents.all()
 intents.members = True
 intents.message_content = True
-bot = commands.Bot(command_prefix=PREFIX, intents=intents, help_command=None)
+
+class JellycordBot(commands.Bot):
+    async def close(self):
+        await close_http_clients()
+        await super().close()
+
+
+bot = JellycordBot(command_prefix=PREFIX, intents=intents, help_command=None)
 
 # =====================
 # QBITTORRENT SETUP
@@ -149,24 +216,445 @@ else:
 
 
 # =====================
-# DATABASE SETUP
+# METRICS
 # =====================
-def init_db():
-    log_event(f"Initiating Database...")
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD
-    )
-    cur = conn.cursor()
-    cur.execute(f"CREATE DATABASE IF NOT EXISTS `{DB_NAME}`")
-    conn.commit()
-    cur.close()
-    conn.close()
+# Minimal Prometheus text-format metrics for the bot itself. Served on
+# METRICS_HOST:METRICS_PORT/metrics when METRICS_ENABLED is set; recording is
+# cheap enough to stay on either way. DB helpers record from executor threads.
 
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for n, v in zip(names, values)
     )
-    cur = conn.cursor()
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        METRICS_REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time, or set directly."""
+
+    def __init__(self, name: str, help_text: str, callback=None):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.value = 0.0
+        METRICS_REGISTRY.append(self)
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self) -> list[str]:
+        value = self.callback() if self.callback else self.value
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        METRICS_REGISTRY.append(self)
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, series in self._series.items():
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+METRICS_REGISTRY: list = []
+
+COMMAND_INVOCATIONS = Counter(
+    "jellycord_command_invocations_total", "Commands invoked, by command and outcome", ("command", "status")
+)
+COMMAND_LATENCY = Histogram(
+    "jellycord_command_duration_seconds", "Command handler latency", ("command",)
+)
+UPSTREAM_REQUESTS = Counter(
+    "jellycord_upstream_requests_total", "Upstream requests, by service and status class", ("upstream", "status")
+)
+UPSTREAM_LATENCY = Histogram(
+    "jellycord_upstream_request_duration_seconds", "Upstream request latency", ("upstream",)
+)
+DB_QUERY_LATENCY = Histogram(
+    "jellycord_db_query_duration_seconds", "Database statement latency, by statement type", ("statement",)
+)
+CLEANUP_DURATION = Histogram(
+    "jellycord_cleanup_duration_seconds", "Account cleanup run duration",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+ACCOUNTS_REMOVED = Counter(
+    "jellycord_accounts_removed_total", "Accounts deprovisioned, by trigger", ("trigger",)
+)
+EVENT_LOOP_LAG = Histogram(
+    "jellycord_event_loop_lag_seconds", "Delay between a scheduled loop wakeup and when it ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+EVENT_LOOP_LAG_LAST = Gauge("jellycord_event_loop_lag_last_seconds", "Most recent event loop lag sample")
+LEADER_STATUS = Gauge("jellycord_leader", "1 while this instance runs the singleton background jobs")
+
+
+def _status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+@contextmanager
+def observe_upstream(name: str):
+    """Time a call to an upstream that isn't made through UpstreamClient (SDK clients)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_REQUESTS.inc(name, "error")
+        raise
+    else:
+        UPSTREAM_REQUESTS.inc(name, "ok")
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, name)
+
+
+async def call_upstream(name: str, func, *args, **kwargs):
+    """Run a blocking SDK call (qBittorrent, Proxmox) in a thread and record it."""
+    with observe_upstream(name):
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS_REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+_metrics_runner: aiohttp.web.AppRunner | None = None
+
+
+async def start_metrics_server():
+    """Serve /metrics for Prometheus to scrape (no-op unless METRICS_ENABLED)."""
+    global _metrics_runner
+    if not METRICS_ENABLED or _metrics_runner is not None:
+        return
+
+    async def handle_metrics(request):
+        return aiohttp.web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+    app = aiohttp.web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    _metrics_runner = aiohttp.web.AppRunner(app, access_log=None)
+    await _metrics_runner.setup()
+    await aiohttp.web.TCPSite(_metrics_runner, METRICS_HOST, METRICS_PORT).start()
+    print(f"📈 Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+
+async def monitor_event_loop_lag(interval: float = 1.0):
+    """Sleep `interval` repeatedly; any extra delay is time the loop spent blocked."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        EVENT_LOOP_LAG.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
+
+
+# =====================
+# LOOP WATCHDOG
+# =====================
+# Opt-in (LOOP_WATCHDOG=true). A background thread pings the event loop; when a
+# ping goes unanswered for longer than the threshold, the loop thread's stack is
+# captured along with whatever commands were running, and reported once the
+# loop recovers.
+
+_active_commands: dict[int, tuple[str, str, float]] = {}  # id(ctx) -> (command, author, started)
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float, log_file: str = "", interval: float = 0.1, report_cooldown: int = 60):
+        self.threshold = threshold
+        self.log_file = log_file
+        self.interval = interval
+        self.report_cooldown = report_cooldown
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._thread: threading.Thread | None = None
+        self._last_channel_report = 0.0
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        if self._thread is not None:
+            return
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()  # called from the loop thread
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        print(f"🐶 Event loop watchdog enabled (threshold {self.threshold * 1000:.0f} ms)")
+
+    def _watch(self):
+        while True:
+            answered = threading.Event()
+            sent = time.monotonic()
+            self._loop.call_soon_threadsafe(answered.set)
+            if answered.wait(self.threshold):
+                time.sleep(self.interval)
+                continue
+
+            # The loop is stuck: grab what it is doing right now
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<stack unavailable>"
+            commands_running = list(_active_commands.values())
+            answered.wait()
+            self._report(time.monotonic() - sent, stack, commands_running)
+
+    def _report(self, stalled: float, stack: str, commands_running: list):
+        now = time.time()
+        if commands_running:
+            running = ", ".join(f"{PREFIX}{name} by {author} ({now - started:.1f}s)" for name, author, started in commands_running)
+        else:
+            running = "no command running"
+        header = f"[Watchdog] Event loop blocked for {stalled * 1000:.0f} ms — {running}"
+        print(header)
+
+        if self.log_file:
+            try:
+                with open(self.log_file, "a", encoding="utf-8") as f:
+                    f.write(f"{datetime.datetime.now().isoformat()} {header}\n{stack}\n")
+            except OSError as e:
+                print(f"[Watchdog] Failed to write {self.log_file}: {e}")
+            return
+
+        if now - self._last_channel_report < self.report_cooldown:
+            return
+        self._last_channel_report = now
+        # Keep the tail: the innermost frames are the ones doing the blocking
+        msg = f"🐢 {header}\n```\n{stack[-1500:]}\n```"
+        asyncio.run_coroutine_threadsafe(self._send(msg), self._loop)
+
+    @staticmethod
+    async def _send(msg: str):
+        log_channel = bot.get_channel(SYNC_LOG_CHANNEL_ID)
+        if log_channel:
+            try:
+                await log_channel.send(msg)
+            except Exception as e:
+                print(f"[Watchdog] Failed to send report: {e}")
+
+
+loop_watchdog = LoopWatchdog(LOOP_WATCHDOG_THRESHOLD_MS / 1000, LOOP_WATCHDOG_LOG_FILE)
+
+
+# =====================
+# DATABASE SETUP
+# =====================
+class DatabasePool:
+    """Bounded pool of MySQL connections shared by every DB helper."""
+
+    def __init__(self, size: int, timeout: float, recycle: int, ping_interval: int):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self._idle = queue.LifoQueue()  # (conn, created_at, last_used)
+        self._slots = threading.BoundedSemaphore(size)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "created": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "in_use": 0,
+        }
+
+    def _bump(self, key: str, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
 
+    def _connect(self):
+        conn = mysql.connector.connect(
+            host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME, autocommit=True
+        )
+        self._bump("created")
+        return conn
+
+    def _checkout(self):
+        """Return a healthy (conn, created_at) pair, reusing an idle connection when possible."""
+        try:
+            conn, created_at, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect(), time.monotonic()
+
+        now = time.monotonic()
+        if now - created_at > self.recycle:
+            self._close(conn)
+            return self._connect(), time.monotonic()
+
+        if now - last_used > self.ping_interval:
+            try:
+                conn.ping(reconnect=True, attempts=2, delay=0)
+            except mysql.connector.Error:
+                self._close(conn)
+                self._bump("reconnects")
+                return self._connect(), time.monotonic()
+        return conn, created_at
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._bump("discarded")
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a `with` block."""
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._bump("timeouts")
+            raise mysql.connector.errors.PoolError(
+                f"No database connection available after {self.timeout}s (pool size {self.size})"
+            )
+        waited = time.monotonic() - start
+        with self._stats_lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["wait_total"] += waited
+            self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+
+        try:
+            conn, created_at = self._checkout()
+        except Exception:
+            self._bump("in_use", -1)
+            self._slots.release()
+            raise
+
+        healthy = True
+        try:
+            yield conn
+        except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+            healthy = False
+            raise
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                healthy = False
+            raise
+        finally:
+            if healthy:
+                self._idle.put((conn, created_at, time.monotonic()))
+            else:
+                self._close(conn)
+            self._bump("in_use", -1)
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Snapshot of checkout counts and wait times."""
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        checkouts = snapshot["checkouts"]
+        snapshot["wait_avg"] = snapshot["wait_total"] / checkouts if checkouts else 0.0
+        snapshot["idle"] = self._idle.qsize()
+        snapshot["size"] = self.size
+        return snapshot
+
+
+db_pool = DatabasePool(DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PING_INTERVAL)
+
+
+def db_execute(query: str, params=(), fetch: str | None = None, many: bool = False, dictionary: bool = False):
+    """
+    Run a single statement on a pooled connection.
+    fetch="one" / "all" returns rows, otherwise the affected row count.
+    """
+    statement = query.lstrip().split(None, 1)[0].upper()
+    with db_pool.connection() as conn, DB_QUERY_LATENCY.time(statement):
+        cur = conn.cursor(dictionary=dictionary)
+        try:
+            if many:
+                cur.executemany(query, params)
+            else:
+                cur.execute(query, params)
+            if fetch == "one":
+                return cur.fetchone()
+            if fetch == "all":
+                return cur.fetchall()
+            return cur.rowcount
+        finally:
+            cur.close()
+
+
+# =====================
+# DATABASE MIGRATIONS
+# =====================
+# Each migration runs once; the applied version is stored in bot_metadata as
+# `schema_version`. Steps are written to be safe to re-run if one fails midway.
+
+def _column_exists(cur, table: str, column: str) -> bool:
+    cur.execute(f"SHOW COLUMNS FROM `{table}` LIKE %s", (column,))
+    return cur.fetchone() is not None
+
+
+def _index_exists(cur, table: str, index: str) -> bool:
+    cur.execute(f"SHOW INDEX FROM `{table}` WHERE Key_name = %s", (index,))
+    return bool(cur.fetchall())
+
+
+def _migrate_base_tables(cur):
     # Normal accounts table
     cur.execute("""
         CREATE TABLE IF NOT EXISTS accounts (
@@ -177,18 +665,6 @@ def init_db():
         )
     """)
 
-    # Ensure jellyfin_id exists
-    cur.execute("SHOW COLUMNS FROM accounts LIKE 'jellyfin_id'")
-    if cur.fetchone() is None:
-        cur.execute("ALTER TABLE accounts ADD COLUMN jellyfin_id VARCHAR(255) NOT NULL")
-        print("[DB] Added missing column 'jellyfin_id' to accounts table.")
-
-    # Ensure jellyseerr_id exists
-    cur.execute("SHOW COLUMNS FROM accounts LIKE 'jellyseerr_id'")
-    if cur.fetchone() is None:
-        cur.execute("ALTER TABLE accounts ADD COLUMN jellyseerr_id VARCHAR(255) DEFAULT NULL")
-        print("[DB] Added missing column 'jellyseerr_id' to accounts table.")
-
     # Trial accounts table (persistent history, one-time only)
     cur.execute("""
         CREATE TABLE IF NOT EXISTS trial_accounts (
@@ -200,13 +676,6 @@ def init_db():
             expired BOOLEAN DEFAULT 0
         )
     """)
-    
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS bot_metadata (
-            key_name VARCHAR(255) PRIMARY KEY,
-            value VARCHAR(255) NOT NULL
-        )
-    """)
 
     # Cleanup logs table
     cur.execute("""
@@ -216,207 +685,1315 @@ def init_db():
         )
     """)
 
-    conn.commit()
-    cur.close()
-    conn.close()
 
+def _migrate_account_columns(cur):
+    # Installs created before these columns existed
+    if not _column_exists(cur, "accounts", "jellyfin_id"):
+        cur.execute("ALTER TABLE accounts ADD COLUMN jellyfin_id VARCHAR(255) NOT NULL")
+        print("[DB] Added missing column 'jellyfin_id' to accounts table.")
 
-def add_account(discord_id, username, jf_id, js_id=None):
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
-    )
-    cur = conn.cursor()
-    cur.execute(
-        "REPLACE INTO accounts (discord_id, jellyfin_username, jellyfin_id, jellyseerr_id) VALUES (%s, %s, %s, %s)",
-        (discord_id, username, jf_id, js_id)
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    if not _column_exists(cur, "accounts", "jellyseerr_id"):
+        cur.execute("ALTER TABLE accounts ADD COLUMN jellyseerr_id VARCHAR(255) DEFAULT NULL")
+        print("[DB] Added missing column 'jellyseerr_id' to accounts table.")
 
-def init_trial_accounts_table():
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
-    )
-    cur = conn.cursor()
-    # Persistent trial accounts table
+
+def _migrate_trial_expiry_index(cur):
+    if not _index_exists(cur, "trial_accounts", "idx_trial_expiry"):
+        cur.execute("CREATE INDEX idx_trial_expiry ON trial_accounts (expired, trial_created_at)")
+
+
+def _create_unique_jellyfin_username_index(cur):
+    """Refuse to continue while two Discord users are linked to the same Jellyfin username."""
+    if _index_exists(cur, "accounts", "uq_jellyfin_username"):
+        return
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS trial_accounts (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            discord_id BIGINT NOT NULL UNIQUE,
+        SELECT discord_id, jellyfin_username FROM accounts
+        WHERE jellyfin_username IN (
+            SELECT jellyfin_username FROM (
+                SELECT jellyfin_username FROM accounts
+                GROUP BY jellyfin_username HAVING COUNT(*) > 1
+            ) AS duplicates
+        )
+        ORDER BY jellyfin_username, discord_id
+    """)
+    duplicates = cur.fetchall()
+    if duplicates:
+        rows = "\n".join(f"  {username}: Discord ID {discord_id}" for discord_id, username in duplicates)
+        raise RuntimeError(
+            "Cannot add the unique index on accounts.jellyfin_username; these Jellyfin usernames are "
+            f"linked to more than one Discord user:\n{rows}\n"
+            "Delete the stale rows from the accounts table, then restart the bot to finish the migration."
+        )
+    cur.execute("CREATE UNIQUE INDEX uq_jellyfin_username ON accounts (jellyfin_username)")
+
+
+def _migrate_account_indexes(cur):
+    _create_unique_jellyfin_username_index(cur)
+
+    if not _index_exists(cur, "accounts", "idx_jellyfin_id"):
+        cur.execute("CREATE INDEX idx_jellyfin_id ON accounts (jellyfin_id)")
+
+
+def _migrate_cleanup_logs_index(cur):
+    if not _index_exists(cur, "cleanup_logs", "idx_cleanup_run_at"):
+        cur.execute("CREATE INDEX idx_cleanup_run_at ON cleanup_logs (run_at)")
+
+
+def _migrate_provisioning_jobs(cur):
+    # active_* are set while a job is pending/running and cleared when it finishes, so the
+    # unique keys allow one in-flight job per Discord user and per username
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS provisioning_jobs (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            kind VARCHAR(16) NOT NULL,
+            discord_id BIGINT NOT NULL,
             jellyfin_username VARCHAR(255) NOT NULL,
-            jellyfin_id VARCHAR(255) NOT NULL,
-            trial_created_at DATETIME NOT NULL,
-            expired BOOLEAN DEFAULT 0
+            status VARCHAR(16) NOT NULL DEFAULT 'pending',
+            jellyfin_id VARCHAR(255) DEFAULT NULL,
+            jellyseerr_id VARCHAR(255) DEFAULT NULL,
+            attempts INT NOT NULL DEFAULT 0,
+            next_attempt_at DATETIME NOT NULL,
+            claimed_by VARCHAR(96) DEFAULT NULL,
+            claimed_at DATETIME DEFAULT NULL,
+            last_error TEXT,
+            active_discord_id BIGINT DEFAULT NULL,
+            active_username VARCHAR(255) DEFAULT NULL,
+            created_at DATETIME NOT NULL,
+            finished_at DATETIME DEFAULT NULL,
+            UNIQUE KEY uq_provisioning_active_discord (active_discord_id),
+            UNIQUE KEY uq_provisioning_active_username (active_username),
+            KEY idx_provisioning_claim (status, next_attempt_at),
+            KEY idx_provisioning_claimed_by (claimed_by)
         )
     """)
-    conn.commit()
-    cur.close()
-    conn.close()
 
 
-def get_accounts():
+def _migrate_metadata_text(cur):
+    # The JFA-Go token is shared through bot_metadata and can be longer than 255 characters
+    cur.execute("ALTER TABLE bot_metadata MODIFY value TEXT NOT NULL")
+
+
+def _migrate_multi_instance(cur):
+    # Only the instance that took the command holds the password for a new job
+    if not _column_exists(cur, "provisioning_jobs", "submitted_by"):
+        cur.execute("ALTER TABLE provisioning_jobs ADD COLUMN submitted_by VARCHAR(32) DEFAULT NULL")
+
+    # The first instance to claim a message answers it
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS command_claims (
+            message_id BIGINT PRIMARY KEY,
+            instance_id VARCHAR(32) NOT NULL,
+            claimed_at DATETIME NOT NULL,
+            KEY idx_command_claims_time (claimed_at)
+        )
+    """)
+
+
+def _migrate_provisioning_create_marker(cur):
+    # Set before the Jellyfin POST so a retry can tell "our user" from "name already taken"
+    if not _column_exists(cur, "provisioning_jobs", "create_attempted"):
+        cur.execute("ALTER TABLE provisioning_jobs ADD COLUMN create_attempted BOOLEAN NOT NULL DEFAULT FALSE")
+
+
+def _migrate_enforce_unique_jellyfin_username(cur):
+    # Databases that went through migration 4 with duplicates only got a non-unique index
+    _create_unique_jellyfin_username_index(cur)
+    if _index_exists(cur, "accounts", "idx_jellyfin_username"):
+        cur.execute("DROP INDEX idx_jellyfin_username ON accounts")
+
+
+MIGRATIONS = [
+    (1, "Create base tables", _migrate_base_tables),
+    (2, "Add jellyfin_id / jellyseerr_id to accounts", _migrate_account_columns),
+    (3, "Index trial expiry lookups", _migrate_trial_expiry_index),
+    (4, "Index accounts by Jellyfin username and ID", _migrate_account_indexes),
+    (5, "Index cleanup_logs by run time", _migrate_cleanup_logs_index),
+    (6, "Create provisioning_jobs queue", _migrate_provisioning_jobs),
+    (7, "Store bot_metadata values as TEXT", _migrate_metadata_text),
+    (8, "Track instances on provisioning jobs and commands", _migrate_multi_instance),
+    (9, "Mark provisioning jobs that attempted a Jellyfin create", _migrate_provisioning_create_marker),
+    (10, "Enforce unique Jellyfin usernames on accounts", _migrate_enforce_unique_jellyfin_username),
+]
+
+
+def run_migrations(cur):
+    """Apply pending migrations in order, holding a named lock so only one instance migrates."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS bot_metadata (
+            key_name VARCHAR(255) PRIMARY KEY,
+            value VARCHAR(255) NOT NULL
+        )
+    """)
+
+    cur.execute("SELECT GET_LOCK('jellycord_migrations', 60)")
+    if cur.fetchone()[0] != 1:
+        raise RuntimeError("Timed out waiting for the migration lock")
+    try:
+        cur.execute("SELECT value FROM bot_metadata WHERE key_name='schema_version'")
+        row = cur.fetchone()
+        current = int(row[0]) if row else 0
+
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            print(f"[DB] Applying migration {version}: {description}")
+            migrate(cur)
+            cur.execute(
+                "REPLACE INTO bot_metadata (key_name, value) VALUES ('schema_version', %s)",
+                (str(version),)
+            )
+    finally:
+        cur.execute("SELECT RELEASE_LOCK('jellycord_migrations')")
+        cur.fetchone()
+
+
+_db_initialized = False
+
+
+def init_db():
+    """Create the database and bring the schema up to date. Runs once per process."""
+    global _db_initialized
+    if _db_initialized:
+        return
+
+    log_event(f"Initiating Database...")
     conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
+        host=DB_HOST, user=DB_USER, password=DB_PASSWORD
     )
     cur = conn.cursor()
-    cur.execute("SELECT discord_id, jellyfin_username, jellyfin_id, jellyseerr_id FROM accounts")
-    rows = cur.fetchall()
+    cur.execute(f"CREATE DATABASE IF NOT EXISTS `{DB_NAME}`")
+    conn.commit()
     cur.close()
     conn.close()
-    return rows
 
+    with db_pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            run_migrations(cur)
+        finally:
+            cur.close()
+
+    _db_initialized = True
 
-def get_account_by_jellyfin(username):
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
+
+def add_account(discord_id, username, jf_id, js_id=None):
+    db_execute(
+        "REPLACE INTO accounts (discord_id, jellyfin_username, jellyfin_id, jellyseerr_id) VALUES (%s, %s, %s, %s)",
+        (discord_id, username, jf_id, js_id)
     )
-    cur = conn.cursor()
-    cur.execute("SELECT discord_id, jellyfin_id, jellyseerr_id FROM accounts WHERE jellyfin_username=%s", (username,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-    return row  # (discord_id, jf_id, js_id)
+
+def get_accounts():
+    return db_execute(
+        "SELECT discord_id, jellyfin_username, jellyfin_id, jellyseerr_id FROM accounts",
+        fetch="all"
+    )
+
+
+def get_account_by_jellyfin(username):
+    return db_execute(
+        "SELECT discord_id, jellyfin_id, jellyseerr_id FROM accounts WHERE jellyfin_username=%s",
+        (username,),
+        fetch="one"
+    )  # (discord_id, jf_id, js_id)
 
 
 def get_account_by_discord(discord_id):
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
-    )
-    cur = conn.cursor()
-    cur.execute(
+    return db_execute(
         "SELECT jellyfin_username, jellyfin_id, jellyseerr_id FROM accounts WHERE discord_id=%s",
-        (discord_id,)
-    )
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-    return row  # (jellyfin_username, jf_id, js_id)
+        (discord_id,),
+        fetch="one"
+    )  # (jellyfin_username, jf_id, js_id)
 
 
 def delete_account(discord_id):
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
+    db_execute("DELETE FROM accounts WHERE discord_id=%s", (discord_id,))
+
+
+def delete_accounts(discord_ids, batch_size=500):
+    """Delete many accounts with batched `DELETE ... WHERE discord_id IN (...)` statements."""
+    discord_ids = list(discord_ids)
+    for i in range(0, len(discord_ids), batch_size):
+        batch = discord_ids[i:i + batch_size]
+        placeholders = ", ".join(["%s"] * len(batch))
+        db_execute(f"DELETE FROM accounts WHERE discord_id IN ({placeholders})", tuple(batch))
+    return True
+
+
+def get_accounts_missing_jellyseerr():
+    return db_execute(
+        "SELECT discord_id, jellyfin_id FROM accounts WHERE jellyseerr_id IS NULL AND jellyfin_id IS NOT NULL",
+        fetch="all"
     )
-    cur = conn.cursor()
-    cur.execute("DELETE FROM accounts WHERE discord_id=%s", (discord_id,))
-    conn.commit()
-    cur.close()
-    conn.close()
 
-# =====================
-# JELLYFIN HELPERS
-# =====================
 
-def create_jellyfin_user(username, password):
-    headers = {"X-Emby-Token": JELLYFIN_API_KEY}
-    data = {"Name": username, "Password": password}
-    r = requests.post(f"{JELLYFIN_URL}/Users/New", json=data, headers=headers)
-    return r.status_code == 200
+def set_jellyseerr_ids(pairs):
+    """Store Jellyseerr ids for many accounts at once; `pairs` is [(discord_id, jellyseerr_id)]."""
+    if not pairs:
+        return 0
+    return db_execute(
+        "UPDATE accounts SET jellyseerr_id=%s WHERE discord_id=%s",
+        [(js_id, discord_id) for discord_id, js_id in pairs],
+        many=True
+    )
 
-def get_jellyfin_user(username):
-    headers = {"X-Emby-Token": JELLYFIN_API_KEY}
-    r = requests.get(f"{JELLYFIN_URL}/Users", headers=headers)
-    if r.status_code == 200:
-        for u in r.json():
-            if u["Name"].lower() == username.lower():
-                return u["Id"]
-    return None
-
-def delete_jellyfin_user(username):
-    headers = {"X-Emby-Token": JELLYFIN_API_KEY}
-    user_id = get_jellyfin_user(username)
-    if user_id:
-        r = requests.delete(f"{JELLYFIN_URL}/Users/{user_id}", headers=headers)
-        return r.status_code in (200, 204)
-    return True
 
-def reset_jellyfin_password(username: str, new_password: str) -> bool:
-    user_id = get_jellyfin_user(username)
-    if not user_id:
-        return False
-    headers = {"X-Emby-Token": JELLYFIN_API_KEY}
-    data = {"Password": new_password}
-    response = requests.post(f"{JELLYFIN_URL}/Users/{user_id}/Password", headers=headers, json=data)
-    return response.status_code in (200, 204)
+def get_trial_account(discord_id):
+    return db_execute("SELECT * FROM trial_accounts WHERE discord_id=%s", (discord_id,), fetch="one")
 
-def create_trial_jellyfin_user(username, password):
-    payload = {
-        "Name": username,
-        "Password": password,
-        "Policy": {
-            "EnableDownloads": False,
-            "EnableSyncTranscoding": False,
-            "EnableRemoteControlOfOtherUsers": False,
-            "EnableLiveTvAccess": False,
+
+def add_trial_account(discord_id, username, jf_id):
+    """Insert the trial and return its stored trial_created_at, the database-clock value reload() schedules from."""
+    db_execute("""
+        INSERT INTO trial_accounts (discord_id, jellyfin_username, jellyfin_id, trial_created_at, expired)
+        VALUES (%s, %s, %s, NOW(), 0)
+    """, (discord_id, username, jf_id))
+    row = db_execute("SELECT trial_created_at FROM trial_accounts WHERE discord_id=%s", (discord_id,), fetch="one")
+    return row[0] if row else None
+
+
+def get_active_trials():
+    # Served by idx_trial_expiry (expired, trial_created_at)
+    return db_execute(
+        "SELECT discord_id, jellyfin_username, trial_created_at FROM trial_accounts "
+        "WHERE expired=0 ORDER BY trial_created_at",
+        fetch="all",
+        dictionary=True
+    )
+
+
+def mark_trial_expired(discord_id):
+    db_execute("UPDATE trial_accounts SET expired=1 WHERE discord_id=%s", (discord_id,))
+
+
+def add_cleanup_log(run_at):
+    db_execute("INSERT INTO cleanup_logs (run_at) VALUES (%s)", (run_at,))
+
+
+def prune_cleanup_logs(retention_days: int):
+    """Drop cleanup_logs rows older than the retention window (0 keeps everything)."""
+    if retention_days <= 0:
+        return 0
+    return db_execute(
+        "DELETE FROM cleanup_logs WHERE run_at < NOW() - INTERVAL %s DAY",
+        (retention_days,)
+    )
+
+# --- provisioning_jobs ---
+
+PROVISIONING_JOB_FIELDS = ("status", "jellyfin_id", "jellyseerr_id", "create_attempted", "attempts", "last_error")
+
+
+def enqueue_provisioning_job(kind, discord_id, username, instance_id=INSTANCE_ID):
+    """Insert a pending job. Returns its id, or None if the user or username already has one in flight."""
+    with db_pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                INSERT INTO provisioning_jobs
+                    (kind, discord_id, jellyfin_username, status, next_attempt_at,
+                     active_discord_id, active_username, submitted_by, created_at)
+                VALUES (%s, %s, %s, 'pending', NOW(), %s, %s, %s, NOW())
+            """, (kind, discord_id, username, discord_id, username.lower(), instance_id))
+            return cur.lastrowid
+        except mysql.connector.errors.IntegrityError:
+            return None
+        finally:
+            cur.close()
+
+
+def claim_provisioning_job(worker_token, instance_id=INSTANCE_ID):
+    """
+    Atomically take the oldest due job for this worker; returns the row as a dict or None.
+    Jobs still waiting for their Jellyfin user can only be claimed by the instance holding the password.
+    """
+    claimed = db_execute("""
+        UPDATE provisioning_jobs SET status='running', claimed_by=%s, claimed_at=NOW()
+        WHERE status='pending' AND next_attempt_at <= NOW()
+          AND (jellyfin_id IS NOT NULL OR submitted_by=%s)
+        ORDER BY id LIMIT 1
+    """, (worker_token, instance_id))
+    if not claimed:
+        return None
+    return db_execute(
+        "SELECT * FROM provisioning_jobs WHERE claimed_by=%s AND status='running'",
+        (worker_token,),
+        fetch="one",
+        dictionary=True
+    )
+
+
+def update_provisioning_job(job_id, **fields):
+    """Persist step results (jellyfin_id, jellyseerr_id, ...) as soon as each step succeeds."""
+    unknown = set(fields) - set(PROVISIONING_JOB_FIELDS)
+    if unknown:
+        # Column names go into the SQL text, so only known ones may pass
+        raise ValueError(f"Unknown provisioning_jobs field(s): {', '.join(sorted(unknown))}")
+    assignments = ", ".join(f"{name}=%s" for name in fields)
+    db_execute(f"UPDATE provisioning_jobs SET {assignments} WHERE id=%s", (*fields.values(), job_id))
+
+
+def retry_provisioning_job(job_id, attempts, delay_seconds, error):
+    db_execute("""
+        UPDATE provisioning_jobs
+        SET status='pending', attempts=%s, last_error=%s, claimed_by=NULL,
+            next_attempt_at=NOW() + INTERVAL %s SECOND
+        WHERE id=%s
+    """, (attempts, error, delay_seconds, job_id))
+
+
+def finish_provisioning_job(job_id, status, error=None):
+    """Mark a job done/failed and release its in-flight username and Discord user."""
+    db_execute("""
+        UPDATE provisioning_jobs
+        SET status=%s, last_error=%s, finished_at=NOW(), claimed_by=NULL,
+            active_discord_id=NULL, active_username=NULL
+        WHERE id=%s
+    """, (status, error, job_id))
+
+
+def get_unfinished_provisioning_jobs():
+    return db_execute(
+        "SELECT * FROM provisioning_jobs WHERE status IN ('pending', 'running') ORDER BY id",
+        fetch="all",
+        dictionary=True
+    )
+
+
+def requeue_provisioning_job(job_id):
+    db_execute(
+        "UPDATE provisioning_jobs SET status='pending', claimed_by=NULL, next_attempt_at=NOW() WHERE id=%s",
+        (job_id,)
+    )
+
+
+def count_unfinished_provisioning_jobs():
+    row = db_execute(
+        "SELECT COUNT(*) FROM provisioning_jobs WHERE status IN ('pending', 'running')", fetch="one"
+    )
+    return row[0] if row else 0
+
+
+def prune_provisioning_jobs(retention_days: int):
+    if retention_days <= 0:
+        return 0
+    return db_execute(
+        "DELETE FROM provisioning_jobs WHERE status IN ('done', 'failed') AND finished_at < NOW() - INTERVAL %s DAY",
+        (retention_days,)
+    )
+
+# --- instances ---
+
+def instance_lock_name(instance_id) -> str:
+    return f"jellycord_instance_{instance_id}"
+
+
+def instance_alive(instance_id) -> bool:
+    """Every running instance holds a named lock on its election connection."""
+    if not instance_id:
+        return False
+    row = db_execute("SELECT IS_USED_LOCK(%s)", (instance_lock_name(instance_id),), fetch="one")
+    return bool(row and row[0] is not None)
+
+
+def claim_message(message_id, instance_id=INSTANCE_ID) -> bool:
+    """True if this instance is the first to claim the message."""
+    return db_execute(
+        "INSERT IGNORE INTO command_claims (message_id, instance_id, claimed_at) VALUES (%s, %s, NOW())",
+        (message_id, instance_id)
+    ) == 1
+
+
+def prune_command_claims(max_age_hours: int = 24):
+    return db_execute("DELETE FROM command_claims WHERE claimed_at < NOW() - INTERVAL %s HOUR", (max_age_hours,))
+
+# =====================
+# ASYNC DATA ACCESS
+# =====================
+# Blocking MySQL calls run on a dedicated executor sized to the pool, so a slow
+# query never stalls gateway heartbeats. The sync helpers above stay usable from scripts.
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="jellycord-db")
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking DB helper on the DB executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(DB_EXECUTOR, functools.partial(func, *args, **kwargs))
+
+# --- accounts ---
+
+async def async_add_account(discord_id, username, jf_id, js_id=None):
+    return await run_db(add_account, discord_id, username, jf_id, js_id)
+
+async def async_get_accounts():
+    return await run_db(get_accounts)
+
+async def async_get_account_by_jellyfin(username):
+    return await run_db(get_account_by_jellyfin, username)
+
+async def async_get_account_by_discord(discord_id):
+    return await run_db(get_account_by_discord, discord_id)
+
+async def async_delete_account(discord_id):
+    return await run_db(delete_account, discord_id)
+
+async def async_delete_accounts(discord_ids):
+    return await run_db(delete_accounts, discord_ids)
+
+async def async_get_accounts_missing_jellyseerr():
+    return await run_db(get_accounts_missing_jellyseerr)
+
+async def async_set_jellyseerr_ids(pairs):
+    return await run_db(set_jellyseerr_ids, pairs)
+
+# --- trial_accounts ---
+
+async def async_get_trial_account(discord_id):
+    return await run_db(get_trial_account, discord_id)
+
+async def async_add_trial_account(discord_id, username, jf_id):
+    return await run_db(add_trial_account, discord_id, username, jf_id)
+
+async def async_get_active_trials():
+    return await run_db(get_active_trials)
+
+async def async_mark_trial_expired(discord_id):
+    return await run_db(mark_trial_expired, discord_id)
+
+# --- bot_metadata ---
+
+async def async_set_metadata(key, value):
+    return await run_db(set_metadata, key, value)
+
+async def async_get_metadata(key):
+    return await run_db(get_metadata, key)
+
+# --- provisioning_jobs ---
+
+async def async_enqueue_provisioning_job(kind, discord_id, username):
+    return await run_db(enqueue_provisioning_job, kind, discord_id, username)
+
+async def async_update_provisioning_job(job_id, **fields):
+    return await run_db(update_provisioning_job, job_id, **fields)
+
+async def async_finish_provisioning_job(job_id, status, error=None):
+    return await run_db(finish_provisioning_job, job_id, status, error)
+
+# --- cleanup_logs ---
+
+async def async_add_cleanup_log(run_at):
+    return await run_db(add_cleanup_log, run_at)
+
+async def async_prune_cleanup_logs(retention_days):
+    return await run_db(prune_cleanup_logs, retention_days)
+
+
+# =====================
+# LEADER ELECTION
+# =====================
+# With MULTI_INSTANCE=true several bots can share one database. Every instance
+# serves commands (the first to claim a message answers it), but only the leader
+# runs the singleton jobs: cleanup, trial expiry, role revocations, JFA-Go token
+# refresh, update checks and tracking. Leadership is a MySQL named lock held on a
+# dedicated connection, so it is released as soon as the leader dies and another
+# instance takes over within LEADER_CHECK_SECONDS. The same connection holds a
+# per-instance lock that lets the leader tell live instances from dead ones.
+
+LEADER_LOCK = "jellycord_leader"
+
+
+class LeaderElection:
+    def __init__(self, enabled: bool, interval: int, instance_id: str = INSTANCE_ID):
+        self.enabled = enabled
+        self.interval = interval
+        self.instance_id = instance_id
+        self.is_leader = False
+        self._conn = None
+        self._task: asyncio.Task | None = None
+        self._on_change = None
+
+    def _scalar(self, query: str, params=()):
+        cur = self._conn.cursor()
+        try:
+            cur.execute(query, params)
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
+    def _connect(self):
+        self._close()
+        self._conn = mysql.connector.connect(
+            host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME, autocommit=True
+        )
+        if self._scalar("SELECT GET_LOCK(%s, 0)", (instance_lock_name(self.instance_id),)) != 1:
+            raise RuntimeError(f"Instance lock for {self.instance_id} is already held")
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _check(self) -> bool:
+        """Runs in a thread: reconnect if needed and return whether this instance holds the leader lock."""
+        try:
+            if self._conn is None or not self._conn.is_connected():
+                # Named locks die with their connection, so a new one starts from scratch
+                self._connect()
+            elif self.is_leader:
+                return self._scalar("SELECT IS_USED_LOCK(%s) = CONNECTION_ID()", (LEADER_LOCK,)) == 1
+            return self._scalar("SELECT GET_LOCK(%s, 0)", (LEADER_LOCK,)) == 1
+        except Exception as e:
+            print(f"[Leader] Election check failed: {e}")
+            self._close()
+            return False
+
+    async def start(self, on_change):
+        """Join the election; `on_change(is_leader)` runs on every transition. Without MULTI_INSTANCE this instance always leads."""
+        if self._on_change is not None:
+            return
+        self._on_change = on_change
+        if not self.enabled:
+            await self._set(True)
+            return
+        await self._set(await asyncio.to_thread(self._check))
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._set(await asyncio.to_thread(self._check))
+            except Exception as e:
+                print(f"[Leader] Failed to update leadership: {e}")
+
+    async def _set(self, leader: bool):
+        if leader == self.is_leader:
+            return
+        self.is_leader = leader
+        LEADER_STATUS.set(1 if leader else 0)
+        if self.enabled:
+            log_event(f"[Leader] Instance {self.instance_id} ({platform.node()}) is now {'the leader' if leader else 'a follower'}")
+        await self._on_change(leader)
+
+
+leader_election = LeaderElection(MULTI_INSTANCE, LEADER_CHECK_SECONDS)
+
+
+# =====================
+# HTTP CLIENTS
+# =====================
+class HTTPResponse:
+    """Buffered upstream response exposing the parts of the requests API the helpers use."""
+    __slots__ = ("status_code", "content", "headers")
+
+    def __init__(self, status_code: int, content: bytes, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class UpstreamClient:
+    """Keep-alive aiohttp session for one upstream, capped at `limit` concurrent connections."""
+
+    def __init__(self, name: str, base_url: str = "", headers: dict | None = None,
+                 limit: int = HTTP_MAX_CONNECTIONS, timeout: float = HTTP_TIMEOUT, verify_ssl: bool = True):
+        self.name = name
+        self.base_url = (base_url or "").rstrip("/")
+        self.headers = headers or {}
+        self.limit = limit
+        self.timeout = timeout
+        self.verify_ssl = verify_ssl
+        self._session: aiohttp.ClientSession | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so the session binds to the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit,
+                ssl=None if self.verify_ssl else False,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def request(self, method: str, path: str, timeout: float | None = None, **kwargs) -> HTTPResponse:
+        """Send a request to `path` (relative to base_url, or absolute) and buffer the body."""
+        url = path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        start = time.perf_counter()
+        try:
+            async with self._get_session().request(method, url, **kwargs) as resp:
+                body = await resp.read()
+        except Exception:
+            UPSTREAM_REQUESTS.inc(self.name, "error")
+            raise
+        finally:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start, self.name)
+        UPSTREAM_REQUESTS.inc(self.name, _status_class(resp.status))
+        return HTTPResponse(resp.status, body, resp.headers)
+
+    async def get(self, path: str, **kwargs) -> HTTPResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> HTTPResponse:
+        return await self.request("POST", path, **kwargs)
+
+    async def delete(self, path: str, **kwargs) -> HTTPResponse:
+        return await self.request("DELETE", path, **kwargs)
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+jellyfin_http = UpstreamClient("jellyfin", JELLYFIN_URL, headers={"X-Emby-Token": JELLYFIN_API_KEY})
+jellyseerr_http = UpstreamClient("jellyseerr", JELLYSEERR_URL, headers={"X-Api-Key": JELLYSEERR_API_KEY})
+jfa_http = UpstreamClient("jfa", JFA_URL)  # Auth header is per-request, the token rotates
+radarr_http = UpstreamClient("radarr", RADARR_URL, headers={"X-Api-Key": RADARR_API_KEY})
+sonarr_http = UpstreamClient("sonarr", SONARR_URL, headers={"X-Api-Key": SONARR_API_KEY})
+proxmox_http = UpstreamClient(
+    "proxmox", PROXMOX_HOST,
+    headers={"Authorization": f"PVEAPIToken={PROXMOX_TOKEN_NAME}={PROXMOX_TOKEN_VALUE}"},
+    verify_ssl=PROXMOX_VERIFY_SSL
+)
+prometheus_http = UpstreamClient("prometheus")
+tracking_http = UpstreamClient("tracking", limit=len(POST_ENDPOINTS))
+github_http = UpstreamClient("github")
+
+HTTP_CLIENTS = [
+    jellyfin_http, jellyseerr_http, jfa_http, radarr_http, sonarr_http,
+    proxmox_http, prometheus_http, tracking_http, github_http
+]
+
+
+async def close_http_clients():
+    for client in HTTP_CLIENTS:
+        await client.close()
+
+# =====================
+# JELLYFIN HELPERS
+# =====================
+
+class JellyfinUserDirectory:
+    """
+    In-memory, case-insensitive username -> Id index of Jellyfin users.
+    Refreshed in the background and patched in place when the bot creates or deletes users.
+    """
+
+    def __init__(self, min_refresh_interval: int):
+        self.min_refresh_interval = min_refresh_interval
+        self._ids: dict[str, str] = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at >= self.min_refresh_interval
+
+    async def refresh(self, force: bool = True) -> bool:
+        """Fetch /Users once; concurrent callers share a single in-flight fetch."""
+        async with self._lock:
+            if not force and not self.is_stale():
+                return True
+            r = await jellyfin_http.get("/Users")
+            if r.status_code != 200:
+                print(f"[Jellyfin] Failed to refresh user directory. Status: {r.status_code}")
+                return False
+            self._ids = {u["Name"].lower(): u["Id"] for u in r.json()}
+            self._loaded_at = time.monotonic()
+            log_event(f"[Jellyfin] User directory refreshed ({len(self._ids)} users)")
+            return True
+
+    async def lookup(self, username: str, refresh_on_miss: bool = True) -> str | None:
+        key = username.lower()
+        user_id = self._ids.get(key)
+        if user_id is None and refresh_on_miss and self.is_stale():
+            # The user may have been created outside the bot
+            await self.refresh(force=False)
+            user_id = self._ids.get(key)
+        return user_id
+
+    def add(self, username: str, user_id: str):
+        self._ids[username.lower()] = user_id
+
+    def remove(self, username: str):
+        self._ids.pop(username.lower(), None)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+jellyfin_directory = JellyfinUserDirectory(JELLYFIN_DIRECTORY_MIN_REFRESH)
+
+
+async def create_jellyfin_user(username, password):
+    """False when Jellyfin answers with a refusal; transport errors and timeouts raise, since the user may exist."""
+    data = {"Name": username, "Password": password}
+    r = await jellyfin_http.post("/Users/New", json=data)
+    if r.status_code == 200:
+        user = r.json()
+        jellyfin_directory.add(user.get("Name", username), user["Id"])
+    return r.status_code == 200
+
+async def get_jellyfin_user(username):
+    return await jellyfin_directory.lookup(username)
+
+async def delete_jellyfin_user(username):
+    user_id = await jellyfin_directory.lookup(username, refresh_on_miss=False)
+    if user_id is None and jellyfin_directory.is_stale():
+        # Only a current directory can vouch that the user is gone; callers drop their DB row on True
+        if not await jellyfin_directory.refresh(force=False):
+            return False
+        user_id = await jellyfin_directory.lookup(username, refresh_on_miss=False)
+    if user_id:
+        r = await jellyfin_http.delete(f"/Users/{user_id}")
+        if r.status_code in (200, 204, 404):
+            jellyfin_directory.remove(username)
+        return r.status_code in (200, 204)
+    return True
+
+async def reset_jellyfin_password(username: str, new_password: str) -> bool:
+    user_id = await get_jellyfin_user(username)
+    if not user_id:
+        return False
+    data = {"Password": new_password}
+    response = await jellyfin_http.post(f"/Users/{user_id}/Password", json=data)
+    return response.status_code in (200, 204)
+
+async def create_trial_jellyfin_user(username, password):
+    payload = {
+        "Name": username,
+        "Password": password,
+        "Policy": {
+            "EnableDownloads": False,
+            "EnableSyncTranscoding": False,
+            "EnableRemoteControlOfOtherUsers": False,
+            "EnableLiveTvAccess": False,
             "IsAdministrator": False,
             "IsHidden": False,
             "IsDisabled": False
         }
     }
-    headers = {
-        "X-Emby-Token": JELLYFIN_API_KEY,
-        "Content-Type": "application/json"
-    }
-    response = requests.post(f"{JELLYFIN_URL}/Users/New", json=payload, headers=headers)
+    response = await jellyfin_http.post("/Users/New", json=payload)
 
     if response.status_code == 200:
-        return response.json().get("Id")
+        user_id = response.json().get("Id")
+        if user_id:
+            jellyfin_directory.add(username, user_id)
+        return user_id
     else:
         print(f"[Jellyfin] Trial user creation failed. Status: {response.status_code}, Response: {response.text}")
         return None
 
+# =====================
+# ACTIVE STREAMS
+# =====================
+# One poller reads /Sessions for every consumer: activestreams answers from the last
+# poll and the pinned dashboard is edited from it. The poll interval tightens to
+# STREAMS_POLL_ACTIVE_SECONDS while something is playing and relaxes to
+# STREAMS_POLL_IDLE_SECONDS otherwise. The dashboard is edited only when what it shows
+# changes (a stream starts, stops, pauses, switches play method or moves a whole
+# percent), and never more often than STREAMS_DASHBOARD_MIN_EDIT_SECONDS.
+
+TICKS_PER_SECOND = 10_000_000
+STREAM_FIELD_LIMIT = 25  # Discord's per-embed field cap
+
+
+@dataclass(frozen=True, slots=True)
+class ActiveStream:
+    """One Jellyfin session playing a movie or episode."""
+    session_id: str
+    user_name: str
+    device: str
+    media_name: str
+    media_type: str
+    position_ticks: int
+    runtime_ticks: int
+    paused: bool
+    play_method: str
+    bitrate: int  # bits/s sent to the client
+
+    @classmethod
+    def from_session(cls, session: dict) -> "ActiveStream":
+        media = session.get("NowPlayingItem") or {}
+        play_state = session.get("PlayState") or {}
+        return cls(
+            session_id=session.get("Id", ""),
+            user_name=session.get("UserName", "Unknown User"),
+            device=session.get("DeviceName", "Unknown Device"),
+            media_name=media.get("Name", "Unknown Title"),
+            media_type=media.get("Type", "Unknown"),
+            position_ticks=play_state.get("PositionTicks") or 0,
+            runtime_ticks=media.get("RunTimeTicks") or 0,
+            paused=bool(play_state.get("IsPaused")),
+            play_method=play_state.get("PlayMethod") or "DirectPlay",
+            bitrate=session_bitrate(session),
+        )
+
+    @property
+    def transcoding(self) -> bool:
+        return self.play_method == "Transcode"
+
+    @property
+    def percent(self) -> int:
+        return int(self.position_ticks * 100 / self.runtime_ticks) if self.runtime_ticks > 0 else 0
+
+    @property
+    def signature(self) -> tuple:
+        return (self.session_id, self.media_name, self.paused, self.play_method, self.percent)
+
+    def field(self) -> tuple[str, str]:
+        position_str = str(datetime.timedelta(seconds=int(self.position_ticks / TICKS_PER_SECOND)))
+        runtime_str = str(datetime.timedelta(seconds=int(self.runtime_ticks / TICKS_PER_SECOND)))
+        bar_length = 10
+        filled_length = int(round(bar_length * self.percent / 100))
+        bar = "■" * filled_length + "□" * (bar_length - filled_length)
+        state = "⏸ Paused" if self.paused else "🔄 Transcoding" if self.transcoding else "▶️ Direct"
+        return (
+            f"{self.media_name} ({self.media_type})"[:256],
+            f"👤 {self.user_name}\n📱 {self.device}\n"
+            f"⏱ Progress: {bar} {self.percent}%\n[{position_str} / {runtime_str}]\n"
+            f"{state} · {self.bitrate / 1_000_000:.1f} Mbps"
+        )
+
+
+def session_bitrate(session: dict) -> int:
+    """The transcode target bitrate, else the source video plus the selected audio stream."""
+    transcoding = session.get("TranscodingInfo") or {}
+    if transcoding.get("Bitrate"):
+        return int(transcoding["Bitrate"])
+    audio_index = (session.get("PlayState") or {}).get("AudioStreamIndex")
+    total = 0
+    for stream in (session.get("NowPlayingItem") or {}).get("MediaStreams") or ():
+        if stream.get("Type") == "Video" or (stream.get("Type") == "Audio" and stream.get("Index") == audio_index):
+            total += stream.get("BitRate") or 0
+    return total
+
+
+class SessionMonitor:
+    def __init__(self, active_interval: float, idle_interval: float):
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.streams: list[ActiveStream] = []
+        self.updated_at = 0.0
+        self.last_status: int | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.updated_at > 0
+
+    @property
+    def interval(self) -> float:
+        return self.active_interval if self.streams else self.idle_interval
+
+    def is_fresh(self) -> bool:
+        return time.time() - self.updated_at < self.interval
+
+    @property
+    def signature(self) -> tuple:
+        return tuple(s.signature for s in self.streams)
+
+    @property
+    def transcodes(self) -> int:
+        return sum(s.transcoding for s in self.streams)
+
+    @property
+    def bandwidth(self) -> int:
+        return sum(s.bitrate for s in self.streams)
+
+    async def poll(self, force: bool = True) -> bool:
+        """Fetch /Sessions once; concurrent callers share a single in-flight fetch."""
+        async with self._lock:
+            if not force and self.is_fresh():
+                return True
+            r = await jellyfin_http.get("/Sessions")
+            self.last_status = r.status_code
+            if r.status_code != 200:
+                print(f"[Jellyfin] Failed to fetch sessions. Status: {r.status_code}")
+                return False
+            # Only keep sessions that are actively playing a Movie or Episode
+            self.streams = sorted(
+                (
+                    ActiveStream.from_session(s) for s in r.json()
+                    if s.get("NowPlayingItem") and s["NowPlayingItem"].get("Type") in ("Movie", "Episode")
+                ),
+                key=lambda s: (s.user_name.lower(), s.session_id),
+            )
+            self.updated_at = time.time()
+            return True
+
+    def render(self) -> discord.Embed:
+        embed = discord.Embed(title="📺 Active Jellyfin Streams", color=discord.Color.green())
+        if not self.streams:
+            embed.description = "ℹ️ No active movie or episode streams at the moment."
+        else:
+            embed.description = (
+                f"Currently {len(self.streams)} active stream(s) · "
+                f"🔄 {self.transcodes} transcoding · 📶 {self.bandwidth / 1_000_000:.1f} Mbps"
+            )
+            shown = self.streams if len(self.streams) <= STREAM_FIELD_LIMIT else self.streams[:STREAM_FIELD_LIMIT - 1]
+            for stream in shown:
+                name, value = stream.field()
+                embed.add_field(name=name, value=value, inline=False)
+            if len(shown) < len(self.streams):
+                embed.add_field(name="…", value=f"and {len(self.streams) - len(shown)} more", inline=False)
+        if self.ready:
+            embed.timestamp = datetime.datetime.fromtimestamp(self.updated_at, datetime.timezone.utc)
+        return embed
+
+
+class StreamsDashboard:
+    """
+    A pinned message kept in sync with the session monitor. Its channel and message IDs
+    live in bot_metadata so it survives restarts and is shared between instances.
+    """
+
+    METADATA_KEY = "streams_dashboard"
+
+    def __init__(self, monitor: SessionMonitor, min_edit_interval: float):
+        self.monitor = monitor
+        self.min_edit_interval = min_edit_interval
+        self.message: discord.Message | None = None
+        self._shown: tuple | None = None  # signature currently on the message
+        self._last_edit = 0.0
+        self._pending: asyncio.Task | None = None
+
+    async def load(self):
+        """Pick up the dashboard recorded in bot_metadata (posted earlier, or by another instance)."""
+        raw = await async_get_metadata(self.METADATA_KEY)
+        ids = json.loads(raw) if raw else None
+        if self.message is not None and ids == {"channel_id": self.message.channel.id, "message_id": self.message.id}:
+            return
+        self.message, self._shown = None, None
+        if not ids:
+            return
+        try:
+            channel = bot.get_channel(ids["channel_id"]) or await bot.fetch_channel(ids["channel_id"])
+            self.message = await channel.fetch_message(ids["message_id"])
+        except (discord.NotFound, discord.Forbidden):
+            print(f"[Streams] Dashboard message {ids['message_id']} is gone; forgetting it.")
+            await async_set_metadata(self.METADATA_KEY, "")
+
+    async def post(self, channel) -> bool:
+        """Post and pin a new dashboard in `channel`, replacing the old one. Returns whether pinning worked."""
+        old = self.message
+        self.message = await channel.send(embed=self.monitor.render())
+        self._shown, self._last_edit = self.monitor.signature, time.monotonic()
+        await async_set_metadata(
+            self.METADATA_KEY, json.dumps({"channel_id": channel.id, "message_id": self.message.id})
+        )
+        if old is not None:
+            try:
+                await old.unpin()
+            except discord.HTTPException:
+                pass
+        try:
+            await self.message.pin()
+            return True
+        except discord.HTTPException as e:
+            print(f"[Streams] Could not pin dashboard in channel {channel.id}: {e}")
+            return False
+
+    async def remove(self):
+        if self.message is not None:
+            try:
+                await self.message.unpin()
+            except discord.HTTPException:
+                pass
+        await self.forget()
+
+    async def forget(self):
+        self.message, self._shown = None, None
+        if self._pending is not None:
+            self._pending.cancel()
+        await async_set_metadata(self.METADATA_KEY, "")
+
+    async def refresh(self):
+        """Edit the message if what it shows changed; edits inside the rate window are deferred, not dropped."""
+        if self.message is None or self.monitor.signature == self._shown:
+            return
+        wait = self._last_edit + self.min_edit_interval - time.monotonic()
+        if wait > 0:
+            if self._pending is None or self._pending.done():
+                self._pending = asyncio.create_task(self._deferred_refresh(wait))
+            return
+        self._shown, self._last_edit = self.monitor.signature, time.monotonic()
+        await self.message.edit(embed=self.monitor.render())
+
+    async def _deferred_refresh(self, delay: float):
+        await asyncio.sleep(delay)
+        try:
+            await self.refresh()
+        except discord.NotFound:
+            await self.forget()
+        except discord.HTTPException as e:
+            print(f"[Streams] Failed to update dashboard: {e}")
+
+
+session_monitor = SessionMonitor(STREAMS_POLL_ACTIVE_SECONDS, STREAMS_POLL_IDLE_SECONDS)
+streams_dashboard = StreamsDashboard(session_monitor, STREAMS_DASHBOARD_MIN_EDIT_SECONDS)
+
+# =====================
+# LIBRARY CATALOG
+# =====================
+@dataclass(frozen=True, slots=True)
+class LibraryItem:
+    """The handful of Jellyfin item fields the suggestion embeds use."""
+    id: str
+    name: str
+    year: int | None
+    runtime_ticks: int | None
+    image_tag: str | None
+    imdb_id: str | None
+
+    @classmethod
+    def from_jellyfin(cls, item: dict) -> "LibraryItem":
+        return cls(
+            id=item.get("Id"),
+            name=item.get("Name", "Unknown Title"),
+            year=item.get("ProductionYear"),
+            runtime_ticks=item.get("RunTimeTicks"),
+            image_tag=item.get("PrimaryImageTag") or (item.get("ImageTags") or {}).get("Primary"),
+            imdb_id=(item.get("ProviderIds") or {}).get("Imdb")
+        )
+
+    @property
+    def poster_url(self) -> str | None:
+        if not self.image_tag:
+            return None
+        return f"{JELLYFIN_URL}/Items/{self.id}/Images/Primary?tag={self.image_tag}&quality=90"
+
+
+class LibraryCatalog:
+    """
+    Compact in-memory list of one Jellyfin item type, refreshed periodically in pages.
+    With LIBRARY_CACHE_MODE=server, samples come from Jellyfin's SortBy=Random instead.
+    """
+
+    def __init__(self, item_type: str):
+        self.item_type = item_type
+        self.items: list[LibraryItem] = []
+        self.refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _params(self, **extra) -> dict:
+        return {
+            "IncludeItemTypes": self.item_type,
+            "Recursive": "true",
+            "Fields": "ProviderIds",
+            "EnableImageTypes": "Primary",
+            "ImageTypeLimit": "1",
+            "EnableUserData": "false",
+            **extra
+        }
+
+    async def refresh(self) -> bool:
+        """Page through /Items and swap in the new list. Keeps the old list on failure."""
+        async with self._lock:
+            items, start = [], 0
+            while True:
+                r = await jellyfin_http.get(
+                    "/Items",
+                    params=self._params(StartIndex=str(start), Limit=str(LIBRARY_PAGE_SIZE)),
+                    timeout=30
+                )
+                if r.status_code != 200:
+                    print(f"[Library] Failed to refresh {self.item_type} catalog. Status code: {r.status_code}")
+                    return False
+                page = r.json().get("Items", [])
+                items.extend(LibraryItem.from_jellyfin(item) for item in page)
+                if len(page) < LIBRARY_PAGE_SIZE:
+                    break
+                start += LIBRARY_PAGE_SIZE
+
+            self.items = items
+            self.refreshed_at = time.monotonic()
+            log_event(f"[Library] Cached {len(items)} {self.item_type} items")
+            return True
+
+    async def sample(self, count: int = 5) -> list[LibraryItem] | None:
+        """Return up to `count` random items, or None if Jellyfin couldn't be reached."""
+        if LIBRARY_CACHE_MODE == "server":
+            r = await jellyfin_http.get(
+                "/Items", params=self._params(SortBy="Random", Limit=str(count), EnableTotalRecordCount="false")
+            )
+            if r.status_code != 200:
+                print(f"[Library] Random {self.item_type} query failed. Status code: {r.status_code}")
+                return None
+            return [LibraryItem.from_jellyfin(item) for item in r.json().get("Items", [])]
+
+        if not self.refreshed_at and not await self.refresh():
+            return None
+        return random.sample(self.items, min(count, len(self.items)))
+
+
+movie_catalog = LibraryCatalog("Movie")
+series_catalog = LibraryCatalog("Series")
+
+
 # =====================
 # JELLYSEERR HELPERS
 # =====================
 
-def import_jellyseerr_user(jellyfin_user_id: str) -> str:
+JELLYSEERR_PAGE_SIZE = 500
+JELLYSEERR_IMPORT_BATCH = 50
+
+
+class JellyseerrIndex:
+    """
+    In-memory Jellyfin user Id -> Jellyseerr user id index.
+    Loaded from the paginated /api/v1/user listing and patched after imports and deletes.
+    """
+
+    def __init__(self, min_refresh_interval: int):
+        self.min_refresh_interval = min_refresh_interval
+        self._js_ids: dict[str, int] = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at >= self.min_refresh_interval
+
+    @staticmethod
+    def _jellyfin_ids(user: dict) -> list[str]:
+        # Jellyseerr exposes a single jellyfinUserId; older builds used a list
+        ids = list(user.get("jellyfinUserIds") or [])
+        if user.get("jellyfinUserId"):
+            ids.append(user["jellyfinUserId"])
+        return ids
+
+    async def refresh(self, force: bool = True) -> bool:
+        async with self._lock:
+            if not force and not self.is_stale():
+                return True
+            js_ids, skip = {}, 0
+            while True:
+                r = await jellyseerr_http.get(
+                    "/api/v1/user", params={"take": str(JELLYSEERR_PAGE_SIZE), "skip": str(skip)}
+                )
+                if r.status_code != 200:
+                    print(f"[Jellyseerr] Failed to refresh user index. Status: {r.status_code}")
+                    return False
+                body = r.json()
+                users = body.get("results", []) if isinstance(body, dict) else body
+                for user in users:
+                    for jf_id in self._jellyfin_ids(user):
+                        js_ids[jf_id] = user["id"]
+                if not isinstance(body, dict) or len(users) < JELLYSEERR_PAGE_SIZE:
+                    break
+                skip += JELLYSEERR_PAGE_SIZE
+
+            self._js_ids = js_ids
+            self._loaded_at = time.monotonic()
+            log_event(f"[Jellyseerr] User index refreshed ({len(js_ids)} users)")
+            return True
+
+    async def lookup(self, jf_id: str, refresh_on_miss: bool = True) -> int | None:
+        js_id = self._js_ids.get(jf_id)
+        if js_id is None and refresh_on_miss and self.is_stale():
+            await self.refresh(force=False)
+            js_id = self._js_ids.get(jf_id)
+        return js_id
+
+    def add(self, jf_id: str, js_id: int):
+        self._js_ids[jf_id] = js_id
+
+    def remove(self, js_id):
+        for jf_id in [k for k, v in self._js_ids.items() if str(v) == str(js_id)]:
+            del self._js_ids[jf_id]
+
+    def __len__(self):
+        return len(self._js_ids)
+
+
+# Same refresh floor as the Jellyfin directory: a miss triggers at most one listing per window
+jellyseerr_index = JellyseerrIndex(JELLYFIN_DIRECTORY_MIN_REFRESH)
+
+
+async def import_jellyseerr_users(jellyfin_user_ids: list[str]) -> dict[str, int]:
+    """
+    Import Jellyfin users into Jellyseerr, JELLYSEERR_IMPORT_BATCH per request.
+    Returns {jellyfin_id: jellyseerr_id} for every id that exists in Jellyseerr afterwards,
+    including users that were already imported (the endpoint only returns new ones).
+    """
+    if not JELLYSEERR_ENABLED or not jellyfin_user_ids:
+        return {}
+
+    for i in range(0, len(jellyfin_user_ids), JELLYSEERR_IMPORT_BATCH):
+        batch = jellyfin_user_ids[i:i + JELLYSEERR_IMPORT_BATCH]
+        try:
+            r = await jellyseerr_http.post(
+                "/api/v1/user/import-from-jellyfin", json={"jellyfinUserIds": batch}, timeout=30
+            )
+        except Exception as e:
+            print(f"[Jellyseerr] Failed to import users: {e}")
+            continue
+        if r.status_code not in (200, 201):
+            print(f"[Jellyseerr] Import failed. Status: {r.status_code}, Response: {r.text}")
+            continue
+        try:
+            for user in r.json() or []:
+                for jf_id in JellyseerrIndex._jellyfin_ids(user):
+                    jellyseerr_index.add(jf_id, user["id"])
+        except (ValueError, KeyError, TypeError) as e:
+            # Imported users still resolve below through the index listing
+            print(f"[Jellyseerr] Unexpected import response: {e}")
+
+    resolved, refresh_on_miss = {}, True
+    for jf_id in jellyfin_user_ids:
+        try:
+            js_id = await jellyseerr_index.lookup(jf_id, refresh_on_miss=refresh_on_miss)
+        except Exception as e:
+            # Leave this user unresolved; the caller counts it as not imported
+            print(f"[Jellyseerr] Failed to resolve Jellyfin user {jf_id}: {e}")
+            refresh_on_miss = False  # Don't retry a failing listing once per remaining user
+            continue
+        if js_id is not None:
+            resolved[jf_id] = js_id
+    return resolved
+
+
+async def import_jellyseerr_user(jellyfin_user_id: str) -> str:
     """Import user into Jellyseerr. Returns the Jellyseerr user ID if successful, else None."""
-    if not JELLYSEERR_ENABLED:
-        return None
-    headers = {"X-Api-Key": JELLYSEERR_API_KEY, "Content-Type": "application/json"}
-    data = {"jellyfinUserIds": [jellyfin_user_id]}
-    try:
-        url = f"{JELLYSEERR_URL}/api/v1/user/import-from-jellyfin"
-        r = requests.post(url, headers=headers, json=data, timeout=15)
-        if r.status_code in (200, 201):
-            js_user = r.json()
-            if isinstance(js_user, list) and len(js_user) > 0 and "id" in js_user[0]:
-                js_id = js_user[0]["id"]
-                print(f"[Jellyseerr] User {jellyfin_user_id} imported successfully with Jellyseerr ID {js_id}.")
-                return js_id
-        print(f"[Jellyseerr] Import failed. Status: {r.status_code}, Response: {r.text}")
-        return None
-    except Exception as e:
-        print(f"[Jellyseerr] Failed to import user: {e}")
-        return None
+    js_id = (await import_jellyseerr_users([jellyfin_user_id])).get(jellyfin_user_id)
+    if js_id is not None:
+        print(f"[Jellyseerr] User {jellyfin_user_id} imported successfully with Jellyseerr ID {js_id}.")
+    return js_id
     
-def get_jellyseerr_id(jf_id: str) -> str | None:
+async def get_jellyseerr_id(jf_id: str) -> str | None:
     """Return the Jellyseerr user ID for a given Jellyfin user ID."""
     if not JELLYSEERR_ENABLED:
         return None
 
-    headers = {"X-Api-Key": JELLYSEERR_API_KEY}
     try:
-        r = requests.get(f"{JELLYSEERR_URL}/api/v1/user", headers=headers, timeout=10)
-        if r.status_code != 200:
-            return None
-        users = r.json()
-        for user in users:
-            if "jellyfinUserIds" in user and jf_id in user["jellyfinUserIds"]:
-                return user["id"]
-        return None
+        return await jellyseerr_index.lookup(jf_id)
     except Exception as e:
         print(f"[Jellyseerr] Failed to fetch user ID for Jellyfin ID {jf_id}: {e}")
         return None
 
 
-def delete_jellyseerr_user(js_id: str) -> bool:
+async def delete_jellyseerr_user(js_id: str) -> bool:
     if not JELLYSEERR_ENABLED or not js_id:
         return True
-    headers = {"X-Api-Key": JELLYSEERR_API_KEY}
     try:
-        dr = requests.delete(f"{JELLYSEERR_URL}/api/v1/user/{js_id}", headers=headers, timeout=10)
+        dr = await jellyseerr_http.delete(f"/api/v1/user/{js_id}")
+        if dr.status_code in (200, 204, 404):
+            jellyseerr_index.remove(js_id)
         return dr.status_code in (200, 204)
     except Exception as e:
         print(f"[Jellyseerr] Failed to delete user {js_id}: {e}")
@@ -426,17 +2003,13 @@ def delete_jellyseerr_user(js_id: str) -> bool:
 # SERVARR HELPERS
 # =====================
 
-def radarr_get_movies():
+async def radarr_get_movies():
     """Return a list of all movies Radarr is managing."""
     if not ENABLE_RADARR:
         return None
 
     try:
-        response = requests.get(
-            f"{RADARR_URL}/api/v3/movie",
-            headers={"X-Api-Key": RADARR_API_KEY},
-            timeout=10
-        )
+        response = await radarr_http.get("/api/v3/movie", timeout=60)
         if response.status_code != 200:
             print(f"[Radarr] Error fetching movies: {response.status_code} {response.text}")
             return None
@@ -445,197 +2018,1618 @@ def radarr_get_movies():
     except Exception as e:
         print(f"[Radarr] Exception: {e}")
         return None
-    
-def radarr_get_latest_movies(count=5):
-    """Return the latest added movies from Radarr."""
-    movies = radarr_get_movies()
-    if not movies:
-        return None
-
-    # Sort by 'added' field if available
-    sorted_movies = sorted(
-        movies,
-        key=lambda m: m.get("added", ""),
-        reverse=True
-    )
 
-    return sorted_movies[:count]
-    
-def sonarr_get_series():
+async def sonarr_get_series():
     """Return a list of all series Sonarr is managing."""
     if not ENABLE_SONARR:
         return None
 
     try:
-        response = requests.get(
-            f"{SONARR_URL}/api/v3/series",
-            headers={"X-Api-Key": SONARR_API_KEY},
-            timeout=10
-        )
+        response = await sonarr_http.get("/api/v3/series", timeout=60)
         if response.status_code != 200:
             print(f"[Sonarr] Error fetching series: {response.status_code} {response.text}")
             return None
 
-        return response.json()
+        return response.json()
+
+    except Exception as e:
+        print(f"[Sonarr] Exception: {e}")
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class ServarrItem:
+    """The fields moviestats/showstats display, trimmed from a Radarr movie or Sonarr series."""
+    id: int
+    title: str
+    year: int | None
+    added: str
+    external_id: int | None
+
+
+class ServarrMirror:
+    """
+    Compact local copy of a Radarr/Sonarr catalog.
+
+    A full resync runs every SERVARR_FULL_SYNC_HOURS; in between, `/api/v3/history/since`
+    is polled from a date watermark and only the items it mentions are re-fetched.
+    `_by_added` is kept sorted as (added, id) so the newest K items are a slice.
+    """
+
+    def __init__(self, name: str, client: UpstreamClient, resource: str,
+                 history_key: str, external_key: str, fetch_all):
+        self.name = name
+        self.client = client
+        self.resource = resource
+        self.history_key = history_key
+        self.external_key = external_key
+        self.fetch_all = fetch_all
+        self.items: dict[int, ServarrItem] = {}
+        self._by_added: list[tuple[str, int]] = []
+        self.watermark: str | None = None
+        self.full_synced_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.full_synced_at > 0
+
+    def _compact(self, raw: dict) -> ServarrItem:
+        return ServarrItem(
+            id=raw["id"],
+            title=raw.get("title", "Unknown"),
+            year=raw.get("year"),
+            added=raw.get("added", ""),
+            external_id=raw.get(self.external_key)
+        )
+
+    def _put(self, item: ServarrItem):
+        self._drop(item.id)
+        self.items[item.id] = item
+        bisect.insort(self._by_added, (item.added, item.id))
+
+    def _drop(self, item_id: int):
+        old = self.items.pop(item_id, None)
+        if old is None:
+            return
+        i = bisect.bisect_left(self._by_added, (old.added, old.id))
+        if i < len(self._by_added) and self._by_added[i] == (old.added, old.id):
+            del self._by_added[i]
+
+    def __len__(self):
+        return len(self.items)
+
+    def latest(self, count: int = 5) -> list[ServarrItem]:
+        return [self.items[item_id] for _, item_id in reversed(self._by_added[-count:])]
+
+    async def full_sync(self) -> bool:
+        async with self._lock:
+            started = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            raw = await self.fetch_all()
+            if raw is None:
+                return False
+
+            items = {entry["id"]: self._compact(entry) for entry in raw}
+            self.items = items
+            self._by_added = sorted((item.added, item.id) for item in items.values())
+            self.watermark = started
+            self.full_synced_at = time.monotonic()
+            log_event(f"[{self.name}] Mirrored {len(items)} items")
+            return True
+
+    async def incremental_sync(self) -> bool:
+        """Re-fetch only the items with history records since the watermark."""
+        if not self.ready:
+            return await self.full_sync()
+
+        async with self._lock:
+            try:
+                r = await self.client.get("/api/v3/history/since", params={"date": self.watermark})
+                if r.status_code != 200:
+                    print(f"[{self.name}] History query failed: {r.status_code}")
+                    return False
+                records = r.json()
+            except Exception as e:
+                print(f"[{self.name}] History query failed: {e}")
+                return False
+
+            changed = {rec[self.history_key] for rec in records if rec.get(self.history_key)}
+            for item_id in changed:
+                try:
+                    r = await self.client.get(f"/api/v3/{self.resource}/{item_id}")
+                except Exception as e:
+                    print(f"[{self.name}] Failed to refresh item {item_id}: {e}")
+                    return False
+                if r.status_code == 404:
+                    self._drop(item_id)
+                elif r.status_code == 200:
+                    self._put(self._compact(r.json()))
+                else:
+                    print(f"[{self.name}] Failed to refresh item {item_id}: {r.status_code}")
+                    return False
+
+            if records:
+                self.watermark = max(rec.get("date", "") for rec in records) or self.watermark
+            return True
+
+    async def sync(self) -> bool:
+        if time.monotonic() - self.full_synced_at >= SERVARR_FULL_SYNC_HOURS * 3600:
+            return await self.full_sync()
+        return await self.incremental_sync()
+
+
+radarr_mirror = ServarrMirror("Radarr", radarr_http, "movie", "movieId", "tmdbId", radarr_get_movies)
+sonarr_mirror = ServarrMirror("Sonarr", sonarr_http, "series", "seriesId", "tvdbId", sonarr_get_series)
+
+async def radarr_get_latest_movies(count=5):
+    """Return the latest added movies from the Radarr mirror."""
+    if not ENABLE_RADARR:
+        return None
+    if not radarr_mirror.ready and not await radarr_mirror.full_sync():
+        return None
+    return radarr_mirror.latest(count)
+
+async def sonarr_get_latest_series(count=5):
+    """Return the latest added series from the Sonarr mirror."""
+    if not ENABLE_SONARR:
+        return None
+    if not sonarr_mirror.ready and not await sonarr_mirror.full_sync():
+        return None
+    return sonarr_mirror.latest(count)
+    
+# =====================
+# QBITTORRENT HELPERS
+# =====================
+
+def progress_bar(progress: float, length: int = 20) -> str:
+    """Return a textual progress bar for the embed."""
+    filled_length = int(length * progress)
+    bar = '█' * filled_length + '░' * (length - filled_length)
+    return f"[{bar}] {progress*100:.2f}%"
+
+
+# Torrents are kept in memory from qBittorrent's sync/maindata API: each poll sends
+# the last response id (rid) and gets back only changed fields and removed hashes.
+# qbview pages through that table, and dashboards re-render only pages whose
+# torrents changed, reusing the rendered field of every unchanged torrent.
+
+QBIT_PAGE_SIZE = 10
+
+TORRENT_GROUPS = {
+    "Downloading / Uploading": ("downloading", "uploading"),
+    "Finished": ("completed", "pausedUP", "pausedDL"),
+    "Stalled": ("stalledUP", "stalledDL"),
+    "Checking / Metadata": ("checkingUP", "checkingDL", "checking", "metaDL"),
+}
+_TORRENT_GROUP_ORDER = {name: i for i, name in enumerate([*TORRENT_GROUPS, "Other"])}
+
+
+def torrent_group(state: str) -> str:
+    for group, states in TORRENT_GROUPS.items():
+        if state in states:
+            return group
+    return "Other"
+
+
+class TorrentMonitor:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.rid = 0
+        self.torrents: dict[str, dict] = {}
+        self.server_state: dict = {}
+        self.updated_at = 0.0
+        self._order: list[str] | None = None  # hashes sorted for display, rebuilt lazily
+        self._fields: dict[str, tuple[tuple, tuple[str, str]]] = {}  # hash -> (signature, (name, value))
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.updated_at > 0
+
+    async def poll(self) -> set[str]:
+        """Apply one sync/maindata delta; returns the hashes that changed or disappeared."""
+        async with self._lock:
+            try:
+                data = await call_upstream("qbittorrent", qb.sync_maindata, rid=self.rid)
+            except Exception:
+                self.rid = 0  # Start over with a full update next time
+                raise
+
+            changed = set()
+            if data.get("full_update"):
+                changed.update(self.torrents)
+                self.torrents = {}
+                self.server_state = {}
+            for torrent_hash, fields in (data.get("torrents") or {}).items():
+                self.torrents.setdefault(torrent_hash, {"hash": torrent_hash}).update(fields)
+                changed.add(torrent_hash)
+            for torrent_hash in data.get("torrents_removed") or ():
+                if self.torrents.pop(torrent_hash, None) is not None:
+                    self._fields.pop(torrent_hash, None)
+                    changed.add(torrent_hash)
+            if data.get("full_update"):
+                self._fields = {h: f for h, f in self._fields.items() if h in self.torrents}
+            self.server_state.update(data.get("server_state") or {})
+            self.rid = data.get("rid", self.rid)
+            self.updated_at = time.time()
+            if changed:
+                self._order = None
+            return changed
+
+    def ordered(self) -> list[str]:
+        if self._order is None:
+            self._order = sorted(
+                self.torrents,
+                key=lambda h: (
+                    _TORRENT_GROUP_ORDER[torrent_group(self.torrents[h].get("state", ""))],
+                    self.torrents[h].get("name", "").lower(),
+                ),
+            )
+        return self._order
+
+    def pages(self) -> int:
+        return max(1, -(-len(self.torrents) // QBIT_PAGE_SIZE))
+
+    def page_hashes(self, page: int) -> list[str]:
+        start = page * QBIT_PAGE_SIZE
+        return self.ordered()[start:start + QBIT_PAGE_SIZE]
+
+    def _field(self, torrent_hash: str) -> tuple[str, str]:
+        t = self.torrents[torrent_hash]
+        signature = (t.get("name"), t.get("state"), round(t.get("progress", 0), 4), t.get("num_leechs"), t.get("num_seeds"))
+        cached = self._fields.get(torrent_hash)
+        if cached and cached[0] == signature:
+            return cached[1]
+        name, state = t.get("name", torrent_hash), t.get("state", "unknown")
+        field = (
+            f"{torrent_group(state)} · {name}"[:256],
+            f"{progress_bar(t.get('progress', 0))}\n"
+            f"Peers: {t.get('num_leechs', 0)} | Seeders: {t.get('num_seeds', 0)}\n"
+            f"Status: {state}"
+        )
+        self._fields[torrent_hash] = (signature, field)
+        return field
+
+    def render(self, page: int) -> discord.Embed:
+        embed = discord.Embed(title="qBittorrent Downloads", color=0x00ff00)
+        if not self.torrents:
+            embed.description = "No torrents found."
+            return embed
+        page = min(max(page, 0), self.pages() - 1)
+        for torrent_hash in self.page_hashes(page):
+            name, value = self._field(torrent_hash)
+            embed.add_field(name=name, value=value, inline=False)
+        dl = self.server_state.get("dl_info_speed", 0) / 1_048_576
+        up = self.server_state.get("up_info_speed", 0) / 1_048_576
+        embed.set_footer(
+            text=f"Page {page + 1}/{self.pages()} · {len(self.torrents)} torrents · ↓ {dl:.1f} MB/s ↑ {up:.1f} MB/s"
+        )
+        embed.timestamp = datetime.datetime.fromtimestamp(self.updated_at, datetime.timezone.utc)
+        return embed
+
+
+class TorrentDashboard(discord.ui.View):
+    """A message showing one page of the torrent table, edited when that page changes."""
+
+    def __init__(self, monitor: TorrentMonitor):
+        super().__init__(timeout=None)
+        self.monitor = monitor
+        self.page = 0
+        self.message: discord.Message | None = None
+        self._shown: list[str] = []
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if not has_admin_role(interaction.user):
+            await interaction.response.send_message("❌ You don’t have permission to use this dashboard.", ephemeral=True)
+            return False
+        return True
+
+    async def _flip(self, interaction: discord.Interaction, step: int):
+        self.page = (self.page + step) % self.monitor.pages()
+        self._shown = self.monitor.page_hashes(self.page)
+        await interaction.response.edit_message(embed=self.monitor.render(self.page), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._flip(interaction, -1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._flip(interaction, 1)
+
+    async def send(self, channel):
+        self._shown = self.monitor.page_hashes(self.page)
+        self.message = await channel.send(embed=self.monitor.render(self.page), view=self)
+
+    async def refresh(self, changed: set[str]):
+        """Edit the message only if a torrent on the visible page changed or the page's torrents moved."""
+        if self.message is None:
+            return
+        self.page = min(self.page, self.monitor.pages() - 1)
+        hashes = self.monitor.page_hashes(self.page)
+        if hashes == self._shown and not changed.intersection(hashes):
+            return
+        self._shown = hashes
+        await self.message.edit(embed=self.monitor.render(self.page), view=self)
+
+
+torrent_monitor = TorrentMonitor(QBIT_POLL_SECONDS)
+torrent_dashboards: dict[int, TorrentDashboard] = {}  # channel id -> dashboard
+
+# =====================
+# PROXMOX HELPERS
+# =====================
+
+def get_proxmox_client():
+    """Create and return a Proxmox client using API token auth."""
+    if not (PROXMOX_HOST and PROXMOX_TOKEN_NAME and PROXMOX_TOKEN_VALUE):
+        raise ValueError("Proxmox API credentials are not fully configured in .env")
+
+    # Parse host + port safely
+    base_host = PROXMOX_HOST.replace("https://", "").replace("http://", "")
+    if ":" in base_host:
+        host, port = base_host.split(":")
+    else:
+        host, port = base_host, 8006  # default Proxmox port
+
+    # Split token into user + token name
+    try:
+        user, token_name = PROXMOX_TOKEN_NAME.split("!")
+    except ValueError:
+        raise ValueError(
+            "❌ PROXMOX_TOKEN_NAME must be in the format 'user@realm!tokenid'"
+        )
+
+    log_event(f"[Proxmox] Connecting to {host}:{port} as {user} with token '{token_name}'")
+
+    return ProxmoxAPI(
+        host,
+        port=int(port),
+        user=user,
+        token_name=token_name,
+        token_value=PROXMOX_TOKEN_VALUE,
+        verify_ssl=PROXMOX_VERIFY_SSL
+    )
+
+
+# =====================
+# JFA-GO HELPERS
+# =====================
+
+async def refresh_jfa_token() -> bool:
+    """
+    Authenticate to JFA-Go with username/password (Basic auth) against /token/login,
+    write the returned token to .env (JFA_TOKEN and JFA_API_KEY), and reload env.
+    Returns True on success.
+    """
+    global JFA_TOKEN, JFA_API_KEY
+
+    if not (JFA_URL and JFA_USERNAME and JFA_PASSWORD):
+        print("[JFA] Missing JFA_URL/JFA_USERNAME/JFA_PASSWORD in environment.")
+        return False
+
+    headers = {"accept": "application/json"}
+
+    try:
+        # Let aiohttp build the Basic header
+        r = await jfa_http.get(
+            "/token/login", auth=aiohttp.BasicAuth(JFA_USERNAME, JFA_PASSWORD), headers=headers
+        )
+
+        if r.status_code != 200:
+            print(f"[JFA] token login failed: {r.status_code} - {r.text}")
+            return False
+
+        data = r.json() if r.text else {}
+        # try common token fields
+        token = (
+            data.get("token")
+            or data.get("access_token")
+            or data.get("jwt")
+            or data.get("api_key")
+            or data.get("data")  # sometimes nested
+        )
+
+        # If API returns {"token": "<token>"} -> good. If it returns a wrapped structure,
+        # try to handle a couple of other shapes:
+        if not token:
+            # if response is {'success': True} or {'invites':...} then no token present
+            # print for debugging
+            print("[JFA] token not found in response JSON:", data)
+            return False
+
+        # Persist token to .env under both names (compatibility)
+        _update_env_key("JFA_TOKEN", token)
+        _update_env_key("JFA_API_KEY", token)
+
+        # Update in-memory values and reload env
+        JFA_TOKEN = token
+        JFA_API_KEY = token
+        load_dotenv(override=True)
+
+        # Other instances may run on other hosts; they pick the token up from the database
+        if MULTI_INSTANCE:
+            await async_set_metadata("jfa_token", token)
+
+        print("[JFA] Successfully refreshed token and updated .env")
+        return True
+
+    except Exception as e:
+        print(f"[JFA] Exception while refreshing token: {e}", exc_info=True)
+        return False
+
+async def load_shared_jfa_token() -> bool:
+    """Adopt a token the leader refreshed. Returns True if it differs from the one in use."""
+    global JFA_TOKEN, JFA_API_KEY
+    if not MULTI_INSTANCE:
+        return False
+    try:
+        token = await async_get_metadata("jfa_token")
+    except Exception as e:
+        print(f"[JFA] Failed to read the shared token: {e}")
+        return False
+    if not token or token == JFA_API_KEY:
+        return False
+    JFA_TOKEN = JFA_API_KEY = token
+    return True
+
+async def jfa_request(method: str, path: str, **kwargs) -> HTTPResponse:
+    """Call JFA-Go with the Bearer token, falling back to X-Api-Key on 401."""
+    r = await jfa_http.request(method, path, headers={"Authorization": f"Bearer {JFA_API_KEY}"}, **kwargs)
+    if r.status_code == 401:
+        r = await jfa_http.request(method, path, headers={"X-Api-Key": JFA_API_KEY}, **kwargs)
+    if r.status_code == 401 and await load_shared_jfa_token():
+        return await jfa_request(method, path, **kwargs)
+    return r
+
+# =====================
+# DISCORD HELPERS
+# =====================
+
+REQUIRED_ROLE_SET = frozenset(REQUIRED_ROLE_IDS)
+ADMIN_ROLE_SET = frozenset(ADMIN_ROLE_IDS)
+
+
+class RoleIndex:
+    """
+    user_id -> guild IDs where the member holds a required / admin role.
+    Built from the member cache on ready and kept current from member and role events.
+    """
+
+    def __init__(self):
+        self._eligible: dict[int, set[int]] = {}
+        self._admin: dict[int, set[int]] = {}
+        self.ready = False
+
+    @staticmethod
+    def _set_flag(index: dict[int, set[int]], user_id: int, guild_id: int, enabled: bool):
+        if enabled:
+            index.setdefault(user_id, set()).add(guild_id)
+        else:
+            guilds = index.get(user_id)
+            if guilds:
+                guilds.discard(guild_id)
+                if not guilds:
+                    del index[user_id]
+
+    def update_member(self, member: discord.Member):
+        role_ids = {role.id for role in member.roles}
+        guild_id = member.guild.id
+        self._set_flag(self._eligible, member.id, guild_id, not REQUIRED_ROLE_SET.isdisjoint(role_ids))
+        self._set_flag(self._admin, member.id, guild_id, not ADMIN_ROLE_SET.isdisjoint(role_ids))
+
+    def remove_member(self, guild_id: int, user_id: int):
+        self._set_flag(self._eligible, user_id, guild_id, False)
+        self._set_flag(self._admin, user_id, guild_id, False)
+
+    def rebuild_guild(self, guild: discord.Guild):
+        for index in (self._eligible, self._admin):
+            for user_id in [uid for uid, guilds in index.items() if guild.id in guilds]:
+                self._set_flag(index, user_id, guild.id, False)
+        for member in guild.members:
+            self.update_member(member)
+
+    def rebuild(self):
+        self._eligible.clear()
+        self._admin.clear()
+        for gid in GUILD_IDS:
+            guild = bot.get_guild(gid)
+            if guild:
+                self.rebuild_guild(guild)
+        self.ready = True
+        log_event(f"Role index built: {len(self._eligible)} eligible, {len(self._admin)} admin users")
+
+    def is_eligible(self, user_id: int) -> bool:
+        return user_id in self._eligible
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self._admin
+
+    def eligible_ids(self) -> set[int]:
+        return set(self._eligible)
+
+
+role_index = RoleIndex()
+
+
+def _scan_roles(user_id: int, role_ids: frozenset) -> bool:
+    """Slow path used only until the role index has been built."""
+    for gid in GUILD_IDS:
+        guild = bot.get_guild(gid)
+        if not guild:
+            continue
+        member = guild.get_member(user_id)
+        if member and any(role.id in role_ids for role in member.roles):
+            return True
+    return False
+
+
+def has_required_role(user: discord.abc.Snowflake) -> bool:
+    """Check if the user has any of the required roles across all configured guilds."""
+    if role_index.ready:
+        return role_index.is_eligible(user.id)
+    return _scan_roles(user.id, REQUIRED_ROLE_SET)
+
+
+def has_admin_role(user: discord.abc.Snowflake) -> bool:
+    """Check if the user has any of the admin roles across all configured guilds."""
+    if role_index.ready:
+        return role_index.is_admin(user.id)
+    return _scan_roles(user.id, ADMIN_ROLE_SET)
+
+
+# =====================
+# DEPROVISIONING
+# =====================
+@dataclass
+class DeprovisionResult:
+    """Outcome of a deprovisioning run, with per-step wall-clock timings in seconds."""
+    removed: list[str] = field(default_factory=list)
+    failed: list[tuple[str, str]] = field(default_factory=list)  # (label, step)
+    skipped: list[str] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        parts = [f"🧹 Removed {len(self.removed)} Jellyfin accounts"]
+        if self.removed:
+            parts[0] += f": {', '.join(self.removed)}"
+        if self.failed:
+            parts.append(f"⚠️ Failed {len(self.failed)}: " + ", ".join(f"{label} ({step})" for label, step in self.failed))
+        if self.skipped:
+            parts.append(f"⏭️ Skipped {len(self.skipped)}")
+        parts.append(f"⏱️ {self.timings.get('total', 0):.1f}s")
+        return "\n".join(parts)
+
+
+async def _retry_step(step: str, label: str, func, *args) -> bool:
+    """Run a deprovisioning step, retrying with exponential backoff on failure or exception."""
+    for attempt in range(1, CLEANUP_RETRIES + 1):
+        try:
+            if await func(*args):
+                return True
+            log_event(f"[Cleanup] {step} step failed for {label} (attempt {attempt}/{CLEANUP_RETRIES})")
+        except Exception as e:
+            print(f"[Cleanup] {step} step error for {label} (attempt {attempt}/{CLEANUP_RETRIES}): {e}")
+        if attempt < CLEANUP_RETRIES:
+            await asyncio.sleep(2 ** (attempt - 1))
+    return False
+
+
+async def deprovision_accounts(accounts) -> DeprovisionResult:
+    """
+    Remove (discord_id, jellyfin_username, jellyseerr_id) accounts from Jellyfin, the
+    database and Jellyseerr. Upstream deletes run CLEANUP_CONCURRENCY at a time and the
+    DB rows go in one batched DELETE. Accounts whose Jellyfin delete fails keep their DB
+    row so the next run retries them.
+    """
+    result = DeprovisionResult()
+    start = time.monotonic()
+    jellyfin_slots = asyncio.Semaphore(CLEANUP_CONCURRENCY)
+    jellyseerr_slots = asyncio.Semaphore(CLEANUP_CONCURRENCY)
+
+    targets = []
+    for discord_id, jf_username, js_id in accounts:
+        label = jf_username or str(discord_id)
+        if has_required_role(discord.Object(id=discord_id)):
+            result.skipped.append(label)  # Regained access since being selected
+        else:
+            targets.append((discord_id, jf_username, js_id, label))
+
+    # --- Jellyfin ---
+    async def delete_from_jellyfin(target):
+        discord_id, jf_username, js_id, label = target
+        if not jf_username:
+            return True
+        async with jellyfin_slots:
+            return await _retry_step("jellyfin", label, delete_jellyfin_user, jf_username)
+
+    step_start = time.monotonic()
+    outcomes = await asyncio.gather(*(delete_from_jellyfin(t) for t in targets))
+    result.timings["jellyfin"] = time.monotonic() - step_start
+
+    deletable = []
+    for target, ok in zip(targets, outcomes):
+        if ok:
+            deletable.append(target)
+        else:
+            result.failed.append((target[3], "jellyfin"))
+
+    # --- Database (batched) ---
+    step_start = time.monotonic()
+    if deletable and await _retry_step(
+        "database", f"{len(deletable)} accounts", async_delete_accounts, [t[0] for t in deletable]
+    ):
+        result.removed.extend(t[3] for t in deletable)
+    else:
+        result.failed.extend((t[3], "database") for t in deletable)
+        deletable = []
+    result.timings["database"] = time.monotonic() - step_start
+
+    # --- Jellyseerr ---
+    async def delete_from_jellyseerr(target):
+        discord_id, jf_username, js_id, label = target
+        async with jellyseerr_slots:
+            if not await _retry_step("jellyseerr", label, delete_jellyseerr_user, js_id):
+                result.failed.append((label, "jellyseerr"))
+
+    step_start = time.monotonic()
+    if JELLYSEERR_ENABLED:
+        await asyncio.gather(*(delete_from_jellyseerr(t) for t in deletable if t[2]))
+    result.timings["jellyseerr"] = time.monotonic() - step_start
+
+    result.timings["total"] = time.monotonic() - start
+    log_event(
+        f"[Cleanup] Deprovisioned {len(result.removed)} accounts, {len(result.failed)} failures, "
+        f"{len(result.skipped)} skipped in {result.timings['total']:.2f}s"
+    )
+    return result
+
+
+async def run_account_cleanup() -> DeprovisionResult:
+    """Deprovision every linked account whose owner no longer holds a required role."""
+    targets, pending = [], []
+    for discord_id, jf_username, jf_id, js_id in await async_get_accounts():
+        if discord_id in _pending_revocations:
+            pending.append(jf_username or str(discord_id))  # Already queued by a member event
+        elif not has_required_role(discord.Object(id=discord_id)):
+            targets.append((discord_id, jf_username, js_id))
+
+    with CLEANUP_DURATION.time():
+        result = await deprovision_accounts(targets)
+    ACCOUNTS_REMOVED.inc("cleanup", amount=len(result.removed))
+    result.skipped.extend(pending)
+    return result
+
+
+# =====================
+# ROLE REVOCATION
+# =====================
+# Members who lose their required role (or leave a guild) are queued here and
+# deprovisioned shortly after, instead of waiting for the daily cleanup sweep.
+revocation_queue: asyncio.Queue = asyncio.Queue()
+_pending_revocations: set[int] = set()
+_revocation_worker: asyncio.Task | None = None
+
+
+def queue_revocation(discord_id: int):
+    """Queue a member for a role re-check; duplicates while pending are ignored. Only the leader deprovisions."""
+    if not ROLE_REVOCATION_ENABLED or not leader_election.is_leader or discord_id in _pending_revocations:
+        return
+    _pending_revocations.add(discord_id)
+    revocation_queue.put_nowait((time.monotonic() + ROLE_REVOCATION_DELAY, discord_id))
+    log_event(f"Queued role revocation check for Discord ID {discord_id}")
+
+
+async def process_revocations():
+    """Drain the revocation queue. The grace delay absorbs quick role swaps."""
+    while True:
+        ready_at, discord_id = await revocation_queue.get()
+        try:
+            delay = ready_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            _pending_revocations.discard(discord_id)
+
+            if has_required_role(discord.Object(id=discord_id)):
+                continue
+
+            account = await async_get_account_by_discord(discord_id)
+            if not account:
+                continue
+
+            jf_username, jf_id, js_id = account
+            result = await deprovision_accounts([(discord_id, jf_username, js_id)])
+            ACCOUNTS_REMOVED.inc("revocation", amount=len(result.removed))
+
+            log_channel = bot.get_channel(SYNC_LOG_CHANNEL_ID)
+            if log_channel and (result.removed or result.failed):
+                await log_channel.send(f"<@{discord_id}> lost access\n{result.summary()}")
+        except Exception as e:
+            _pending_revocations.discard(discord_id)
+            print(f"[Revocation] Failed to process Discord ID {discord_id}: {e}")
+        finally:
+            revocation_queue.task_done()
+
+
+def start_revocation_worker():
+    global _revocation_worker
+    if ROLE_REVOCATION_ENABLED and (_revocation_worker is None or _revocation_worker.done()):
+        _revocation_worker = asyncio.create_task(process_revocations())
+
+
+def stop_revocation_worker():
+    """Drop pending checks when leadership moves; the daily cleanup catches anything missed."""
+    global _revocation_worker, revocation_queue
+    if _revocation_worker is not None:
+        _revocation_worker.cancel()
+        _revocation_worker = None
+    revocation_queue = asyncio.Queue()
+    _pending_revocations.clear()
+
+
+# =====================
+# TRIAL EXPIRY
+# =====================
+def _as_utc(dt: datetime.datetime) -> datetime.datetime:
+    """Trial timestamps are stored as naive UTC."""
+    return pytz.utc.localize(dt) if dt.tzinfo is None else dt.astimezone(pytz.utc)
+
+
+class TrialExpiryScheduler:
+    """
+    Min-heap of (deadline, discord_id, username) for unexpired trials.
+    Loaded once at startup, pushed to when trials are created, and each trial is
+    removed at its own deadline instead of on the next daily cleanup.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, str]] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def schedule(self, discord_id: int, username: str, created_at: datetime.datetime):
+        deadline = _as_utc(created_at) + datetime.timedelta(hours=TRIAL_TIME)
+        heapq.heappush(self._heap, (deadline.timestamp(), discord_id, username))
+        self._wakeup.set()
+
+    async def reload(self):
+        """Rebuild the heap from the database (startup and daily reconciliation)."""
+        trials = await async_get_active_trials()
+        heap = []
+        for trial in trials:
+            created_at = trial.get("trial_created_at")
+            if not created_at:
+                continue
+            deadline = _as_utc(created_at) + datetime.timedelta(hours=TRIAL_TIME)
+            heap.append((deadline.timestamp(), trial["discord_id"], trial.get("jellyfin_username")))
+        heapq.heapify(heap)
+        self._heap = heap
+        self._wakeup.set()
+        log_event(f"[Trial] Scheduled {len(heap)} pending trial expirations")
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                # Cap the sleep so wall-clock jumps are picked up within the hour
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, 3600))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            deadline, discord_id, username = heapq.heappop(self._heap)
+            try:
+                await self._expire(discord_id, username)
+            except Exception as e:
+                print(f"[Trial Cleanup] Error expiring trial {username}, retrying in 5 minutes: {e}")
+                heapq.heappush(self._heap, (time.time() + 300, discord_id, username))
+
+    async def _expire(self, discord_id: int, username: str):
+        if username and not await _retry_step("jellyfin", username, delete_jellyfin_user, username):
+            raise RuntimeError("Jellyfin delete failed")
+        await async_mark_trial_expired(discord_id)
+        ACCOUNTS_REMOVED.inc("trial_expiry")
+        log_event(f"Trial account {username} for Discord ID {discord_id} expired")
+
+        log_channel = bot.get_channel(SYNC_LOG_CHANNEL_ID)
+        if log_channel:
+            await log_channel.send(f"⌛ Trial Jellyfin account **{username}** expired and was removed.")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def __len__(self):
+        return len(self._heap)
+
+
+trial_scheduler = TrialExpiryScheduler()
+
+
+# =====================
+# ACCOUNT PROVISIONING
+# =====================
+# createaccount / trialaccount enqueue a job in MySQL and reply right away; workers
+# then run the steps (Jellyfin user -> Jellyseerr import -> DB record), saving each
+# result on the job so a retry skips what already succeeded. Passwords are kept in
+# memory only: a job that still needs one after its instance restarts is failed and
+# the user is asked to run the command again.
+
+class ProvisioningFailed(Exception):
+    """A step failed in a way retrying won't fix."""
+
+
+class ProvisioningQueue:
+    def __init__(self, workers: int, max_attempts: int, poll_interval: float):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._passwords: dict[int, str] = {}
+        self._reply_channels: dict[int, discord.abc.Messageable] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._token_prefix = INSTANCE_ID
+
+    async def submit(self, kind: str, discord_id: int, username: str, password: str, channel) -> int | None:
+        """Queue a job; None means this user or username already has one in flight."""
+        job_id = await async_enqueue_provisioning_job(kind, discord_id, username)
+        if job_id is None:
+            return None
+        self._passwords[job_id] = password
+        self._reply_channels[job_id] = channel
+        self._wakeup.set()
+        return job_id
+
+    def start(self):
+        self._tasks = [t for t in self._tasks if not t.done()]
+        for n in range(len(self._tasks), self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(n)))
+
+    async def recover(self):
+        """
+        Take back jobs whose instance is gone (restarted or crashed): re-queue those past the
+        Jellyfin step and fail those that still need the password that instance held.
+        """
+        alive = {INSTANCE_ID: True}
+        for job in await run_db(get_unfinished_provisioning_jobs):
+            if job["status"] == "running":
+                owner = (job["claimed_by"] or "").split(":", 1)[0]
+            elif job["jellyfin_id"]:
+                continue  # Any instance can pick it up
+            else:
+                owner = job["submitted_by"]
+            if owner not in alive:
+                alive[owner] = await run_db(instance_alive, owner)
+            if alive[owner]:
+                continue
+            if job["jellyfin_id"]:
+                await run_db(requeue_provisioning_job, job["id"])
+            else:
+                await self._fail(job, "The bot restarted before your account was created. Please run the command again.")
+
+    async def drain(self, timeout: float = 300):
+        """Wait until no job is pending or running (used by the benchmarks)."""
+        deadline = time.monotonic() + timeout
+        while await run_db(count_unfinished_provisioning_jobs):
+            if time.monotonic() > deadline:
+                raise TimeoutError("Provisioning queue did not drain")
+            await asyncio.sleep(0.05)
+
+    async def _worker(self, n: int):
+        while True:
+            try:
+                self._wakeup.clear()
+                token = f"{self._token_prefix}:{n}:{uuid.uuid4().hex[:12]}"
+                job = await run_db(claim_provisioning_job, token)
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Provisioning] Worker {n} error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, job: dict):
+        try:
+            warning = await self._process(job)
+        except ProvisioningFailed as e:
+            await self._fail(job, str(e))
+            return
+        except Exception as e:
+            attempts = job["attempts"] + 1
+            if attempts >= self.max_attempts:
+                await self._fail(
+                    job,
+                    f"Failed to create Jellyfin account **{job['jellyfin_username']}**. Please contact an admin.",
+                    error=f"Gave up after {attempts} attempts: {e}"
+                )
+                return
+            delay = min(300, 5 * 2 ** (attempts - 1))
+            log_event(f"[Provisioning] Job {job['id']} attempt {attempts} failed, retrying in {delay}s: {e}")
+            await run_db(retry_provisioning_job, job["id"], attempts, delay, str(e)[:1000])
+            return
+
+        await async_finish_provisioning_job(job["id"], "done")
+        self._passwords.pop(job["id"], None)
+        username = job["jellyfin_username"]
+        if job["kind"] == "trial":
+            msg = f"✅ Trial Jellyfin account **{username}** created! It will expire in {TRIAL_TIME} hours.\n🌐 Login here: {JELLYFIN_URL}"
+            log_event(f"Trial account created for Discord ID {job['discord_id']} ({username})")
+        elif warning:
+            msg = f"⚠️ Jellyfin account **{username}** created, but Jellyseerr import failed.\n🌐 Login here: {JELLYFIN_URL}"
+        elif JELLYSEERR_ENABLED:
+            msg = f"✅ Jellyfin account **{username}** created and imported into Jellyseerr!\n🌐 Login here: {JELLYFIN_URL}"
+        else:
+            msg = f"✅ Jellyfin account **{username}** created!\n🌐 Login here: {JELLYFIN_URL}"
+        await self._notify(job, msg)
+
+    async def _process(self, job: dict) -> bool:
+        """Run the remaining steps; returns True if the Jellyseerr import was skipped."""
+        job_id, username = job["id"], job["jellyfin_username"]
+
+        # 1. Jellyfin user
+        if not job["jellyfin_id"]:
+            password = self._passwords.get(job_id)
+            if password is None:
+                raise ProvisioningFailed("The bot restarted before your account was created. Please run the command again.")
+            jf_id = await jellyfin_directory.lookup(username)
+            if job["create_attempted"] and jf_id is None:
+                # An earlier attempt may have created the user without us seeing the response
+                await jellyfin_directory.refresh()
+                jf_id = await jellyfin_directory.lookup(username, refresh_on_miss=False)
+            if jf_id is None:
+                job["create_attempted"] = True
+                await async_update_provisioning_job(job_id, create_attempted=True)
+                if not await create_jellyfin_user(username, password):
+                    # Jellyfin answered and refused, so nothing under this name is ours to adopt or delete
+                    job["create_attempted"] = False
+                    await async_update_provisioning_job(job_id, create_attempted=False)
+                    raise ProvisioningFailed(f"Failed to create Jellyfin account **{username}**. It may already exist.")
+                jf_id = await get_jellyfin_user(username)
+                if not jf_id:
+                    raise RuntimeError("Created Jellyfin user not found")
+            elif not job["create_attempted"]:
+                raise ProvisioningFailed(f"Failed to create Jellyfin account **{username}**. It may already exist.")
+            job["jellyfin_id"] = jf_id
+            await async_update_provisioning_job(job_id, jellyfin_id=jf_id)
+            self._passwords.pop(job_id, None)
+
+        # 2. Jellyseerr import (regular accounts only); a lasting failure only downgrades to a warning
+        skipped_import = False
+        if job["kind"] == "account" and JELLYSEERR_ENABLED and not job["jellyseerr_id"]:
+            js_id = await import_jellyseerr_user(job["jellyfin_id"])
+            if js_id is not None:
+                job["jellyseerr_id"] = str(js_id)
+                await async_update_provisioning_job(job_id, jellyseerr_id=job["jellyseerr_id"])
+            elif job["attempts"] + 1 < self.max_attempts:
+                raise RuntimeError("Jellyseerr import failed")
+            else:
+                skipped_import = True
+
+        # 3. Link the account
+        if job["kind"] == "trial":
+            if not await async_get_trial_account(job["discord_id"]):
+                # Schedule from the stored timestamp so every instance and reload() agree on the deadline
+                created_at = await async_add_trial_account(job["discord_id"], username, job["jellyfin_id"])
+                trial_scheduler.schedule(job["discord_id"], username, created_at or datetime.datetime.utcnow())
+        else:
+            await async_add_account(job["discord_id"], username, job["jellyfin_id"], job["jellyseerr_id"])
+        return skipped_import
 
-    except Exception as e:
-        print(f"[Sonarr] Exception: {e}")
-        return None
-    
-def sonarr_get_latest_series(count=5):
-    """Return the latest added series from Sonarr."""
-    series = sonarr_get_series()
-    if not series:
-        return None
+    async def _fail(self, job: dict, reason: str, error: str | None = None):
+        """Mark the job failed and tell the user `reason`; `error` is what gets stored and logged."""
+        # Undo a Jellyfin user this job created (or may have created) but never linked
+        if job.get("jellyfin_id") or job.get("create_attempted"):
+            try:
+                if not job.get("jellyfin_id"):
+                    # The create may have succeeded unseen, so the directory can't have it yet
+                    await jellyfin_directory.refresh()
+                await delete_jellyfin_user(job["jellyfin_username"])
+            except Exception as e:
+                print(f"[Provisioning] Failed to remove Jellyfin user {job['jellyfin_username']}: {e}")
+        error = error or reason
+        await async_finish_provisioning_job(job["id"], "failed", error[:1000])
+        self._passwords.pop(job["id"], None)
+        print(f"[Provisioning] Job {job['id']} for {job['jellyfin_username']} failed: {error}")
+        await self._notify(job, f"❌ {reason}")
+
+    async def _notify(self, job: dict, msg: str):
+        channel = self._reply_channels.pop(job["id"], None)
+        try:
+            if channel is None:
+                channel = bot.get_user(job["discord_id"]) or await bot.fetch_user(job["discord_id"])
+            await channel.send(msg)
+        except Exception as e:
+            print(f"[Provisioning] Could not DM Discord ID {job['discord_id']}: {e}")
 
-    # Sonarr tracks `added` timestamps too
-    sorted_series = sorted(
-        series,
-        key=lambda s: s.get("added", ""),
-        reverse=True
-    )
 
-    return sorted_series[:count]
-    
-# =====================
-# QBITTORRENT HELPERS
-# =====================
+provisioning = ProvisioningQueue(PROVISION_WORKERS, PROVISION_MAX_ATTEMPTS, PROVISION_POLL_SECONDS)
 
-def progress_bar(progress: float, length: int = 20) -> str:
-    """Return a textual progress bar for the embed."""
-    filled_length = int(length * progress)
-    bar = '█' * filled_length + '░' * (length - filled_length)
-    return f"[{bar}] {progress*100:.2f}%"
 
 # =====================
-# PROXMOX HELPERS
+# BACKUPS
 # =====================
+# Backups run in a worker thread. Table rows are streamed from a server-side
+# cursor, so the dump is never held in memory or written to a temporary file.
+# Full backups write multi-row INSERTs straight into a zip entry. Incremental
+# backups split files and table rows into chunks stored once under their SHA-256
+# in BACKUP_STORE_DIR, plus a small JSON manifest per backup listing the chunks.
+
+class ProgressReporter:
+    """Edits one status message from a worker thread, at most every `interval` seconds."""
+
+    def __init__(self, message: discord.Message, prefix: str, interval: float = BACKUP_PROGRESS_SECONDS):
+        self.message = message
+        self.prefix = prefix
+        self.interval = interval
+        self._loop = asyncio.get_running_loop()
+        self._last = 0.0
+
+    def __call__(self, text: str):
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return
+        self._last = now
+        asyncio.run_coroutine_threadsafe(self._edit(f"{self.prefix} {text}"), self._loop)
 
-def get_proxmox_client():
-    """Create and return a Proxmox client using API token auth."""
-    if not (PROXMOX_HOST and PROXMOX_TOKEN_NAME and PROXMOX_TOKEN_VALUE):
-        raise ValueError("Proxmox API credentials are not fully configured in .env")
+    async def _edit(self, content: str):
+        try:
+            await self.message.edit(content=content)
+        except discord.HTTPException as e:
+            print(f"[Progress] Failed to update status message: {e}")
 
-    # Parse host + port safely
-    base_host = PROXMOX_HOST.replace("https://", "").replace("http://", "")
-    if ":" in base_host:
-        host, port = base_host.split(":")
-    else:
-        host, port = base_host, 8006  # default Proxmox port
 
-    # Split token into user + token name
-    try:
-        user, token_name = PROXMOX_TOKEN_NAME.split("!")
-    except ValueError:
-        raise ValueError(
-            "❌ PROXMOX_TOKEN_NAME must be in the format 'user@realm!tokenid'"
-        )
+def _sql_literal(value) -> str:
+    return pymysql.converters.escape_item(value, "utf8mb4")
 
-    log_event(f"[Proxmox] Connecting to {host}:{port} as {user} with token '{token_name}'")
 
-    return ProxmoxAPI(
-        host,
-        port=int(port),
-        user=user,
-        token_name=token_name,
-        token_value=PROXMOX_TOKEN_VALUE,
-        verify_ssl=PROXMOX_VERIFY_SSL
+def stream_tables(stats: dict, progress, batch_rows: int = BACKUP_ROWS_PER_INSERT):
+    """
+    Yield (table, create_stmt, columns, batches) for every table, all read from one snapshot.
+    `batches` yields lists of row literals and must be consumed before the next table.
+    """
+    conn = pymysql.connect(
+        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME,
+        charset="utf8mb4", cursorclass=pymysql.cursors.SSCursor
     )
+    try:
+        with conn.cursor() as cur:
+            # One consistent view of every table without blocking the bot's writes
+            cur.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+            cur.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE'")
+            tables = [row[0] for row in cur.fetchall()]
 
+            for table in tables:
+                cur.execute(f"SHOW CREATE TABLE `{table}`")
+                create_stmt = cur.fetchall()[0][1]
+                cur.execute(f"SELECT * FROM `{table}`")
+                columns = [desc[0] for desc in cur.description]
+
+                def batches(table=table):
+                    while True:
+                        rows = cur.fetchmany(batch_rows)
+                        if not rows:
+                            break
+                        stats["rows"] += len(rows)
+                        progress(f"Dumping `{table}` ({stats['tables'] + 1}/{len(tables)} tables, {stats['rows']:,} rows)")
+                        yield ["(" + ", ".join(_sql_literal(v) for v in row) + ")" for row in rows]
+
+                yield table, create_stmt, columns, batches()
+                stats["tables"] += 1
+        conn.rollback()
+    finally:
+        conn.close()
 
-# =====================
-# JFA-GO HELPERS
-# =====================
 
-def refresh_jfa_token() -> bool:
+def dump_database(out, stats: dict, progress) -> list[dict]:
     """
-    Authenticate to JFA-Go with username/password (Basic auth) against /token/login,
-    write the returned token to .env (JFA_TOKEN and JFA_API_KEY), and reload env.
-    Returns True on success.
+    Write every table to the text stream `out` as CREATE TABLE plus multi-row INSERTs.
+    Returns [{"name", "rows"}] for the backup manifest.
     """
-    global JFA_TOKEN, JFA_API_KEY
+    tables = []
+    for table, create_stmt, columns, batches in stream_tables(stats, progress):
+        out.write(f"-- Table structure for `{table}`\n{create_stmt};\n\n")
+        column_list = ", ".join(f"`{c}`" for c in columns)
+        rows_before = stats["rows"]
+        for rows in batches:
+            out.write(f"INSERT INTO `{table}` ({column_list}) VALUES\n" + ",\n".join(rows) + ";\n")
+        out.write("\n")
+        tables.append({"name": table, "rows": stats["rows"] - rows_before})
+    return tables
+
+
+def _backup_files():
+    for root, _, files in os.walk("."):
+        if root.startswith("./backups"):
+            continue
+        for file in files:
+            yield Path(root) / file
+
+
+def _write_backup(path: Path, progress, include_db: bool) -> dict:
+    stats = {"tables": 0, "rows": 0, "files": 0}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as backup_zip:
+        if include_db:
+            entry = backup_zip.open(f"{DB_NAME}.sql", "w", force_zip64=True)
+            with io.TextIOWrapper(entry, encoding="utf-8") as out:
+                tables = dump_database(out, stats, progress)
+            manifest = {
+                "format": 1,
+                "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "version": BOT_VERSION,
+                "database": {"name": DB_NAME, "tables": tables},
+            }
+            backup_zip.writestr(BACKUP_MANIFEST_ENTRY, json.dumps(manifest))
+
+        for file_path in _backup_files():
+            backup_zip.write(file_path, arcname=file_path.relative_to("."))
+            stats["files"] += 1
+            progress(f"Archiving files ({stats['files']:,} added)")
+    return stats
+
+
+def create_backup(backup_path: Path, progress) -> dict:
+    """
+    Blocking; run it in a thread. Builds the zip under a .partial name and renames it when
+    complete. If the database can't be dumped the archive is rebuilt with files only and
+    the error is returned in stats["db_error"].
+    """
+    partial = backup_path.with_name(backup_path.name + ".partial")
+    try:
+        try:
+            stats = _write_backup(partial, progress, include_db=True)
+        except pymysql.MySQLError as e:
+            print(f"[Backup] Database export failed: {e}")
+            stats = _write_backup(partial, progress, include_db=False)
+            stats["db_error"] = str(e)
+        os.replace(partial, backup_path)
+    finally:
+        partial.unlink(missing_ok=True)
+    stats["size"] = backup_path.stat().st_size
+    return stats
 
-    if not (JFA_URL and JFA_USERNAME and JFA_PASSWORD):
-        print("[JFA] Missing JFA_URL/JFA_USERNAME/JFA_PASSWORD in environment.")
-        return False
 
-    url = JFA_URL.rstrip("/") + "/token/login"
-    headers = {"accept": "application/json"}
+FILE_CHUNK_SIZE = 1024 * 1024
+ROW_CHUNK_MIN, ROW_CHUNK_MAX, ROW_CHUNK_MASK = 32, 4096, 0xFF  # ~290 rows per chunk on average
 
-    try:
-        # Option A: let requests build the Basic header
-        r = requests.get(url, auth=(JFA_USERNAME, JFA_PASSWORD), headers=headers, timeout=10)
 
-        # If you prefer to build the header manually (exactly like your curl), use:
-        # creds = f"{JFA_USERNAME}:{JFA_PASSWORD}".encode()
-        # b64 = base64.b64encode(creds).decode()
-        # headers["Authorization"] = f"Basic {b64}"
-        # r = requests.get(url, headers=headers, timeout=10)
+class ChunkStore:
+    """zlib-compressed blobs stored once under the SHA-256 of their content."""
 
-        if r.status_code != 200:
-            print(f"[JFA] token login failed: {r.status_code} - {r.text}")
-            return False
+    def __init__(self, root: Path):
+        self.root = root
 
-        data = r.json() if r.text else {}
-        # try common token fields
-        token = (
-            data.get("token")
-            or data.get("access_token")
-            or data.get("jwt")
-            or data.get("api_key")
-            or data.get("data")  # sometimes nested
-        )
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
 
-        # If API returns {"token": "<token>"} -> good. If it returns a wrapped structure,
-        # try to handle a couple of other shapes:
-        if not token:
-            # if response is {'success': True} or {'invites':...} then no token present
-            # print for debugging
-            print("[JFA] token not found in response JSON:", data)
-            return False
+    def has(self, digest: str) -> bool:
+        return self._path(digest).exists()
 
-        # Persist token to .env under both names (compatibility)
-        _update_env_key("JFA_TOKEN", token)
-        _update_env_key("JFA_API_KEY", token)
+    def put(self, data: bytes) -> tuple[str, bool]:
+        """Store `data`; returns (digest, True if it wasn't stored yet)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if path.exists():
+            return digest, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{digest}.{os.getpid()}.tmp")
+        tmp.write_bytes(zlib.compress(data, 6))
+        os.replace(tmp, path)
+        return digest, True
 
-        # Update in-memory values and reload env
-        JFA_TOKEN = token
-        JFA_API_KEY = token
-        load_dotenv(override=True)
+    def get(self, digest: str) -> bytes:
+        data = zlib.decompress(self._path(digest).read_bytes())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Backup chunk {digest} is corrupt")
+        return data
 
-        print("[JFA] Successfully refreshed token and updated .env")
-        return True
+    def gc(self, referenced: set[str]) -> int:
+        """Delete chunks no manifest refers to any more."""
+        removed = 0
+        for path in self.root.glob("*/*"):
+            if path.name not in referenced:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def _row_chunks(batches):
+    """
+    Group row literals (one per line) into chunks. Boundaries depend on row content, not
+    position, so inserting or deleting a row only changes the chunk around it.
+    """
+    chunk = []
+    for rows in batches:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= ROW_CHUNK_MAX or (
+                len(chunk) >= ROW_CHUNK_MIN and zlib.crc32(row.encode()) & ROW_CHUNK_MASK == 0
+            ):
+                yield ("\n".join(chunk) + "\n").encode()
+                chunk = []
+    if chunk:
+        yield ("\n".join(chunk) + "\n").encode()
+
+
+def load_manifests() -> tuple[list[dict], list[str]]:
+    """Every readable incremental backup manifest, oldest first, and the names of those that weren't."""
+    manifests, unreadable = [], []
+    for path in BACKUP_MANIFEST_DIR.glob("*.json"):
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+            # A manifest missing the fields GC and listing read is as unusable as a truncated one
+            manifest["created_at"]
+            all(isinstance(chunk, str) for chunk in manifest_chunks(manifest))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[Backup] Skipping unreadable manifest {path.name}: {e}")
+            unreadable.append(path.name)
+            continue
+        manifests.append(manifest)
+    manifests.sort(key=lambda m: m["created_at"])
+    return manifests, unreadable
+
+
+def create_incremental_backup(name: str, progress) -> dict:
+    """Blocking; run it in a thread. Stores only chunks no earlier backup has and writes `name`'s manifest."""
+    store = ChunkStore(BACKUP_STORE_DIR)
+    manifests, unreadable = load_manifests()
+    previous = {f["path"]: f for f in manifests[-1]["files"]} if manifests else {}
+    stats = {"tables": 0, "rows": 0, "files": 0, "chunks": 0, "new_chunks": 0, "new_bytes": 0}
+
+    def put(data: bytes) -> str:
+        digest, new = store.put(data)
+        stats["chunks"] += 1
+        if new:
+            stats["new_chunks"] += 1
+            stats["new_bytes"] += len(data)
+        return digest
+
+    database = None
+    try:
+        tables = []
+        for table, create_stmt, columns, batches in stream_tables(stats, progress):
+            rows_before = stats["rows"]
+            chunks = [put(data) for data in _row_chunks(batches)]
+            tables.append({
+                "name": table, "create": create_stmt, "columns": columns,
+                "rows": stats["rows"] - rows_before, "chunks": chunks,
+            })
+        database = {"name": DB_NAME, "tables": tables}
+    except pymysql.MySQLError as e:
+        print(f"[Backup] Database export failed: {e}")
+        stats["db_error"] = str(e)
+
+    files = []
+    for file_path in _backup_files():
+        rel = file_path.relative_to(".").as_posix()
+        st = file_path.stat()
+        prev = previous.get(rel)
+        # Unchanged size and mtime: reuse the previous chunk list without reading the file
+        if prev and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns and all(map(store.has, prev["chunks"])):
+            chunks = prev["chunks"]
+            stats["chunks"] += len(chunks)
+        else:
+            chunks = []
+            with open(file_path, "rb") as f:
+                while data := f.read(FILE_CHUNK_SIZE):
+                    chunks.append(put(data))
+        files.append({"path": rel, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "mode": st.st_mode & 0o777, "chunks": chunks})
+        stats["files"] += 1
+        progress(f"Chunking files ({stats['files']:,} done, {stats['new_chunks']:,} new chunks)")
+
+    manifest = {
+        "format": 1,
+        "name": name,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "version": BOT_VERSION,
+        "files": files,
+        "database": database,
+        "stats": stats,
+    }
+    BACKUP_MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    path = BACKUP_MANIFEST_DIR / f"{name}.json"
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, path)
+
+    # Chunks only referenced by manifests that were deleted by hand. A manifest we couldn't
+    # read may still point at any chunk, so collect nothing until it is readable (or removed)
+    if unreadable:
+        print(f"[Backup] Skipping chunk cleanup: unreadable manifest(s) {', '.join(unreadable)}")
+        stats["removed_chunks"] = 0
+        return stats
+    referenced = set()
+    for m in manifests + [manifest]:
+        referenced.update(manifest_chunks(m))
+    stats["removed_chunks"] = store.gc(referenced)
+    return stats
+
+
+def manifest_chunks(manifest: dict):
+    for entry in manifest["files"]:
+        yield from entry["chunks"]
+    for table in (manifest["database"] or {}).get("tables", []):
+        yield from table["chunks"]
+
+
+def materialize_files(manifest: dict, dest: Path):
+    """Rebuild the backed-up files of `manifest` under `dest`."""
+    store = ChunkStore(BACKUP_STORE_DIR)
+    for entry in manifest["files"]:
+        target = dest / entry["path"]
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as f:
+            for digest in entry["chunks"]:
+                f.write(store.get(digest))
+        os.chmod(target, entry["mode"])
+
+
+def manifest_sql_statements(manifest: dict, rows_per_insert: int = BACKUP_ROWS_PER_INSERT):
+    """CREATE TABLE and multi-row INSERT statements that rebuild the manifest's database."""
+    store = ChunkStore(BACKUP_STORE_DIR)
+    for table in manifest["database"]["tables"]:
+        yield table["create"]
+        column_list = ", ".join(f"`{c}`" for c in table["columns"])
+        for digest in table["chunks"]:
+            rows = store.get(digest).decode("utf-8").rstrip("\n").split("\n")
+            for i in range(0, len(rows), rows_per_insert):
+                yield f"INSERT INTO `{table['name']}` ({column_list}) VALUES " + ", ".join(rows[i:i + rows_per_insert])
 
-    except Exception as e:
-        print(f"[JFA] Exception while refreshing token: {e}", exc_info=True)
-        return False
 
 # =====================
-# DISCORD HELPERS
+# RESTORE
 # =====================
-
-def has_required_role(user: discord.User | discord.Member) -> bool:
-    """Check if the user has any of the required roles across all configured guilds."""
-    for gid in GUILD_IDS:
-        guild = bot.get_guild(gid)
-        if not guild:
+# Dumps are read statement by statement (a tokenizer that understands quotes and
+# comments, so a ';' inside a value is just data) and loaded into staging tables in
+# batched transactions on a worker thread. Row counts are checked against the
+# backup's manifest before the staging tables are swapped in with one RENAME TABLE;
+# until then the live tables are untouched.
+
+class RestoreError(Exception):
+    """The dump couldn't be loaded or didn't match its manifest; live tables were left alone."""
+
+
+_SQL_SPECIAL = re.compile(r"[;'\"`#/-]")
+_SQL_QUOTE_STOP = {"'": re.compile(r"['\\]"), '"': re.compile(r'["\\]'), "`": re.compile(r"`")}
+
+
+def _sql_token_end(buf: str, j: int, eof: bool) -> int | None:
+    """End of the token starting at buf[j] (a _SQL_SPECIAL character), or None if buf ends inside it."""
+    c, n = buf[j], len(buf)
+    if c == ";":
+        return j + 1
+
+    if c in "-/#":
+        if c != "#" and j + 1 >= n:
+            return n if eof else None
+        two = buf[j:j + 2]
+        if c == "#" or two == "--":
+            terminator = "\n"
+        elif two == "/*":
+            terminator = "*/"
+        else:
+            return j + 1  # minus sign or division
+        k = buf.find(terminator, j + 2)
+        if k == -1:
+            return n if eof else None
+        return k + len(terminator)
+
+    # Quoted string or identifier: backslash escapes (not in identifiers) and doubled quotes
+    k = j + 1
+    while True:
+        m = _SQL_QUOTE_STOP[c].search(buf, k)
+        if m is None:
+            return n if eof else None
+        k = m.start()
+        if buf[k] == "\\":
+            if k + 1 >= n and not eof:
+                return None
+            k += 2
             continue
-        member = guild.get_member(user.id)
-        if member and any(role.id in REQUIRED_ROLE_IDS for role in member.roles):
-            return True
-    return False
+        if k + 1 >= n and not eof:
+            return None  # can't tell a closing quote from a doubled one yet
+        if k + 1 < n and buf[k + 1] == c:
+            k += 2
+            continue
+        return k + 1
+
+
+def iter_sql_statements(stream, chunk_size: int = 1 << 16):
+    """Yield the statements of a SQL dump read from a text stream, without leading comments or the ';'."""
+    buf, start, i, code_start = "", 0, 0, None
+    eof = False
+    while True:
+        m = _SQL_SPECIAL.search(buf, i)
+        j = m.start() if m else len(buf)
+        if code_start is None and buf[i:j].strip():
+            code_start = i
+        if m is not None:
+            end = _sql_token_end(buf, j, eof)
+            if end is not None:
+                if buf[j] == ";":
+                    if code_start is not None:
+                        yield buf[code_start:j].strip()
+                    start, code_start = end, None
+                elif code_start is None and not buf.startswith(("--", "/*", "#"), j):
+                    code_start = j
+                i = end
+                continue
+        else:
+            j = len(buf)
+        if eof:
+            break
 
+        # Keep only the unfinished statement and read more
+        data = stream.read(chunk_size)
+        eof = not data
+        shift = start
+        buf = buf[start:] + data
+        start, i = 0, j - shift
+        if code_start is not None:
+            code_start -= shift
 
-def has_admin_role(user: discord.User | discord.Member) -> bool:
-    """Check if the user has any of the admin roles across all configured guilds."""
-    for gid in GUILD_IDS:
-        guild = bot.get_guild(gid)
-        if not guild:
-            continue
-        member = guild.get_member(user.id)
-        if member and any(role.id in ADMIN_ROLE_IDS for role in member.roles):
-            return True
-    return False
+    if code_start is not None and buf[code_start:].strip():
+        yield buf[code_start:].strip()
+
+
+# group "name" is the table; span(1)..end() is the (possibly backticked) identifier to replace
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(`?)(?P<name>[^`\s(]+)\1", re.I)
+_INSERT_INTO = re.compile(r"INSERT\s+(?:IGNORE\s+)?INTO\s+(`?)(?P<name>[^`\s(]+)\1", re.I)
+_DROP_TABLE = re.compile(r"DROP\s+TABLE\s+", re.I)
+_SKIPPED_STATEMENT = re.compile(r"(?:LOCK|UNLOCK)\s+TABLES\b", re.I)
+
+
+def _staging_name(table: str) -> str:
+    return f"{table}__restore"
+
+
+def restore_database(statements, expected_rows: dict | None, progress) -> dict:
+    """
+    Blocking; run it in a thread. Loads `statements` into staging tables, verifies row counts
+    (against `expected_rows` when the backup has a manifest) and swaps them in.
+    Returns {"tables", "rows", "seconds"}; raises RestoreError without touching live tables.
+    """
+    conn = pymysql.connect(
+        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME,
+        charset="utf8mb4", autocommit=False
+    )
+    started = time.monotonic()
+    inserted: dict[str, int] = {}
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE()")
+            existing = {row[0] for row in cur.fetchall()}
+            for table in existing:
+                if table.endswith("__restore") or table.endswith("__old"):
+                    cur.execute(f"DROP TABLE IF EXISTS `{table}`")
+            existing = {t for t in existing if not t.endswith(("__restore", "__old"))}
+
+            pending_rows = 0
+            total_rows = 0
+            for stmt in statements:
+                if m := _INSERT_INTO.match(stmt):
+                    table = m.group("name")
+                    if table not in inserted:
+                        raise RestoreError(f"INSERT into `{table}` before its CREATE TABLE")
+                    count = cur.execute(stmt[:m.start(1)] + f"`{_staging_name(table)}`" + stmt[m.end():])
+                    inserted[table] += count
+                    pending_rows += count
+                    total_rows += count
+                    if pending_rows >= RESTORE_COMMIT_ROWS:
+                        conn.commit()
+                        pending_rows = 0
+                    rate = total_rows / max(time.monotonic() - started, 1e-6)
+                    progress(f"Restoring `{table}` ({len(inserted)} tables, {total_rows:,} rows, {rate:,.0f} rows/s)")
+                elif m := _CREATE_TABLE.match(stmt):
+                    conn.commit()
+                    table = m.group("name")
+                    staging = _staging_name(table)
+                    cur.execute(f"DROP TABLE IF EXISTS `{staging}`")
+                    cur.execute(stmt[:m.start(1)] + f"`{staging}`" + stmt[m.end():])
+                    inserted[table] = 0
+                elif _DROP_TABLE.match(stmt) or _SKIPPED_STATEMENT.match(stmt):
+                    continue  # Staging tables are dropped and created above
+                elif stmt[:4].upper() == "SET ":
+                    cur.execute(stmt)
+                else:
+                    raise RestoreError(f"Unsupported statement in dump: {stmt[:80]}")
+            conn.commit()
+
+            if not inserted:
+                raise RestoreError("The dump contains no tables")
+
+            # Verify before anything live changes
+            for table, count in inserted.items():
+                cur.execute(f"SELECT COUNT(*) FROM `{_staging_name(table)}`")
+                actual = cur.fetchone()[0]
+                expected = count if expected_rows is None else expected_rows.get(table)
+                if actual != count or actual != expected:
+                    raise RestoreError(
+                        f"Row count mismatch for `{table}`: backup has {expected}, loaded {count}, table holds {actual}"
+                    )
+            if expected_rows is not None and set(expected_rows) - set(inserted):
+                missing = ", ".join(sorted(set(expected_rows) - set(inserted)))
+                raise RestoreError(f"Tables listed in the manifest are missing from the dump: {missing}")
+
+            # Swap every table in one atomic RENAME, then drop what was replaced
+            renames = []
+            for table in inserted:
+                if table in existing:
+                    renames.append(f"`{table}` TO `{table}__old`")
+                renames.append(f"`{_staging_name(table)}` TO `{table}`")
+            cur.execute("RENAME TABLE " + ", ".join(renames))
+            for table in existing:
+                cur.execute(f"DROP TABLE IF EXISTS `{table}__old`" if table in inserted else f"DROP TABLE IF EXISTS `{table}`")
+            conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+            with conn.cursor() as cur:
+                for table in inserted:
+                    cur.execute(f"DROP TABLE IF EXISTS `{_staging_name(table)}`")
+        except Exception as e:
+            print(f"[Restore] Failed to drop staging tables: {e}")
+        raise
+    finally:
+        conn.close()
+
+    elapsed = time.monotonic() - started
+    return {"tables": len(inserted), "rows": sum(inserted.values()), "seconds": elapsed}
+
+
+def restore_from_zip(backup_path: str, dest: str, progress) -> dict | None:
+    """Extract the files of a full backup to `dest` and stream its dump into the database (None without a dump)."""
+    with zipfile.ZipFile(backup_path, "r") as zip_ref:
+        names = zip_ref.namelist()
+        sql_name = next((n for n in names if n.endswith(".sql") and "/" not in n), None)
+        expected_rows = None
+        if BACKUP_MANIFEST_ENTRY in names:
+            manifest = json.loads(zip_ref.read(BACKUP_MANIFEST_ENTRY))
+            expected_rows = {t["name"]: t["rows"] for t in manifest["database"]["tables"]}
+        zip_ref.extractall(dest, members=[n for n in names if n not in (sql_name, BACKUP_MANIFEST_ENTRY)])
+
+        if sql_name is None:
+            return None
+        with io.TextIOWrapper(zip_ref.open(sql_name), encoding="utf-8") as dump:
+            return restore_database(iter_sql_statements(dump), expected_rows, progress)
+
+
+def install_restored_files(src: str):
+    """Copy restored files over the working directory."""
+    for item in os.listdir(src):
+        src_path = os.path.join(src, item)
+        dest_path = os.path.join(".", item)
+        if os.path.isdir(src_path):
+            if os.path.exists(dest_path):
+                shutil.rmtree(dest_path)
+            shutil.copytree(src_path, dest_path)
+        else:
+            shutil.copy2(src_path, dest_path)
+
+
+def restore_from_manifest(manifest: dict, dest: str, progress) -> dict | None:
+    """Rebuild the files of an incremental backup under `dest` and load its tables (None without a database)."""
+    materialize_files(manifest, Path(dest))
+    if not manifest["database"]:
+        return None
+    expected_rows = {t["name"]: t["rows"] for t in manifest["database"]["tables"]}
+    return restore_database(manifest_sql_statements(manifest), expected_rows, progress)
 
 
 # =====================
@@ -643,26 +3637,12 @@ def has_admin_role(user: discord.User | discord.Member) -> bool:
 # =====================
 
 def set_metadata(key, value):
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
-    )
-    cur = conn.cursor()
-    cur.execute("""
+    db_execute("""
         REPLACE INTO bot_metadata (key_name, value) VALUES (%s, %s)
     """, (key, str(value)))
-    conn.commit()
-    cur.close()
-    conn.close()
 
 def get_metadata(key):
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
-    )
-    cur = conn.cursor()
-    cur.execute("SELECT value FROM bot_metadata WHERE key_name=%s", (key,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    row = db_execute("SELECT value FROM bot_metadata WHERE key_name=%s", (key,), fetch="one")
     return row[0] if row else None
     
 def _update_env_key(key: str, value: str, env_path: str = ".env"):
@@ -685,47 +3665,6 @@ def _update_env_key(key: str, value: str, env_path: str = ".env"):
         if not found:
             f.write(f"{key}={value}\n")
 
-def export_mysql_db(dump_file):
-    try:
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
-        cursor = conn.cursor()
-
-        with open(dump_file, "w", encoding="utf-8") as f:
-            # Get tables
-            cursor.execute("SHOW TABLES")
-            tables = [row[0] for row in cursor.fetchall()]
-
-            for table in tables:
-                # Dump CREATE statement
-                cursor.execute(f"SHOW CREATE TABLE `{table}`")
-                create_stmt = cursor.fetchone()[1]
-                f.write(f"-- Table structure for `{table}`\n{create_stmt};\n\n")
-
-                # Dump rows
-                cursor.execute(f"SELECT * FROM `{table}`")
-                rows = cursor.fetchall()
-                if rows:
-                    columns = [desc[0] for desc in cursor.description]
-                    for row in rows:
-                        values = ", ".join(
-                            f"'{str(val).replace("'", "''")}'" if val is not None else "NULL"
-                            for val in row
-                        )
-                        f.write(f"INSERT INTO `{table}` ({', '.join(columns)}) VALUES ({values});\n")
-                f.write("\n")
-
-        cursor.close()
-        conn.close()
-        return True
-    except Exception as e:
-        print(f"[Backup] Database export failed: {e}")
-        return False
-
 def sync_env_file():
     """Ensure .env has all fields from .env.example, preserving existing values."""
     if not os.path.exists(DEFAULT_ENV_FILE):
@@ -773,15 +3712,11 @@ def restart_bot():
 def build_payload(enabled: bool):
     return {"value": 1 if enabled else 0}
 
-def promql(query: str):
+async def promql(query: str):
     """Run a PromQL query and return results."""
 
     try:
-        response = requests.get(
-            PROMETHEUS_URL,
-            params={"query": query},
-            timeout=10
-        )
+        response = await prometheus_http.get(PROMETHEUS_URL, params={"query": query})
         data = response.json()
         result = data.get("data", {}).get("result", [])
         return result
@@ -789,14 +3724,105 @@ def promql(query: str):
         print(f"[Prometheus] Error: {e}")
         return None
 
+# =====================
+# SYSTEM STATS
+# =====================
+
+@dataclass(frozen=True, slots=True)
+class SystemSample:
+    at: float
+    cpu: float
+    mem_used: int
+    mem_total: int
+    mem_percent: float
+    disk_used: int
+    disk_total: int
+    disk_percent: float
+
+
+class SystemStatsSampler:
+    """
+    Fixed-size ring buffer of local CPU/memory/disk samples, filled by a background loop
+    so `stats` never blocks on psutil.cpu_percent(interval=...).
+    """
+
+    def __init__(self, interval: int, window: int):
+        self.interval = interval
+        self.window = window
+        self.samples: deque[SystemSample] = deque(maxlen=max(1, window // interval))
+        self.boot_time = psutil.boot_time()
+        psutil.cpu_percent(None)  # prime: the first non-blocking call always returns 0.0
+
+    @staticmethod
+    def _read() -> SystemSample:
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        return SystemSample(
+            at=time.time(),
+            cpu=psutil.cpu_percent(None),
+            mem_used=mem.used,
+            mem_total=mem.total,
+            mem_percent=mem.percent,
+            disk_used=disk.used,
+            disk_total=disk.total,
+            disk_percent=disk.percent
+        )
+
+    async def sample(self) -> SystemSample:
+        # disk_usage can stall on slow mounts; keep it off the event loop
+        sample = await asyncio.to_thread(self._read)
+        self.samples.append(sample)
+        return sample
+
+    async def latest(self) -> SystemSample:
+        if not self.samples:
+            return await self.sample()
+        return self.samples[-1]
+
+    def summary(self, attr: str) -> tuple[float, float, float] | None:
+        """(min, avg, max) of one sample field over the buffered window."""
+        values = [getattr(s, attr) for s in self.samples]
+        if not values:
+            return None
+        return min(values), sum(values) / len(values), max(values)
+
+    def uptime(self) -> datetime.timedelta:
+        return datetime.datetime.now() - datetime.datetime.fromtimestamp(self.boot_time)
+
+
+system_stats = SystemStatsSampler(STATS_SAMPLE_SECONDS, 300)
+
+
 # =====================
 # EVENTS
 # =====================
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.command_started = time.perf_counter()
+    _active_commands[id(ctx)] = (ctx.command.qualified_name, str(ctx.author), time.time())
+
+@bot.after_invoke
+async def record_command_metrics(ctx):
+    _active_commands.pop(id(ctx), None)
+    name = ctx.command.qualified_name if ctx.command else "unknown"
+    COMMAND_INVOCATIONS.inc(name, "error" if ctx.command_failed else "ok")
+    started = getattr(ctx, "command_started", None)
+    if started is not None:
+        COMMAND_LATENCY.observe(time.perf_counter() - started, name)
+
 @bot.event
 async def on_message(message):
     if message.author == bot.user:
         return
 
+    if MULTI_INSTANCE and (message.content.startswith(PREFIX) or bot.user in message.mentions):
+        # Every instance receives the message; only the first to claim it answers
+        try:
+            if not await run_db(claim_message, message.id):
+                return
+        except Exception as e:
+            print(f"[Leader] Could not claim message {message.id}, answering anyway: {e}")
+
     if bot.user in message.mentions:
         instructions = (
             f"👋 Hi {message.author.mention}!\n\n"
@@ -810,6 +3836,46 @@ async def on_message(message):
 
     await bot.process_commands(message)
 
+@bot.event
+async def on_member_join(member):
+    if member.guild.id in GUILD_IDS:
+        role_index.update_member(member)
+
+
+@bot.event
+async def on_member_update(before, after):
+    if after.guild.id not in GUILD_IDS or before.roles == after.roles:
+        return
+    was_eligible = role_index.is_eligible(after.id)
+    role_index.update_member(after)
+    if was_eligible and not role_index.is_eligible(after.id):
+        queue_revocation(after.id)
+
+
+@bot.event
+async def on_member_remove(member):
+    if member.guild.id not in GUILD_IDS:
+        return
+    role_index.remove_member(member.guild.id, member.id)
+    if not role_index.is_eligible(member.id):
+        queue_revocation(member.id)
+
+
+@bot.event
+async def on_guild_role_delete(role):
+    if role.guild.id not in GUILD_IDS:
+        return
+    before = role_index.eligible_ids()
+    role_index.rebuild_guild(role.guild)
+    for user_id in before - role_index.eligible_ids():
+        queue_revocation(user_id)
+
+
+@bot.event
+async def on_guild_available(guild):
+    if guild.id in GUILD_IDS and role_index.ready:
+        role_index.rebuild_guild(guild)
+
 # =====================
 # COMMANDS
 # =====================
@@ -823,6 +3889,21 @@ def log_event(message: str):
     if os.getenv("EVENT_LOGGING", "false").lower() == "true":
         print(f"[EVENT] {message}")
 
+async def submit_provisioning(ctx, kind: str, username: str, password: str):
+    """Queue account creation and acknowledge; the worker replies in this DM when it finishes."""
+    if await jellyfin_directory.lookup(username, refresh_on_miss=False):
+        await ctx.send(f"❌ Failed to create Jellyfin account **{username}**. It may already exist.")
+        return
+
+    job_id = await provisioning.submit(kind, ctx.author.id, username, password, ctx.channel)
+    if job_id is None:
+        await ctx.send(f"❌ {ctx.author.mention}, an account is already being created for you or under that username.")
+        return
+
+    label = "trial Jellyfin account" if kind == "trial" else "Jellyfin account"
+    await ctx.send(f"⏳ Creating your {label} **{username}**... I'll message you here when it's ready.")
+
+
 @bot.command()
 async def createaccount(ctx, username: str = None, password: str = None):
     log_event(f"createaccount invoked by {ctx.author}")
@@ -836,43 +3917,15 @@ async def createaccount(ctx, username: str = None, password: str = None):
         await ctx.send(f"{ctx.author.mention} ❌ Please DM me to create your Jellyfin account.")
         return
 
-    member = None
-    for gid in GUILD_IDS:
-        guild = bot.get_guild(gid)
-        if guild:
-            member = guild.get_member(ctx.author.id)
-            if member and has_required_role(member):
-                break
-
-    if not member or not has_required_role(member):
+    if not has_required_role(ctx.author):
         await ctx.send(f"❌ {ctx.author.mention}, you don’t have the required role.")
         return
 
-    if get_account_by_discord(ctx.author.id):
+    if await async_get_account_by_discord(ctx.author.id):
         await ctx.send(f"❌ {ctx.author.mention}, you already have a Jellyfin account.")
         return
 
-    if create_jellyfin_user(username, password):
-        jf_id = get_jellyfin_user(username)
-        if not jf_id:
-            await ctx.send(f"❌ Failed to fetch Jellyfin ID for **{username}**. Please contact an admin.")
-            return
-
-        js_id = None
-        if JELLYSEERR_ENABLED:
-            js_id = import_jellyseerr_user(jf_id)
-
-        add_account(ctx.author.id, username, jf_id, js_id)
-
-        if JELLYSEERR_ENABLED:
-            if js_id:
-                await ctx.send(f"✅ Jellyfin account **{username}** created and imported into Jellyseerr!\n🌐 Login here: {JELLYFIN_URL}")
-            else:
-                await ctx.send(f"⚠️ Jellyfin account **{username}** created, but Jellyseerr import failed.\n🌐 Login here: {JELLYFIN_URL}")
-        else:
-            await ctx.send(f"✅ Jellyfin account **{username}** created!\n🌐 Login here: {JELLYFIN_URL}")
-    else:
-        await ctx.send(f"❌ Failed to create Jellyfin account **{username}**. It may already exist.")
+    await submit_provisioning(ctx, "account", username, password)
 
 @bot.command()
 async def createinvite(ctx):
@@ -890,18 +3943,14 @@ async def createinvite(ctx):
         base = JFA_URL.rstrip("/")
 
         # Try Bearer, fallback to X-Api-Key
-        headers = {"Authorization": f"Bearer {JFA_API_KEY}"}
-        r = requests.post(f"{base}/invites", headers=headers, json=payload, timeout=10)
-        if r.status_code == 401:
-            headers = {"X-Api-Key": JFA_API_KEY}
-            r = requests.post(f"{base}/invites", headers=headers, json=payload, timeout=10)
+        r = await jfa_request("POST", "/invites", json=payload)
 
         if r.status_code not in (200, 201):
             await ctx.send(f"❌ Failed to create invite. Status code: {r.status_code}\nResponse: {r.text}")
             return
 
         # Fetch invites list (some JFA builds only return success on POST)
-        r2 = requests.get(f"{base}/invites", headers=headers, timeout=10)
+        r2 = await jfa_request("GET", "/invites")
         if r2.status_code not in (200, 201):
             await ctx.send(f"❌ Failed to fetch invite list. Status code: {r2.status_code}\nResponse: {r2.text}")
             return
@@ -978,12 +4027,7 @@ async def listinvites(ctx):
 
     try:
         base = JFA_URL.rstrip("/")
-        headers = {"Authorization": f"Bearer {JFA_API_KEY}"}
-        r = requests.get(f"{base}/invites", headers=headers, timeout=10)
-
-        if r.status_code == 401:
-            headers = {"X-Api-Key": JFA_API_KEY}
-            r = requests.get(f"{base}/invites", headers=headers, timeout=10)
+        r = await jfa_request("GET", "/invites")
 
         if r.status_code not in (200, 201):
             await ctx.send(f"❌ Failed to fetch invites. Status code: {r.status_code}\nResponse: {r.text}")
@@ -1051,14 +4095,8 @@ async def deleteinvite(ctx, code: str):
         return
 
     try:
-        base = JFA_URL.rstrip("/")
-        headers = {"Authorization": f"Bearer {JFA_API_KEY}"}
-
         # Try DELETE with body (legacy API)
-        r = requests.delete(f"{base}/invites", headers=headers, json={"code": code}, timeout=10)
-        if r.status_code == 401:
-            headers = {"X-Api-Key": JFA_API_KEY}
-            r = requests.delete(f"{base}/invites", headers=headers, json={"code": code}, timeout=10)
+        r = await jfa_request("DELETE", "/invites", json={"code": code})
 
         if r.status_code in (200, 204):
             await ctx.send(f"✅ Invite `{code}` has been deleted.")
@@ -1078,12 +4116,7 @@ async def clearinvites(ctx):
         return
 
     try:
-        base = JFA_URL.rstrip("/")
-        headers = {"Authorization": f"Bearer {JFA_API_KEY}"}
-        r = requests.get(f"{base}/invites", headers=headers, timeout=10)
-        if r.status_code == 401:
-            headers = {"X-Api-Key": JFA_API_KEY}
-            r = requests.get(f"{base}/invites", headers=headers, timeout=10)
+        r = await jfa_request("GET", "/invites")
 
         if r.status_code not in (200, 201):
             await ctx.send(f"❌ Failed to fetch invites. Status code: {r.status_code}\nResponse: {r.text}")
@@ -1100,7 +4133,7 @@ async def clearinvites(ctx):
             code = invite.get("code")
             if not code:
                 continue
-            dr = requests.delete(f"{base}/invites", headers=headers, json={"code": code}, timeout=10)
+            dr = await jfa_request("DELETE", "/invites", json={"code": code})
             if dr.status_code in (200, 204):
                 deleted += 1
 
@@ -1123,7 +4156,7 @@ async def refreshjfakey(ctx):
         return
 
     await ctx.send("🔁 Attempting to refresh JFA token...")
-    success = refresh_jfa_token()
+    success = await refresh_jfa_token()
     if success:
         await ctx.send("✅ Successfully refreshed the JFA-Go API token and updated `.env`")
         log_event(f"Admin {ctx.author} forced a JFA API Token refresh")
@@ -1160,45 +4193,16 @@ async def trialaccount(ctx, username: str = None, password: str = None):
         return
 
     # Check if user already has a normal Jellyfin account
-    if get_account_by_discord(ctx.author.id):
+    if await async_get_account_by_discord(ctx.author.id):
         await ctx.send(f"❌ {ctx.author.mention}, you already have a Jellyfin account.")
         return
 
     # Check if user already had a trial account (one-time)
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
-    )
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM trial_accounts WHERE discord_id=%s", (ctx.author.id,))
-    existing_trial = cur.fetchone()
-    if existing_trial:
-        cur.close()
-        conn.close()
+    if await async_get_trial_account(ctx.author.id):
         await ctx.send(f"❌ {ctx.author.mention}, you have already used your trial account. You cannot create another.")
         return
 
-    # Create Jellyfin trial user
-    if create_jellyfin_user(username, password):
-        jf_id = get_jellyfin_user(username)
-        if not jf_id:
-            await ctx.send(f"❌ Failed to fetch Jellyfin ID for **{username}**. Please contact an admin.")
-            return
-
-        # Store trial account info in separate persistent table
-        cur.execute("""
-            INSERT INTO trial_accounts (discord_id, jellyfin_username, jellyfin_id, trial_created_at, expired)
-            VALUES (%s, %s, %s, NOW(), 0)
-        """, (ctx.author.id, username, jf_id))
-        conn.commit()
-        cur.close()
-        conn.close()
-
-        await ctx.send(f"✅ Trial Jellyfin account **{username}** created! It will expire in {TRIAL_TIME} hours.\n🌐 Login here: {JELLYFIN_URL}")
-        log_event(f"Trial account created for {ctx.author} ({username})")
-    else:
-        cur.close()
-        conn.close()
-        await ctx.send(f"❌ Failed to create trial account **{username}**. It may already exist.")
+    await submit_provisioning(ctx, "trial", username, password)
 
 
 @bot.command()
@@ -1213,13 +4217,13 @@ async def recoveraccount(ctx, new_password: str = None):
         await ctx.send(f"{ctx.author.mention} Please DM me to reset your password.")
         return
 
-    acc = get_account_by_discord(ctx.author.id)
+    acc = await async_get_account_by_discord(ctx.author.id)
     if not acc:
         await ctx.send("❌ You do not have a linked Jellyfin account.")
         return
 
     username = acc[0]
-    if reset_jellyfin_password(username, new_password):
+    if await reset_jellyfin_password(username, new_password):
         await ctx.send(f"✅ Your Jellyfin password for **{username}** has been reset!\n🌐 Login here: {JELLYFIN_URL}")
     else:
         await ctx.send(f"❌ Failed to reset password for **{username}**. Please contact an admin.")
@@ -1238,22 +4242,17 @@ async def deleteaccount(ctx, username: str = None):
         await ctx.send(f"{ctx.author.mention} ❌ Please DM me to delete your Jellyfin account.")
         return
 
-    acc = get_account_by_discord(ctx.author.id)
+    acc = await async_get_account_by_discord(ctx.author.id)
     if not acc or acc[0].lower() != username.lower():
         await ctx.send(f"❌ {ctx.author.mention}, that Jellyfin account is not linked to you.")
         return
 
     jf_id, js_id = acc[1], acc[2] if len(acc) > 2 else None
 
-    if delete_jellyfin_user(username):
-        delete_account(ctx.author.id)
+    if await delete_jellyfin_user(username):
+        await async_delete_account(ctx.author.id)
         if JELLYSEERR_ENABLED and js_id:
-            try:
-                headers = {"X-Api-Key": JELLYSEERR_API_KEY}
-                dr = requests.delete(f"{JELLYSEERR_URL}/api/v1/user/{js_id}", headers=headers, timeout=10)
-                if dr.status_code in (200, 204): print(f"[Jellyseerr] User {js_id} removed successfully.")
-            except Exception as e:
-                print(f"[Jellyseerr] Failed to delete user {js_id}: {e}")
+            if await delete_jellyseerr_user(js_id): print(f"[Jellyseerr] User {js_id} removed successfully.")
         await ctx.send(f"✅ Jellyfin account **{username}** deleted successfully.")
     else:
         await ctx.send(f"❌ Failed to delete Jellyfin account **{username}**.")
@@ -1267,31 +4266,17 @@ async def movies2watch(ctx):
         await ctx.send(f"❌ {ctx.author.mention}, you don’t have the required role to use this command.")
         return
 
-    headers = {"X-Emby-Token": JELLYFIN_API_KEY}
     try:
-        # Fetch all movies (include ProviderIds explicitly!)
-        r = requests.get(
-            f"{JELLYFIN_URL}/Items",
-            headers=headers,
-            params={
-                "IncludeItemTypes": "Movie",
-                "Recursive": "true",
-                "Fields": "ProviderIds"
-            },
-            timeout=10
-        )
-        if r.status_code != 200:
-            await ctx.send(f"❌ Failed to fetch movies. Status code: {r.status_code}")
+        # Served from the cached catalog (or Jellyfin's random sort)
+        selection = await movie_catalog.sample(5)
+        if selection is None:
+            await ctx.send("❌ Failed to fetch movies.")
             return
 
-        movies = r.json().get("Items", [])
-        if not movies:
+        if not selection:
             await ctx.send("⚠️ No movies found in the library.")
             return
 
-        # Pick 5 random movies
-        selection = random.sample(movies, min(5, len(movies)))
-
         embed = discord.Embed(
             title="🎬 What to Watch",
             description="Here are 5 random movie suggestions from the library:",
@@ -1299,18 +4284,16 @@ async def movies2watch(ctx):
         )
 
         for movie in selection:
-            name = movie.get("Name", "Unknown Title")
-            year = movie.get("ProductionYear", "N/A")
-            runtime = movie.get("RunTimeTicks", None)
+            name = movie.name
+            year = movie.year or "N/A"
+            runtime = movie.runtime_ticks
             runtime_min = int(runtime / 10_000_000 / 60) if runtime else "N/A"
 
             # Poster URL if available
-            poster_url = None
-            if "PrimaryImageTag" in movie and movie["PrimaryImageTag"]:
-                poster_url = f"{JELLYFIN_URL}/Items/{movie['Id']}/Images/Primary?tag={movie['PrimaryImageTag']}&quality=90"
+            poster_url = movie.poster_url
 
             # IMDb link if available
-            imdb_id = movie.get("ProviderIds", {}).get("Imdb")
+            imdb_id = movie.imdb_id
             imdb_link = f"[IMDb Link](https://www.imdb.com/title/{imdb_id})" if imdb_id else "No IMDb ID available"
 
             # Field content
@@ -1335,31 +4318,17 @@ async def shows2watch(ctx):
         await ctx.send(f"❌ {ctx.author.mention}, you don’t have the required role to use this command.")
         return
 
-    headers = {"X-Emby-Token": JELLYFIN_API_KEY}
     try:
-        # Fetch all shows (include ProviderIds explicitly!)
-        r = requests.get(
-            f"{JELLYFIN_URL}/Items",
-            headers=headers,
-            params={
-                "IncludeItemTypes": "Series",
-                "Recursive": "true",
-                "Fields": "ProviderIds"
-            },
-            timeout=10
-        )
-        if r.status_code != 200:
-            await ctx.send(f"❌ Failed to fetch shows. Status code: {r.status_code}")
+        # Served from the cached catalog (or Jellyfin's random sort)
+        selection = await series_catalog.sample(5)
+        if selection is None:
+            await ctx.send("❌ Failed to fetch shows.")
             return
 
-        shows = r.json().get("Items", [])
-        if not shows:
+        if not selection:
             await ctx.send("⚠️ No shows found in the library.")
             return
 
-        # Pick 5 random shows
-        selection = random.sample(shows, min(5, len(shows)))
-
         embed = discord.Embed(
             title="📺 Shows to Watch",
             description="Here are 5 random TV show suggestions from the library:",
@@ -1367,16 +4336,14 @@ async def shows2watch(ctx):
         )
 
         for show in selection:
-            name = show.get("Name", "Unknown Title")
-            year = show.get("ProductionYear", "N/A")
+            name = show.name
+            year = show.year or "N/A"
 
             # Poster URL if available
-            poster_url = None
-            if "PrimaryImageTag" in show and show["PrimaryImageTag"]:
-                poster_url = f"{JELLYFIN_URL}/Items/{show['Id']}/Images/Primary?tag={show['PrimaryImageTag']}&quality=90"
+            poster_url = show.poster_url
 
             # IMDb link if available
-            imdb_id = show.get("ProviderIds", {}).get("Imdb")
+            imdb_id = show.imdb_id
             imdb_link = f"[IMDb Link](https://www.imdb.com/title/{imdb_id})" if imdb_id else "No IMDb ID available"
 
             # Field content
@@ -1396,37 +4363,20 @@ async def shows2watch(ctx):
 @bot.command()
 async def cleanup(ctx):
     log_event(f"cleanup invoked by {ctx.author}")
-    removed = []
-
-    for discord_id, jf_username, jf_id, js_id in get_accounts():
-        member = None
-        for gid in GUILD_IDS:
-            guild = bot.get_guild(gid)
-            if guild:
-                member = guild.get_member(discord_id)
-                if member:
-                    break
-
-        if member is None or not has_required_role(member):
-            if delete_jellyfin_user(jf_username):
-                delete_account(discord_id)
 
-                if JELLYSEERR_ENABLED and js_id:
-                    try:
-                        headers = {"X-Api-Key": JELLYSEERR_API_KEY}
-                        dr = requests.delete(f"{JELLYSEERR_URL}/api/v1/user/{js_id}", headers=headers, timeout=10)
-                        if dr.status_code in (200, 204):
-                            print(f"[Jellyseerr] User {js_id} removed successfully.")
-                    except Exception as e:
-                        print(f"[Jellyseerr] Failed to delete user {js_id}: {e}")
+    # One fresh /Users fetch per run; every lookup below is served from the directory
+    if not await jellyfin_directory.refresh():
+        await ctx.send("❌ Could not fetch Jellyfin users, cleanup aborted.")
+        return
 
-                removed.append(jf_username)
+    async with _cleanup_lock:
+        result = await run_account_cleanup()
 
     log_channel = bot.get_channel(SYNC_LOG_CHANNEL_ID)
-    if removed and log_channel:
-        await log_channel.send(f"🧹 Removed {len(removed)} Jellyfin accounts: {', '.join(removed)}")
+    if (result.removed or result.failed) and log_channel:
+        await log_channel.send(result.summary())
 
-    await ctx.send("✅ Cleanup complete.")
+    await ctx.send(f"✅ Cleanup complete.\n{result.summary()}")
 
 @bot.command()
 async def validusers(ctx):
@@ -1435,16 +4385,15 @@ async def validusers(ctx):
         await ctx.send("❌ You don’t have permission to use this command.")
         return
 
-    accounts = get_accounts()
+    accounts = await async_get_accounts()
     valid_users = []
     invalid_users = []
 
     for discord_id, jf_username, jf_id, js_id in accounts:
-        user = await bot.fetch_user(discord_id)
-        if has_required_role(user):
-            valid_users.append(user)
+        if has_required_role(discord.Object(id=discord_id)):
+            valid_users.append(discord_id)
         else:
-            invalid_users.append(user)
+            invalid_users.append(discord_id)
 
     embed = discord.Embed(
         title="📊 Registered User Role Status",
@@ -1463,13 +4412,13 @@ async def validusers(ctx):
     if len(valid_users) > 0:
         embed.add_field(
             name="Valid Users List",
-            value="\n".join([u.mention for u in valid_users[:20]]) + ("..." if len(valid_users) > 20 else ""),
+            value="\n".join([f"<@{uid}>" for uid in valid_users[:20]]) + ("..." if len(valid_users) > 20 else ""),
             inline=False
         )
     if len(invalid_users) > 0:
         embed.add_field(
             name="Invalid Users List",
-            value="\n".join([u.mention for u in invalid_users[:20]]) + ("..." if len(invalid_users) > 20 else ""),
+            value="\n".join([f"<@{uid}>" for uid in invalid_users[:20]]) + ("..." if len(invalid_users) > 20 else ""),
             inline=False
         )
 
@@ -1484,7 +4433,7 @@ async def lastcleanup(ctx):
         await ctx.send("❌ You don’t have permission to view the last cleanup.")
         return
 
-    last_run = get_metadata("last_cleanup")
+    last_run = await async_get_metadata("last_cleanup")
     if not last_run:
         await ctx.send("ℹ️ No cleanup has been run yet.")
         return
@@ -1513,7 +4462,7 @@ async def searchaccount(ctx, username: str = None):
         await ctx.send(command_usage(f"{PREFIX}searchaccount", ["<jellyfin_username>"]))
         return
 
-    result = get_account_by_jellyfin(username)
+    result = await async_get_account_by_jellyfin(username)
     if result:
         discord_id = result[0]
         user = await bot.fetch_user(discord_id)
@@ -1529,7 +4478,7 @@ async def searchdiscord(ctx, user: discord.User = None):
         await ctx.send(command_usage(f"{PREFIX}searchdiscord", ["@user"]))
         return
 
-    result = get_account_by_discord(user.id)
+    result = await async_get_account_by_discord(user.id)
     if result:
         await ctx.send(f"🔍 Discord user {user.mention} is linked to Jellyfin account **{result[0]}**.")
     else:
@@ -1544,7 +4493,7 @@ async def scanlibraries(ctx):
         await ctx.send("❌ You don’t have permission to use this command.")
         return
 
-    response = requests.post(f"{JELLYFIN_URL}/Library/Refresh", headers={"X-Emby-Token": JELLYFIN_API_KEY})
+    response = await jellyfin_http.post("/Library/Refresh")
     if response.status_code in (200, 204):
         await ctx.send("✅ All Jellyfin libraries are being scanned.")
     else:
@@ -1558,68 +4507,49 @@ async def activestreams(ctx):
         await ctx.send("❌ You don’t have permission to use this command.")
         return
 
-    headers = {"X-Emby-Token": JELLYFIN_API_KEY}
     try:
-        r = requests.get(f"{JELLYFIN_URL}/Sessions", headers=headers, timeout=10)
-        if r.status_code != 200:
-            await ctx.send(f"❌ Failed to fetch active streams. Status code: {r.status_code}")
+        # Served from the shared sessions poller; only fetch here if its last poll is stale
+        if not await session_monitor.poll(force=False) and not session_monitor.ready:
+            await ctx.send(f"❌ Failed to fetch active streams. Status code: {session_monitor.last_status}")
             return
 
-        sessions = r.json()
-        # Only keep sessions that are actively playing a Movie or Episode
-        active_streams = [
-            s for s in sessions
-            if s.get("NowPlayingItem") and s["NowPlayingItem"].get("Type") in ("Movie", "Episode")
-        ]
-
-        if not active_streams:
+        if not session_monitor.streams:
             await ctx.send("ℹ️ No active movie or episode streams at the moment.")
             return
 
-        embed = discord.Embed(
-            title="📺 Active Jellyfin Streams",
-            description=f"Currently {len(active_streams)} active stream(s):",
-            color=discord.Color.green()
-        )
-
-        for session in active_streams:
-            user_name = session.get("UserName", "Unknown User")
-            device = session.get("DeviceName", "Unknown Device")
-            media = session.get("NowPlayingItem", {})
-            media_type = media.get("Type", "Unknown")
-            media_name = media.get("Name", "Unknown Title")
-
-            # Get progress
-            try:
-                position_ticks = session.get("PlayState", {}).get("PositionTicks", 0)
-                runtime_ticks = media.get("RunTimeTicks", 1)  # avoid div by zero
-                position_seconds = position_ticks / 10_000_000
-                runtime_seconds = runtime_ticks / 10_000_000
+        await ctx.send(embed=session_monitor.render())
 
-                position_str = str(datetime.timedelta(seconds=int(position_seconds)))
-                runtime_str = str(datetime.timedelta(seconds=int(runtime_seconds)))
+    except Exception as e:
+        await ctx.send(f"❌ Error fetching active streams: {e}")
+        print(f"[activestreams] Error: {e}")
 
-                # Progress bar
-                percent = position_seconds / runtime_seconds if runtime_seconds > 0 else 0
-                bar_length = 10
-                filled_length = int(round(bar_length * percent))
-                bar = "■" * filled_length + "□" * (bar_length - filled_length)
 
-                progress_str = f"{bar} {int(percent*100)}%\n[{position_str} / {runtime_str}]"
-            except Exception:
-                progress_str = "Unknown"
+@bot.command()
+async def streamsdashboard(ctx, action: str = "start"):
+    """Admin-only: Pin a live active-streams dashboard in this channel (`stop` removes it)."""
+    if not has_admin_role(ctx.author):
+        await ctx.send("❌ You don’t have permission to use this command.")
+        return
 
-            embed.add_field(
-                name=f"{media_name} ({media_type})",
-                value=f"👤 {user_name}\n📱 {device}\n⏱ Progress: {progress_str}",
-                inline=False
-            )
+    if action.lower() == "stop":
+        await streams_dashboard.load()
+        if streams_dashboard.message is None:
+            await ctx.send("ℹ️ There is no streams dashboard running.")
+            return
+        await streams_dashboard.remove()
+        await ctx.send("✅ Streams dashboard stopped. The message is no longer updated.")
+        log_event(f"Streams dashboard stopped by {ctx.author}")
+        return
 
-        await ctx.send(embed=embed)
+    if not session_monitor.ready and not await session_monitor.poll():
+        await ctx.send(f"❌ Failed to fetch active streams. Status code: {session_monitor.last_status}")
+        return
 
-    except Exception as e:
-        await ctx.send(f"❌ Error fetching active streams: {e}")
-        print(f"[activestreams] Error: {e}")
+    await streams_dashboard.load()
+    pinned = await streams_dashboard.post(ctx.channel)
+    if not pinned:
+        await ctx.send("⚠️ Dashboard posted, but I couldn’t pin it (missing Manage Messages permission?).")
+    log_event(f"Streams dashboard started in channel {ctx.channel.id} by {ctx.author}")
 
 @bot.command()
 async def moviestats(ctx):
@@ -1628,19 +4558,12 @@ async def moviestats(ctx):
         await ctx.send("⚠️ Radarr support is not enabled.")
         return
 
-    movies = radarr_get_movies()
-    if movies is None:
+    latest = await radarr_get_latest_movies(5)
+    if latest is None:
         await ctx.send("❌ Failed to connect to Radarr.")
         return
 
-    total_count = len(movies)
-
-    # Sort by newest "added"
-    latest = sorted(
-        movies,
-        key=lambda m: m.get("added", ""),
-        reverse=True
-    )[:5]
+    total_count = len(radarr_mirror)
 
     embed = discord.Embed(
         title="🎞️ Latest Radarr Additions",
@@ -1648,10 +4571,10 @@ async def moviestats(ctx):
     )
 
     for movie in latest:
-        title = movie.get("title", "Unknown")
-        year = movie.get("year", "Unknown")
-        added = movie.get("added", "Unknown")
-        tmdb_id = movie.get("tmdbId")
+        title = movie.title
+        year = movie.year or "Unknown"
+        added = movie.added or "Unknown"
+        tmdb_id = movie.external_id
 
         tmdb_link = (
             f"https://www.themoviedb.org/movie/{tmdb_id}"
@@ -1675,19 +4598,12 @@ async def showstats(ctx):
         await ctx.send("⚠️ Sonarr support is not enabled.")
         return
 
-    series = sonarr_get_series()
-    if series is None:
+    latest = await sonarr_get_latest_series(5)
+    if latest is None:
         await ctx.send("❌ Failed to connect to Sonarr.")
         return
 
-    total_count = len(series)
-
-    # Newest first
-    latest = sorted(
-        series,
-        key=lambda s: s.get("added", ""),
-        reverse=True
-    )[:5]
+    total_count = len(sonarr_mirror)
 
     embed = discord.Embed(
         title="📺 Latest Sonarr Additions",
@@ -1695,10 +4611,10 @@ async def showstats(ctx):
     )
 
     for show in latest:
-        title = show.get("title", "Unknown")
-        year = show.get("year", "Unknown")
-        added = show.get("added", "Unknown")
-        tvdb_id = show.get("tvdbId")
+        title = show.title
+        year = show.year or "Unknown"
+        added = show.added or "Unknown"
+        tvdb_id = show.external_id
 
         tvdb_link = (
             f"https://thetvdb.com/?id={tvdb_id}&tab=series"
@@ -1716,8 +4632,8 @@ async def showstats(ctx):
     await ctx.send(embed=embed)
 
 @bot.command()
-async def qbview(ctx):
-    """Admin-only: View current qBittorrent downloads."""
+async def qbview(ctx, page: int = 1):
+    """Admin-only: View current qBittorrent downloads, one page at a time."""
     if not ENABLE_QBITTORRENT:
         await ctx.send("❌ qBittorrent support is not enabled in the bot configuration.")
         return
@@ -1726,49 +4642,43 @@ async def qbview(ctx):
         await ctx.send("❌ You don’t have permission to use this command.")
         return
     
-    torrents = qb.torrents_info()
-    embed = discord.Embed(title="qBittorrent Downloads", color=0x00ff00)
+    # Served from the monitor's table; only poll here if it is missing or stale
+    if time.time() - torrent_monitor.updated_at > torrent_monitor.interval * 2:
+        try:
+            await torrent_monitor.poll()
+        except Exception as e:
+            if not torrent_monitor.ready:
+                await ctx.send(f"❌ Failed to reach qBittorrent: {e}")
+                return
 
-    if not torrents:
-        embed.description = "No torrents found."
-        await ctx.send(embed=embed)
+    await ctx.send(embed=torrent_monitor.render(page - 1))
+
+
+@bot.command()
+async def qbdashboard(ctx):
+    """Admin-only: Post a live qBittorrent dashboard in this channel."""
+    if not ENABLE_QBITTORRENT:
+        await ctx.send("❌ qBittorrent support is not enabled in the bot configuration.")
         return
 
-    # Group torrents by state
-    state_groups = {
-        "Downloading / Uploading": [],
-        "Finished": [],
-        "Stalled": [],
-        "Checking / Metadata": [],
-        "Other": []
-    }
+    if not has_admin_role(ctx.author):
+        await ctx.send("❌ You don’t have permission to use this command.")
+        return
 
-    for t in torrents:
-        if t.state in ("downloading", "uploading"):
-            state_groups["Downloading / Uploading"].append(t)
-        elif t.state in ("completed", "pausedUP", "pausedDL"):
-            state_groups["Finished"].append(t)
-        elif t.state in ("stalledUP", "stalledDL"):
-            state_groups["Stalled"].append(t)
-        elif t.state in ("checkingUP", "checkingDL", "checking", "metaDL"):
-            state_groups["Checking / Metadata"].append(t)
-        else:
-            state_groups["Other"].append(t)
-
-    # Add torrents to embed
-    for group_name, torrents_list in state_groups.items():
-        if torrents_list:
-            value_text = ""
-            for torrent in torrents_list:
-                value_text += (
-                    f"{torrent.name}\n"
-                    f"{progress_bar(torrent.progress)}\n"
-                    f"Peers: {torrent.num_leechs} | Seeders: {torrent.num_seeds}\n"
-                    f"Status: {torrent.state}\n\n"
-                )
-            embed.add_field(name=group_name, value=value_text, inline=False)
+    if not torrent_monitor.ready:
+        try:
+            await torrent_monitor.poll()
+        except Exception as e:
+            await ctx.send(f"❌ Failed to reach qBittorrent: {e}")
+            return
 
-    await ctx.send(embed=embed)
+    old = torrent_dashboards.pop(ctx.channel.id, None)
+    if old is not None:
+        old.stop()
+    dashboard = TorrentDashboard(torrent_monitor)
+    await dashboard.send(ctx.channel)
+    torrent_dashboards[ctx.channel.id] = dashboard
+    log_event(f"qBittorrent dashboard started in channel {ctx.channel.id} by {ctx.author}")
 
 
 @bot.command()
@@ -1782,13 +4692,8 @@ async def metrics(ctx):
         await ctx.send("⚠️ No Proxmox VM/Container ID is set in the .env file.")
         return
 
-    headers = {
-        "Authorization": f"PVEAPIToken={PROXMOX_TOKEN_NAME}={PROXMOX_TOKEN_VALUE}"
-    }
-
     try:
-        url = f"{PROXMOX_HOST}/api2/json/nodes/{PROXMOX_NODE}/{PROXMOX_TYPE}/{PROXMOX_VM_ID}/status/current"
-        r = requests.get(url, headers=headers, verify=False, timeout=10)
+        r = await proxmox_http.get(f"/api2/json/nodes/{PROXMOX_NODE}/{PROXMOX_TYPE}/{PROXMOX_VM_ID}/status/current")
 
         if r.status_code != 200:
             await ctx.send(f"❌ Failed to fetch VM/Container status (status {r.status_code})")
@@ -1849,12 +4754,12 @@ async def storage(ctx):
             color=discord.Color.green()
         )
 
-        for node in proxmox.nodes.get():
+        for node in await call_upstream("proxmox", proxmox.nodes.get):
             node_name = node["node"]
 
             # ---- ZFS ----
             try:
-                zfs_pools = proxmox.nodes(node_name).disks.zfs.get()
+                zfs_pools = await call_upstream("proxmox", proxmox.nodes(node_name).disks.zfs.get)
                 if zfs_pools:
                     zfs_info = [
                         f"**{p['name']}**: {p['alloc']/1024**3:.2f} GiB / "
@@ -1874,7 +4779,7 @@ async def storage(ctx):
 
             # ---- Normal storage (skip ZFS) ----
             try:
-                storage_info = proxmox.nodes(node_name).storage.get()
+                storage_info = await call_upstream("proxmox", proxmox.nodes(node_name).storage.get)
                 normal_lines = [
                     f"**{s['storage']}**: {s['used']/1024**3:.2f} GiB / "
                     f"{s['total']/1024**3:.2f} GiB ({(s['used']/s['total']*100):.1f}%)"
@@ -1905,20 +4810,64 @@ async def link(ctx, user: discord.User = None, jellyfin_username: str = None, js
         await ctx.send(command_usage(f"{PREFIX}link", usage_args))
         return
 
-    existing_acc = get_account_by_discord(user.id)
+    existing_acc = await async_get_account_by_discord(user.id)
     if existing_acc:
         await ctx.send(f"❌ Discord user {user.mention} already has a linked account.")
         return
 
-    jf_id = get_jellyfin_user(jellyfin_username)
+    jf_id = await get_jellyfin_user(jellyfin_username)
     if not jf_id:
         await ctx.send(f"❌ Could not find Jellyfin account **{jellyfin_username}**. Make sure it exists.")
         return
 
-    add_account(user.id, jellyfin_username, jf_id, js_id)
+    # jellyfin_username is unique; REPLACE would silently unlink the current owner
+    linked = await async_get_account_by_jellyfin(jellyfin_username)
+    if linked:
+        await ctx.send(f"❌ Jellyfin account **{jellyfin_username}** is already linked to <@{linked[0]}>.")
+        return
+
+    await async_add_account(user.id, jellyfin_username, jf_id, js_id)
     await ctx.send(f"✅ Linked {user.mention} to Jellyfin account **{jellyfin_username}**.")
 
 
+@bot.command()
+async def jellyseerrsync(ctx):
+    """Admin-only: Import every linked account without a Jellyseerr ID into Jellyseerr."""
+    log_event(f"jellyseerrsync invoked by {ctx.author}")
+    if not has_admin_role(ctx.author):
+        await ctx.send("❌ You don’t have permission to use this command.")
+        return
+
+    if not JELLYSEERR_ENABLED:
+        await ctx.send("⚠️ Jellyseerr support is not enabled.")
+        return
+
+    missing = await async_get_accounts_missing_jellyseerr()
+    if not missing:
+        await ctx.send("✅ Every linked account already has a Jellyseerr ID.")
+        return
+
+    try:
+        refreshed = await jellyseerr_index.refresh()
+    except Exception as e:
+        print(f"[Jellyseerr] Failed to refresh user index: {e}")
+        refreshed = False
+    if not refreshed:
+        await ctx.send("❌ Failed to fetch Jellyseerr users. Aborting.")
+        return
+
+    await ctx.send(f"🔄 Importing {len(missing)} account(s) into Jellyseerr...")
+    resolved = await import_jellyseerr_users([jf_id for _, jf_id in missing])
+    pairs = [(discord_id, resolved[jf_id]) for discord_id, jf_id in missing if jf_id in resolved]
+    await async_set_jellyseerr_ids(pairs)
+
+    failed = len(missing) - len(pairs)
+    msg = f"✅ Linked {len(pairs)} account(s) to Jellyseerr."
+    if failed:
+        msg += f"\n⚠️ {failed} account(s) could not be imported."
+    await ctx.send(msg)
+
+
 @bot.command()
 async def unlink(ctx, discord_user: discord.User = None):
     log_event(f"unlink invoked by {ctx.author}")
@@ -1926,12 +4875,12 @@ async def unlink(ctx, discord_user: discord.User = None):
         await ctx.send(command_usage(f"{PREFIX}unlink", ["@user"]))
         return
 
-    account = get_account_by_discord(discord_user.id)
+    account = await async_get_account_by_discord(discord_user.id)
     if not account:
         await ctx.send(f"❌ Discord user {discord_user.mention} does not have a linked Jellyfin account.")
         return
 
-    delete_account(discord_user.id)
+    await async_delete_account(discord_user.id)
     await ctx.send(f"✅ Unlinked Jellyfin account **{account[0]}** from Discord user {discord_user.mention}.")
 
 @bot.command()
@@ -1942,17 +4891,17 @@ async def stats(ctx):
     # Local System Stats
     # -------------------
 
-    cpu_usage = psutil.cpu_percent(interval=1)
+    sample = await system_stats.latest()
 
-    mem = psutil.virtual_memory()
-    mem_str = f"{round(mem.used/1024**3,2)} / {round(mem.total/1024**3,2)} GB ({mem.percent}%)"
+    def trend(attr: str) -> str:
+        low, avg, high = system_stats.summary(attr)
+        return f"\n5m: {low:.0f} / {avg:.0f} / {high:.0f}%"
 
-    disk = psutil.disk_usage('/')
-    disk_str = f"{round(disk.used/1024**3,2)} / {round(disk.total/1024**3,2)} GB ({disk.percent}%)"
+    cpu_str = f"{sample.cpu}%" + trend("cpu")
+    mem_str = f"{round(sample.mem_used/1024**3,2)} / {round(sample.mem_total/1024**3,2)} GB ({sample.mem_percent}%)" + trend("mem_percent")
+    disk_str = f"{round(sample.disk_used/1024**3,2)} / {round(sample.disk_total/1024**3,2)} GB ({sample.disk_percent}%)"
 
-    boot_time = datetime.datetime.fromtimestamp(psutil.boot_time())
-    uptime = datetime.datetime.now() - boot_time
-    uptime_str = str(uptime).split('.')[0]
+    uptime_str = str(system_stats.uptime()).split('.')[0]
 
     python_version = platform.python_version()
     bot_ver = BOT_VERSION if "BOT_VERSION" in globals() else "Unknown"
@@ -1986,8 +4935,9 @@ async def stats(ctx):
                 "max_over_time(sonarr[5m])"
         }
 
-        for label, query in metrics.items():
-            result = promql(query)
+        results = await asyncio.gather(*(promql(query) for query in metrics.values()))
+
+        for label, result in zip(metrics, results):
             if result and isinstance(result, list) and len(result) > 0:
                 try:
                     value = result[0]["value"][1]
@@ -2009,13 +4959,23 @@ async def stats(ctx):
     )
 
     # Local stats
-    embed.add_field(name="🧠 CPU", value=f"{cpu_usage}%", inline=True)
+    embed.add_field(name="🧠 CPU", value=cpu_str, inline=True)
     embed.add_field(name="💾 Memory", value=mem_str, inline=True)
     embed.add_field(name="📀 Disk", value=disk_str, inline=True)
     embed.add_field(name="⏱️ Uptime", value=uptime_str, inline=True)
     embed.add_field(name="🐍 Python", value=python_version, inline=True)
     embed.add_field(name="🤖 Bot Version", value=bot_ver, inline=True)
 
+    pool = db_pool.stats()
+    embed.add_field(
+        name="🗄️ DB Pool",
+        value=(
+            f"{pool['in_use']}/{pool['size']} in use • {pool['checkouts']} checkouts\n"
+            f"Wait avg {pool['wait_avg'] * 1000:.1f} ms • max {pool['wait_max'] * 1000:.1f} ms"
+        ),
+        inline=False
+    )
+
     # Prometheus stats
     if prometheus_fields:
         embed.add_field(name="📡 Tracking (Last 5 Minutes)", value="\u200b", inline=False)
@@ -2073,7 +5033,7 @@ async def update(ctx):
     try:
         # Fetch latest version
         version_url = "https://raw.githubusercontent.com/PenguCCN/Jellycord/main/version.txt"
-        r = requests.get(version_url, timeout=10)
+        r = await github_http.get(version_url)
         if r.status_code != 200:
             await ctx.send("❌ Failed to fetch latest version info.")
             return
@@ -2087,7 +5047,7 @@ async def update(ctx):
 
         # Download release zip
         releases_url = "https://github.com/PenguCCN/Jellycord/releases/latest/download/Jellycord.zip"
-        r = requests.get(releases_url, timeout=30)
+        r = await github_http.get(releases_url, timeout=30)
         if r.status_code != 200:
             await ctx.send("❌ Failed to download latest release zip.")
             return
@@ -2143,43 +5103,52 @@ async def update(ctx):
         print(f"[updatebot] Error: {e}")
 
 
+_backup_lock = asyncio.Lock()
+
+
 @bot.command()
-async def backup(ctx):
-    """Create a backup of the bot (files + DB)."""
+async def backup(ctx, mode: str = None):
+    """Create a backup of the bot (files + DB). Mode is "full" (zip) or "incremental"; defaults to BACKUP_MODE."""
     if not has_admin_role(ctx.author):
         await ctx.send("❌ You don’t have permission to use this command.")
         return
 
-    await ctx.send("📦 Starting backup process...")
+    mode = (mode or BACKUP_MODE).lower()
+    if mode not in ("full", "incremental"):
+        await ctx.send(command_usage(f"{PREFIX}backup", ["[full|incremental]"]))
+        return
 
-    try:
-        BACKUP_DIR.mkdir(exist_ok=True)
-
-        # Backup filename
-        today = datetime.datetime.now().strftime("%m-%d-%Y")
-        backup_name = f"{today}-{BOT_VERSION}.zip"
-        backup_path = BACKUP_DIR / backup_name
-
-        # Temporary SQL dump file
-        dump_file = BACKUP_DIR / f"{DB_NAME}.sql"
-        if not export_mysql_db(dump_file):
-            await ctx.send("⚠️ Database export failed, continuing without DB dump...")
-
-        with zipfile.ZipFile(backup_path, "w", zipfile.ZIP_DEFLATED) as backup_zip:
-            # Add all files in current directory (skip backups themselves)
-            for root, _, files in os.walk("."):
-                if root.startswith("./backups"):
-                    continue
-                for file in files:
-                    file_path = Path(root) / file
-                    backup_zip.write(file_path, arcname=file_path.relative_to("."))
+    if _backup_lock.locked():
+        await ctx.send("⚠️ A backup is already running.")
+        return
+
+    status = await ctx.send("📦 Starting backup process...")
 
-            # Add DB dump if created
-            if dump_file.exists():
-                backup_zip.write(dump_file, arcname=f"{DB_NAME}.sql")
-                dump_file.unlink()  # remove temporary dump file
+    try:
+        async with _backup_lock:
+            BACKUP_DIR.mkdir(exist_ok=True)
+            progress = ProgressReporter(status, "📦")
 
-        await ctx.send(f"✅ Backup created: `{backup_name}`")
+            if mode == "incremental":
+                backup_name = datetime.datetime.now().strftime("%m-%d-%Y-%H%M%S") + f"-{BOT_VERSION}"
+                stats = await asyncio.to_thread(create_incremental_backup, backup_name, progress)
+            else:
+                # Backup filename
+                today = datetime.datetime.now().strftime("%m-%d-%Y")
+                backup_name = f"{today}-{BOT_VERSION}.zip"
+                stats = await asyncio.to_thread(create_backup, BACKUP_DIR / backup_name, progress)
+
+        if "db_error" in stats:
+            await ctx.send(f"⚠️ Database export failed, backup contains files only: {stats['db_error']}")
+
+        summary = f"{stats['tables']} tables, {stats['rows']:,} rows, {stats['files']:,} files"
+        if mode == "incremental":
+            await ctx.send(
+                f"✅ Incremental backup created: `{backup_name}` ({summary}; "
+                f"{stats['new_chunks']:,} of {stats['chunks']:,} chunks new, {stats['new_bytes'] / 1_048_576:.1f} MB added)"
+            )
+        else:
+            await ctx.send(f"✅ Backup created: `{backup_name}` ({summary}, {stats['size'] / 1_048_576:.1f} MB)")
         log_event(f"Backup created: {backup_name}")
 
     except Exception as e:
@@ -2188,68 +5157,43 @@ async def backup(ctx):
 
 @bot.command()
 async def restore(ctx, backup_file: str):
-    """Restore a backup (files + database) from a zip. Admin only."""
+    """Restore a backup (files + database) from a zip or an incremental manifest. Admin only."""
     if not has_admin_role(ctx.author):
         await ctx.send("❌ You don’t have permission to use this command.")
         return
 
     backup_path = os.path.join("backups", backup_file)
-    if not os.path.exists(backup_path):
+    manifest_path = BACKUP_MANIFEST_DIR / f"{backup_file.removesuffix('.json')}.json"
+    manifest = None
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    elif not backup_file.endswith(".zip") or not os.path.exists(backup_path):
         await ctx.send(f"❌ Backup `{backup_file}` not found.")
         return
 
-    await ctx.send(f"♻️ Starting restore from `{backup_file}`. This may take a while...")
+    status = await ctx.send(f"♻️ Starting restore from `{backup_file}`. This may take a while...")
 
     temp_dir = os.path.join("backups", "restore_temp")
     os.makedirs(temp_dir, exist_ok=True)
 
     try:
-        # --- Extract zip to local restore_temp folder ---
-        with zipfile.ZipFile(backup_path, "r") as zip_ref:
-            zip_ref.extractall(temp_dir)
-
-        # --- Database Restore ---
-        sql_files = [f for f in os.listdir(temp_dir) if f.endswith(".sql")]
-        if sql_files:
-            sql_file_path = os.path.join(temp_dir, sql_files[0])
-            with open(sql_file_path, "r", encoding="utf-8") as f:
-                sql_content = f.read()
-
-            conn = pymysql.connect(
-                host=os.getenv("DB_HOST", "localhost"),
-                user=os.getenv("DB_USER"),
-                password=os.getenv("DB_PASSWORD"),
-                database=os.getenv("DB_NAME"),
-                autocommit=True
+        progress = ProgressReporter(status, "♻️")
+        if manifest is not None:
+            db_stats = await asyncio.to_thread(restore_from_manifest, manifest, temp_dir, progress)
+        else:
+            db_stats = await asyncio.to_thread(restore_from_zip, backup_path, temp_dir, progress)
+
+        if db_stats is not None:
+            rate = db_stats["rows"] / db_stats["seconds"] if db_stats["seconds"] else 0
+            await ctx.send(
+                f"✅ Database restored successfully! ({db_stats['tables']} tables, {db_stats['rows']:,} rows "
+                f"in {db_stats['seconds']:.1f}s, {rate:,.0f} rows/s)"
             )
-            with conn.cursor() as cursor:
-                cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
-                cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE();")
-                tables = cursor.fetchall()
-                for (table_name,) in tables:
-                    cursor.execute(f"DROP TABLE IF EXISTS `{table_name}`;")
-                cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
-
-                for statement in sql_content.split(";"):
-                    stmt = statement.strip()
-                    if stmt:
-                        cursor.execute(stmt)
-            conn.close()
-            await ctx.send("✅ Database restored successfully!")
         else:
-            await ctx.send("⚠️ No SQL backup found in this zip file.")
+            await ctx.send("⚠️ No database dump found in this backup.")
 
         # --- Copy files to working directory ---
-        for item in os.listdir(temp_dir):
-            src_path = os.path.join(temp_dir, item)
-            dest_path = os.path.join(".", item)
-            if os.path.isdir(src_path):
-                if os.path.exists(dest_path):
-                    shutil.rmtree(dest_path)
-                shutil.copytree(src_path, dest_path)
-            else:
-                shutil.copy2(src_path, dest_path)
-
+        await asyncio.to_thread(install_restored_files, temp_dir)
         await ctx.send("✅ Files restored successfully!")
 
     except Exception as e:
@@ -2276,14 +5220,22 @@ async def backups(ctx):
         await ctx.send("⚠️ No backups folder found.")
         return
 
-    # Collect all zip files in backups dir
-    backups = list(backup_folder.glob("*.zip"))
+    # Collect all zip files and incremental manifests as (created, name, details)
+    backups = [(f.stat().st_mtime, f.name, "Full") for f in backup_folder.glob("*.zip")]
+    manifests, _ = await asyncio.to_thread(load_manifests)
+    for manifest in manifests:
+        created = datetime.datetime.fromisoformat(manifest["created_at"]).timestamp()
+        stats = manifest["stats"]
+        backups.append((
+            created, manifest["name"],
+            f"Incremental, {stats['files']:,} files, {stats['rows']:,} rows, {stats['new_bytes'] / 1_048_576:.1f} MB new"
+        ))
     if not backups:
         await ctx.send("⚠️ No backups found.")
         return
 
-    # Sort by modification time, newest first
-    backups.sort(key=lambda f: f.stat().st_mtime, reverse=True)
+    # Sort by creation time, newest first
+    backups.sort(reverse=True)
 
     embed = discord.Embed(
         title="📂 Available Backups",
@@ -2291,12 +5243,11 @@ async def backups(ctx):
         color=discord.Color.green()
     )
 
-    for backup in backups:
-        mtime = backup.stat().st_mtime
-        formatted_time = f"<t:{int(mtime)}:f>"  # Discord timestamp formatting
+    for created, name, details in backups[:25]:
+        formatted_time = f"<t:{int(created)}:f>"  # Discord timestamp formatting
         embed.add_field(
-            name=backup.name,
-            value=f"Created: {formatted_time}",
+            name=name,
+            value=f"{details} · Created: {formatted_time}",
             inline=False
         )
 
@@ -2312,7 +5263,7 @@ async def version(ctx):
         return
 
     try:
-        response = requests.get(VERSION_URL, timeout=10)
+        response = await github_http.get(VERSION_URL)
         if response.status_code == 200:
             latest_version = response.text.strip()
             await ctx.send(f"🤖 Bot version: `{BOT_VERSION}`\n🌍 Latest version: `{latest_version}`\n{'✅ Up to date!' if BOT_VERSION == latest_version else f'⚠️ Update available! Get it here: {RELEASES_URL}'}")
@@ -2331,7 +5282,7 @@ async def changelog(ctx):
         return
     
     try:
-        r = requests.get(CHANGELOG_URL, timeout=10)
+        r = await github_http.get(CHANGELOG_URL)
         if r.status_code != 200:
             await ctx.send(f"❌ Failed to fetch changelog (status {r.status_code})")
             return
@@ -2456,14 +5407,18 @@ async def help_command(ctx):
             f"`{PREFIX}searchaccount <jellyfin_username>` - Find linked Discord user",
             f"`{PREFIX}searchdiscord @user` - Find linked Jellyfin account",
             f"`{PREFIX}scanlibraries` - Scan all Jellyfin libraries",
-            f"`{PREFIX}activestreams` - View all active Jellyfin streams"
+            f"`{PREFIX}activestreams` - View all active Jellyfin streams",
+            f"`{PREFIX}streamsdashboard [stop]` - Pin a live active-streams dashboard in this channel"
         ]
+        if JELLYSEERR_ENABLED:
+            admin_cmds.append(f"`{PREFIX}jellyseerrsync` - Import linked accounts missing a Jellyseerr ID")
         embed.add_field(name="🛠️ Admin Commands", value="\n".join(admin_cmds), inline=False)
 
     # --- qBittorrent Commands ---
     if ENABLE_QBITTORRENT:
         qb_cmds = [
-            f"`{PREFIX}qbview` - Show current qBittorrent downloads with progress, peers, and seeders",
+            f"`{PREFIX}qbview [page]` - Show current qBittorrent downloads with progress, peers, and seeders",
+            f"`{PREFIX}qbdashboard` - Post a live-updating qBittorrent dashboard in this channel",
         ]
         embed.add_field(name="💾 qBittorrent Commands", value="\n".join(qb_cmds), inline=False)
         
@@ -2490,7 +5445,7 @@ async def help_command(ctx):
             f"`{PREFIX}stats` - View Local and Global Jellycord Stats",
             f"`{PREFIX}setprefix` - Change the bot's command prefix",
             f"`{PREFIX}update` - Download latest bot version",
-            f"`{PREFIX}backup` - Create a backup of the bot, its database and configurations",
+            f"`{PREFIX}backup [full|incremental]` - Create a backup of the bot, its database and configurations",
             f"`{PREFIX}backups` - List backups of the bot",
             f"`{PREFIX}restore` - Restore a backup of the bot",
             f"`{PREFIX}version` - Manually check for bot updates",
@@ -2514,164 +5469,144 @@ import mysql.connector
 
 LOCAL_TZ = pytz.timezone(os.getenv("LOCAL_TZ", "America/Chicago"))
 
+# The loop, its immediate first run on start() and !cleanup never overlap
+_cleanup_lock = asyncio.Lock()
+
 @tasks.loop(hours=24)
 async def cleanup_task():
-    log_event("🧹 Running daily account cleanup check...")
-    removed = []
-
-    # =======================
-    # Normal accounts cleanup
-    # =======================
-    for discord_id, jf_username, jf_id, js_id in get_accounts():
-        member = None
-        for gid in GUILD_IDS:
-            guild = bot.get_guild(gid)
-            if guild:
-                member = guild.get_member(discord_id)
-                if member:
-                    break
-
-        if member is None or not has_required_role(member):
-            if jf_username:
-                try:
-                    if delete_jellyfin_user(jf_username):
-                        log_event(f"Deleted Jellyfin user {jf_username} for Discord ID {discord_id}")
-                    else:
-                        log_event(f"Failed to delete Jellyfin user {jf_username} for Discord ID {discord_id}")
-                except Exception as e:
-                    print(f"[Cleanup] Error deleting Jellyfin user {jf_username}: {e}")
+    async with _cleanup_lock:
+        log_event("🧹 Running daily account cleanup check...")
 
-            # remove DB entry for normal account
-            try:
-                delete_account(discord_id)
-            except Exception as e:
-                print(f"[Cleanup] Error removing DB entry for Discord ID {discord_id}: {e}")
+        # One fresh /Users fetch per run; every lookup below is served from the directory
+        try:
+            if not await jellyfin_directory.refresh():
+                print("[Cleanup] Could not fetch Jellyfin users, skipping this run.")
+                return
+        except Exception as e:
+            print(f"[Cleanup] Failed to refresh Jellyfin user directory, skipping this run: {e}")
+            return
 
-            # remove from Jellyseerr if applicable
-            if JELLYSEERR_ENABLED and js_id:
-                try:
-                    if delete_jellyseerr_user(js_id):
-                        log_event(f"Deleted Jellyseerr user {js_id} for Discord ID {discord_id}")
-                    else:
-                        log_event(f"Failed to delete Jellyseerr user {js_id} for Discord ID {discord_id}")
-                except Exception as e:
-                    print(f"[Cleanup] Failed to delete Jellyseerr user {js_id}: {e}")
+        # =======================
+        # Normal accounts cleanup
+        # =======================
+        try:
+            result = await run_account_cleanup()
+        except Exception as e:
+            print(f"[Cleanup] Account cleanup failed: {e}")
+            result = DeprovisionResult()
 
-            removed.append(jf_username or f"{discord_id}")
+        # ======================
+        # Trial accounts
+        # ======================
+        # Trials expire on their own deadlines; the daily run only re-syncs the schedule
+        try:
+            await trial_scheduler.reload()
+        except Exception as e:
+            print(f"[Trial Cleanup] Error reloading trial schedule: {e}")
 
-    # ======================
-    # Trial accounts cleanup
-    # ======================
-    try:
-        conn = mysql.connector.connect(
-            host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
-        )
-        cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT * FROM trial_accounts WHERE expired=0")
-        trials = cur.fetchall()
-        now_local = datetime.datetime.now(LOCAL_TZ)
+        # ======================
+        # Update metadata & logs
+        # ======================
+        try:
+            await async_set_metadata("last_cleanup", datetime.datetime.now(LOCAL_TZ).isoformat())
+        except Exception as e:
+            print(f"[Cleanup] Failed to set last_cleanup metadata: {e}")
 
-        for trial in trials:
-            created_at_utc = trial.get("trial_created_at") or trial.get("created_at")
-            if not created_at_utc:
-                continue
+        try:
+            await async_add_cleanup_log(datetime.datetime.now(LOCAL_TZ))
+            await async_prune_cleanup_logs(CLEANUP_LOG_RETENTION_DAYS)
+            await run_db(prune_provisioning_jobs, CLEANUP_LOG_RETENTION_DAYS)
+            if MULTI_INSTANCE:
+                await run_db(prune_command_claims)
+        except Exception as e:
+            print(f"[Cleanup] Failed to update cleanup_logs: {e}")
+
+        # ============================
+        # Post results to sync channel
+        # ============================
+        if result.removed or result.failed:
+            msg = result.summary()
+            print(msg)
+            try:
+                log_channel = bot.get_channel(SYNC_LOG_CHANNEL_ID)
+                if log_channel:
+                    await log_channel.send(msg)
+            except Exception as e:
+                print(f"[Cleanup] Failed to send removed message to sync channel: {e}")
 
-            # Convert DB UTC time to local TZ
-            if created_at_utc.tzinfo is None:
-                created_at_local = pytz.utc.localize(created_at_utc).astimezone(LOCAL_TZ)
-            else:
-                created_at_local = created_at_utc.astimezone(LOCAL_TZ)
+class TelemetryEmitter:
+    """
+    Posts the enabled-feature flags to the tracking endpoints.
+    The payloads are built once; a round is only sent when they change or the heartbeat
+    is due (the stats backend reads max_over_time(...[5m])), and failures back off.
+    """
 
-            if now_local > created_at_local + datetime.timedelta(hours=TRIAL_TIME):
-                # Delete trial Jellyfin user
-                try:
-                    delete_jellyfin_user(trial.get("jellyfin_username"))
-                except Exception as e:
-                    print(f"[Trial Cleanup] Error deleting trial Jellyfin user {trial.get('jellyfin_username')}: {e}")
+    def __init__(self, heartbeat: int, max_backoff: int = 600):
+        self.heartbeat = heartbeat
+        self.max_backoff = max_backoff
+        self.last_sent: dict | None = None
+        self.last_success = 0.0
+        self.failures = 0
+        self.next_attempt = 0.0
+
+    @staticmethod
+    def build() -> dict[str, dict]:
+        features = {
+            "botinstance": TRACKING_ENABLED,
+            "jellyseerr": JELLYSEERR_ENABLED,
+            "proxmox": ENABLE_PROXMOX,
+            "jfa": ENABLE_JFA,
+            "qbittorrent": ENABLE_QBITTORRENT,
+            "radarr": ENABLE_RADARR,
+            "sonarr": ENABLE_SONARR
+        }
+        # Disabled features are never posted
+        return {
+            feature: build_payload(enabled)
+            for feature, enabled in features.items()
+            if enabled and feature in POST_ENDPOINTS
+        }
 
-                # Mark trial as expired
-                try:
-                    cur.execute("UPDATE trial_accounts SET expired=1 WHERE discord_id=%s", (trial["discord_id"],))
-                    conn.commit()
-                except Exception as e:
-                    print(f"[Trial Cleanup] Error marking trial expired for {trial['discord_id']}: {e}")
+    def due(self, payloads: dict) -> bool:
+        now = time.monotonic()
+        if now < self.next_attempt:
+            return False
+        return payloads != self.last_sent or now - self.last_success >= self.heartbeat
 
-                removed.append(f"{trial.get('jellyfin_username')} (trial)")
-    except Exception as e:
-        print(f"[Trial Cleanup] Error reading trial accounts: {e}")
-    finally:
+    async def _send(self, feature: str, payload: dict) -> bool:
         try:
-            cur.close()
-            conn.close()
+            response = await tracking_http.post(POST_ENDPOINTS[feature], json=payload)
+            return response.status_code < 400
         except Exception:
-            pass
+            return False
 
-    # ======================
-    # Update metadata & logs
-    # ======================
-    try:
-        set_metadata("last_cleanup", datetime.datetime.now(LOCAL_TZ).isoformat())
-    except Exception as e:
-        print(f"[Cleanup] Failed to set last_cleanup metadata: {e}")
+    async def emit(self):
+        payloads = self.build()
+        if not self.due(payloads):
+            return
+
+        results = await asyncio.gather(*(self._send(f, p) for f, p in payloads.items()))
+        if all(results):
+            self.last_sent = payloads
+            self.last_success = time.monotonic()
+            self.failures = 0
+            self.next_attempt = 0.0
+            return
+
+        self.failures += 1
+        delay = min(self.max_backoff, 15 * 2 ** (self.failures - 1))
+        self.next_attempt = time.monotonic() + delay
+        failed = [f for f, ok in zip(payloads, results) if not ok]
+        log_event(f"[POST LOOP] Failed to send {', '.join(failed)}; retrying in {delay}s")
 
-    try:
-        conn = mysql.connector.connect(
-            host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
-        )
-        cur = conn.cursor()
-        cur.execute("INSERT INTO cleanup_logs (run_at) VALUES (%s)", (datetime.datetime.now(LOCAL_TZ),))
-        conn.commit()
-        cur.close()
-        conn.close()
-    except Exception as e:
-        print(f"[Cleanup] Failed to insert cleanup_logs: {e}")
-
-    # ============================
-    # Post results to sync channel
-    # ============================
-    if removed:
-        msg = f"🧹 Removed {len(removed)} Jellyfin accounts: {', '.join(removed)}"
-        print(msg)
-        try:
-            log_channel = bot.get_channel(SYNC_LOG_CHANNEL_ID)
-            if log_channel:
-                await log_channel.send(msg)
-        except Exception as e:
-            print(f"[Cleanup] Failed to send removed message to sync channel: {e}")
+
+telemetry = TelemetryEmitter(TRACKING_HEARTBEAT_SECONDS)
 
 @tasks.loop(seconds=15)
 async def periodic_post_task():
     if not TRACKING_ENABLED:
         return
-
-    features = {
-        "botinstance": TRACKING_ENABLED,
-        "jellyseerr": JELLYSEERR_ENABLED,
-        "proxmox": ENABLE_PROXMOX,
-        "jfa": ENABLE_JFA,
-        "qbittorrent": ENABLE_QBITTORRENT,
-        "radarr": ENABLE_RADARR,
-        "sonarr": ENABLE_SONARR
-    }
-
-    for feature, enabled in features.items():
-        url = POST_ENDPOINTS.get(feature)
-        if not url:
-            print(f"[POST LOOP] No endpoint for: {feature}")
-            continue
-
-        # Skip POST if the feature is disabled (0)
-        if not enabled:
-            print(f"[POST LOOP] Skipping {feature} because it's disabled.")
-            continue
-
-        payload = build_payload(enabled)
-
-        try:
-            response = requests.post(url, json=payload, timeout=10)
-            print(f"[POST LOOP] Sent {feature} → {response.status_code} | Payload: {payload}")
-        except Exception as e:
-            print(f"[POST LOOP] Error sending POST for {feature}: {e}")
+    await telemetry.emit()
 
 # =====================
 # JFA-Go Scheduled Token Refresh
@@ -2680,7 +5615,7 @@ if ENABLE_JFA:
 
     @tasks.loop(hours=1)
     async def refresh_jfa_loop():
-        success = refresh_jfa_token()
+        success = await refresh_jfa_token()
         if success:
             log_event("[JFA] Successfully refreshed token (scheduled loop).")
         else:
@@ -2698,10 +5633,79 @@ if ENABLE_JFA:
             refresh_jfa_loop.start()
         log_event(f"Bot is ready. Logged in as {bot.user}")
 
+@tasks.loop(minutes=JELLYFIN_DIRECTORY_REFRESH_MINUTES)
+async def refresh_jellyfin_directory():
+    try:
+        # on_ready has usually just loaded it
+        await jellyfin_directory.refresh(force=False)
+    except Exception as e:
+        print(f"[Jellyfin] User directory refresh failed: {e}")
+
+@tasks.loop(minutes=LIBRARY_CACHE_REFRESH_MINUTES)
+async def refresh_library_catalogs():
+    for catalog in (movie_catalog, series_catalog):
+        try:
+            await catalog.refresh()
+        except Exception as e:
+            print(f"[Library] {catalog.item_type} catalog refresh failed: {e}")
+
+@tasks.loop(minutes=SERVARR_SYNC_MINUTES)
+async def sync_servarr_mirrors():
+    for enabled, mirror in ((ENABLE_RADARR, radarr_mirror), (ENABLE_SONARR, sonarr_mirror)):
+        if not enabled:
+            continue
+        try:
+            await mirror.sync()
+        except Exception as e:
+            print(f"[{mirror.name}] Mirror sync failed: {e}")
+
+@tasks.loop(seconds=QBIT_POLL_SECONDS)
+async def poll_qbittorrent():
+    try:
+        changed = await torrent_monitor.poll()
+    except Exception as e:
+        print(f"[qBittorrent] sync/maindata poll failed: {e}")
+        return
+    for channel_id, dashboard in list(torrent_dashboards.items()):
+        try:
+            await dashboard.refresh(changed)
+        except discord.NotFound:
+            # Message deleted: stop updating it
+            dashboard.stop()
+            torrent_dashboards.pop(channel_id, None)
+        except discord.HTTPException as e:
+            print(f"[qBittorrent] Failed to update dashboard in channel {channel_id}: {e}")
+
+@tasks.loop(seconds=STREAMS_POLL_IDLE_SECONDS)
+async def poll_jellyfin_sessions():
+    try:
+        polled = await session_monitor.poll()
+    except Exception as e:
+        print(f"[Jellyfin] Sessions poll failed: {e}")
+        polled = False
+    # Every instance polls for its own activestreams; only the leader edits the shared dashboard
+    if polled and leader_election.is_leader:
+        try:
+            if MULTI_INSTANCE:
+                await streams_dashboard.load()
+            await streams_dashboard.refresh()
+        except discord.NotFound:
+            await streams_dashboard.forget()
+        except Exception as e:
+            print(f"[Streams] Failed to update dashboard: {e}")
+    poll_jellyfin_sessions.change_interval(seconds=session_monitor.interval)
+
+@tasks.loop(seconds=STATS_SAMPLE_SECONDS)
+async def sample_system_stats():
+    try:
+        await system_stats.sample()
+    except Exception as e:
+        print(f"[Stats] Sampling failed: {e}")
+
 @tasks.loop(hours=1)
 async def check_for_updates():
     try:
-        response = requests.get(VERSION_URL, timeout=10)
+        response = await github_http.get(VERSION_URL)
         if response.status_code == 200:
             latest_version = response.text.strip()
             if latest_version != BOT_VERSION:
@@ -2718,30 +5722,41 @@ async def check_for_updates():
         print(f"[Update Check] Failed: {e}")
 
 
-@bot.event
-async def on_ready():
-    print(f"Logged in as {bot.user}")
-    init_db()
-
-    # Check last cleanup
-    last_run = get_metadata("last_cleanup")
-    if last_run:
-        # parse UTC timestamp from DB
-        last_run_dt_utc = datetime.datetime.fromisoformat(last_run)
-        # convert to local timezone
-        if last_run_dt_utc.tzinfo is None:
-            last_run_dt_utc = pytz.utc.localize(last_run_dt_utc)
-        last_run_local = last_run_dt_utc.astimezone(LOCAL_TZ)
-        now_local = datetime.datetime.now(LOCAL_TZ)
-        delta = now_local - last_run_local
-        if delta.total_seconds() >= 24 * 3600:
-            print("Running missed daily cleanup...")
-            await cleanup_task()  # run immediately if overdue
+@tasks.loop(minutes=1)
+async def recover_provisioning_jobs():
+    try:
+        await provisioning.recover()
+    except Exception as e:
+        print(f"[Provisioning] Recovery failed: {e}")
+
+@tasks.loop(minutes=5)
+async def resync_trial_schedule():
+    # Trials created on other instances only reach the leader's schedule through the database
+    try:
+        await trial_scheduler.reload()
+    except Exception as e:
+        print(f"[Trial] Failed to reload trial schedule: {e}")
 
-    # Start scheduled tasks
+
+async def start_leader_tasks():
+    """Singleton jobs: they run on exactly one instance at a time."""
+    # A tasks loop runs its first iteration on start(), which covers a cleanup missed while down
     if not cleanup_task.is_running():
         cleanup_task.start()
 
+    start_revocation_worker()
+
+    if not recover_provisioning_jobs.is_running():
+        recover_provisioning_jobs.start()
+
+    try:
+        await trial_scheduler.reload()
+    except Exception as e:
+        print(f"[Trial] Failed to load trial schedule: {e}")
+    trial_scheduler.start()
+    if MULTI_INSTANCE and not resync_trial_schedule.is_running():
+        resync_trial_schedule.start()
+
     if ENABLE_JFA:
         if not refresh_jfa_loop.is_running():
                 refresh_jfa_loop.start()
@@ -2751,14 +5766,83 @@ async def on_ready():
 
     if TRACKING_ENABLED:
         print("Tracking enabled — starting.")
-        periodic_post_task.start()
+        if not periodic_post_task.is_running():
+            periodic_post_task.start()
     else:
         print("Tracking disabled via .env")
 
+
+def stop_leader_tasks():
+    # Cancel rather than stop: finishing a run after losing the lock is exactly the duplicate work to avoid
+    for loop in (cleanup_task, recover_provisioning_jobs, resync_trial_schedule, check_for_updates, periodic_post_task):
+        loop.cancel()
+    if ENABLE_JFA:
+        refresh_jfa_loop.cancel()
+    trial_scheduler.stop()
+    stop_revocation_worker()
+
+
+async def on_leadership_change(is_leader: bool):
+    if is_leader:
+        await start_leader_tasks()
+    else:
+        stop_leader_tasks()
+
+
+@bot.event
+async def on_ready():
+    print(f"Logged in as {bot.user}")
+    await run_db(init_db)
+    role_index.rebuild()
+
+    if LOOP_WATCHDOG:
+        loop_watchdog.start(asyncio.get_running_loop())
+
+    if METRICS_ENABLED and _metrics_runner is None:
+        try:
+            await start_metrics_server()
+            asyncio.create_task(monitor_event_loop_lag())
+        except OSError as e:
+            print(f"❌ Failed to start metrics server on port {METRICS_PORT}: {e}")
+
+    # Deletes trust directory misses, so load it before any cleanup, expiry or provisioning job runs
+    try:
+        await jellyfin_directory.refresh()
+    except Exception as e:
+        print(f"[Jellyfin] Initial user directory load failed: {e}")
+
+    # Caches are per instance, so every instance refreshes its own
+    if not refresh_jellyfin_directory.is_running():
+        refresh_jellyfin_directory.start()
+
+    if (ENABLE_RADARR or ENABLE_SONARR) and not sync_servarr_mirrors.is_running():
+        sync_servarr_mirrors.start()
+
+    if not sample_system_stats.is_running():
+        sample_system_stats.start()
+
+    if qb is not None and not poll_qbittorrent.is_running():
+        poll_qbittorrent.start()
+
+    try:
+        await streams_dashboard.load()
+    except Exception as e:
+        print(f"[Streams] Failed to load dashboard: {e}")
+    if not poll_jellyfin_sessions.is_running():
+        poll_jellyfin_sessions.start()
+
+    if LIBRARY_CACHE_MODE == "cache" and not refresh_library_catalogs.is_running():
+        refresh_library_catalogs.start()
+
+    # Joining the election also takes this instance's liveness lock, before any job is accepted
+    await leader_election.start(on_leadership_change)
+    provisioning.start()
+
     await bot.change_presence(
         activity=discord.Activity(type=discord.ActivityType.watching, name=f"{PREFIX}help")
     )
 
     log_event(f"✅ Bot ready. Current time: {datetime.datetime.now(LOCAL_TZ).strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
-bot.run(TOKEN)
+if __name__ == "__main__":
+    bot.run(TOKEN)
@@ -0,0 +1,746 @@
+"""
+Shared plumbing for the offline benchmarks.
+
+- FakeUpstreams: local aiohttp servers standing in for Jellyfin, Jellyseerr, JFA-Go,
+  Radarr, Sonarr and qBittorrent, filled with a synthetic library.
+- SQLite stand-in for MySQL, plugged into app.db_pool (or a real throwaway MySQL).
+- FakeContext / FakeDMChannel to call command callbacks without a Discord connection.
+- Timing helpers.
+
+The fake servers run on their own event loop in a background thread, so app.py can
+be imported (qBittorrent logs in at import time) and the bot's loop only does bot work.
+"""
+import asyncio
+import datetime
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import discord
+import mysql.connector
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# =====================
+# SYNTHETIC DATA
+# =====================
+@dataclass
+class Dataset:
+    movies: list = field(default_factory=list)
+    series: list = field(default_factory=list)
+    jellyfin_users: dict = field(default_factory=dict)    # lower(name) -> {"Name", "Id"}
+    jellyseerr_users: dict = field(default_factory=dict)  # js id -> {"id", "jellyfinUserId"}
+    sessions: list = field(default_factory=list)
+    invites: list = field(default_factory=list)
+    torrents: list = field(default_factory=list)
+    accounts: list = field(default_factory=list)          # (discord_id, username, jf_id, js_id)
+
+    @classmethod
+    def build(cls, items: int, accounts: int, sessions: int = 50, torrents: int = 200, seed: int = 1):
+        rnd = random.Random(seed)
+        data = cls()
+        base = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+        for i in range(items):
+            data.movies.append({
+                "Id": uuid.UUID(int=rnd.getrandbits(128)).hex,
+                "Name": f"Movie {i}",
+                "Type": "Movie",
+                "ProductionYear": 1950 + i % 75,
+                "RunTimeTicks": rnd.randint(60, 180) * 60 * 10_000_000,
+                "ImageTags": {"Primary": uuid.UUID(int=rnd.getrandbits(128)).hex},
+                "ProviderIds": {"Imdb": f"tt{1000000 + i}", "Tmdb": str(i + 1)},
+                # Radarr side of the same title; the real payload is much heavier than this
+                "_arr": {
+                    "id": i + 1, "title": f"Movie {i}", "year": 1950 + i % 75, "tmdbId": i + 1,
+                    "added": (base + datetime.timedelta(minutes=rnd.randint(0, 3_000_000))).isoformat(),
+                    "images": [{"coverType": "poster", "remoteUrl": f"https://image.tmdb.org/{i}.jpg"}],
+                    "overview": "x" * 300,
+                },
+            })
+
+        for i in range(max(1, items // 5)):
+            data.series.append({
+                "Id": uuid.UUID(int=rnd.getrandbits(128)).hex,
+                "Name": f"Show {i}",
+                "Type": "Series",
+                "ProductionYear": 1980 + i % 45,
+                "ImageTags": {"Primary": uuid.UUID(int=rnd.getrandbits(128)).hex},
+                "ProviderIds": {"Imdb": f"tt{5000000 + i}", "Tvdb": str(i + 1)},
+                "_arr": {
+                    "id": i + 1, "title": f"Show {i}", "year": 1980 + i % 45, "tvdbId": i + 1,
+                    "added": (base + datetime.timedelta(minutes=rnd.randint(0, 3_000_000))).isoformat(),
+                    "seasons": [{"seasonNumber": s, "monitored": True} for s in range(8)],
+                    "overview": "x" * 300,
+                },
+            })
+
+        for i in range(accounts):
+            username = f"user{i}"
+            jf_id = uuid.UUID(int=rnd.getrandbits(128)).hex
+            js_id = i + 1
+            data.jellyfin_users[username] = {"Name": username, "Id": jf_id}
+            data.jellyseerr_users[js_id] = {"id": js_id, "jellyfinUserId": jf_id}
+            data.accounts.append((10_000_000 + i, username, jf_id, str(js_id)))
+
+        names = list(data.jellyfin_users)
+        for i in range(min(sessions, len(names))):
+            movie = data.movies[rnd.randrange(len(data.movies))] if data.movies else {}
+            data.sessions.append({
+                "UserName": names[i],
+                "DeviceName": f"Device {i}",
+                "NowPlayingItem": {"Name": movie.get("Name"), "Type": "Movie", "RunTimeTicks": movie.get("RunTimeTicks", 1)},
+                "PlayState": {"PositionTicks": rnd.randint(0, movie.get("RunTimeTicks", 1))},
+            })
+
+        now = int(time.time())
+        data.invites = [{"code": f"inv{i}", "remaining-uses": 1, "created": now - i * 60} for i in range(10)]
+
+        states = ["downloading", "uploading", "stalledDL", "stalledUP", "pausedUP", "metaDL"]
+        for i in range(torrents):
+            data.torrents.append({
+                "hash": f"{i:040x}", "name": f"Torrent {i}", "state": rnd.choice(states),
+                "progress": rnd.random(), "num_leechs": rnd.randint(0, 50), "num_seeds": rnd.randint(0, 200),
+                "dlspeed": rnd.randint(0, 10_000_000), "upspeed": rnd.randint(0, 1_000_000),
+                "size": rnd.randint(10**8, 10**10), "eta": rnd.randint(0, 86400),
+            })
+        return data
+
+
+# =====================
+# FAKE UPSTREAMS
+# =====================
+class FakeUpstreams:
+    """aiohttp servers for every upstream the bot talks to, on a private event loop thread."""
+
+    def __init__(self, data: Dataset, latency_ms: float = 0.0):
+        self.data = data
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        self.ports: dict[str, int] = {}
+        self._loop = asyncio.new_event_loop()
+        self._runners = []
+        self._lock = threading.Lock()  # Handlers run on one loop; this guards reads from the bot thread
+
+    # --- lifecycle ---
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._start_sites())
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="fake-upstreams", daemon=True).start()
+        ready.wait()
+        return self
+
+    async def _start_sites(self):
+        for name, app in (("main", self._main_app()), ("qbit", self._qbit_app())):
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            self.ports[name] = site._server.sockets[0].getsockname()[1]
+            self._runners.append(runner)
+
+    def stop(self):
+        async def shutdown():
+            for runner in self._runners:
+                await runner.cleanup()
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def env(self) -> dict:
+        """Environment for app.py pointing every integration at these servers."""
+        base = f"http://127.0.0.1:{self.ports['main']}"
+        return {
+            "JELLYFIN_URL": f"{base}/jellyfin",
+            "JELLYSEERR_URL": f"{base}/jellyseerr",
+            "JELLYSEERR_ENABLED": "true",
+            "JFA_URL": f"{base}/jfa",
+            "ENABLE_JFA": "true",
+            "RADARR_URL": f"{base}/radarr",
+            "ENABLE_RADARR": "true",
+            "SONARR_URL": f"{base}/sonarr",
+            "ENABLE_SONARR": "true",
+            "QBIT_HOST": f"http://127.0.0.1:{self.ports['qbit']}",
+            "ENABLE_QBITTORRENT": "true",
+        }
+
+    # --- helpers ---
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    def _main_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        r = app.router
+        # Jellyfin
+        r.add_get("/jellyfin/Users", self.jf_users)
+        r.add_post("/jellyfin/Users/New", self.jf_create_user)
+        r.add_delete("/jellyfin/Users/{id}", self.jf_delete_user)
+        r.add_post("/jellyfin/Users/{id}/Password", self.ok)
+        r.add_get("/jellyfin/Items", self.jf_items)
+        r.add_get("/jellyfin/Sessions", self.jf_sessions)
+        r.add_post("/jellyfin/Library/Refresh", self.ok)
+        # Prometheus (global tracking stats shown by !stats)
+        r.add_get("/prometheus/api/v1/query", self.prom_query)
+        # Jellyseerr
+        r.add_get("/jellyseerr/api/v1/user", self.js_users)
+        r.add_post("/jellyseerr/api/v1/user/import-from-jellyfin", self.js_import)
+        r.add_delete("/jellyseerr/api/v1/user/{id}", self.js_delete)
+        # JFA-Go
+        r.add_get("/jfa/token/login", self.jfa_login)
+        r.add_get("/jfa/invites", self.jfa_invites)
+        r.add_post("/jfa/invites", self.ok)
+        r.add_delete("/jfa/invites", self.ok)
+        # Radarr / Sonarr
+        r.add_get("/radarr/api/v3/movie", self.arr_list(self.data.movies))
+        r.add_get("/radarr/api/v3/movie/{id}", self.arr_item(self.data.movies))
+        r.add_get("/radarr/api/v3/history/since", self.arr_history)
+        r.add_get("/sonarr/api/v3/series", self.arr_list(self.data.series))
+        r.add_get("/sonarr/api/v3/series/{id}", self.arr_item(self.data.series))
+        r.add_get("/sonarr/api/v3/history/since", self.arr_history)
+        return app
+
+    def _qbit_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        r = app.router
+        r.add_post("/api/v2/auth/login", self.qb_login)
+        r.add_get("/api/v2/app/version", self.qb_text("v4.6.0"))
+        r.add_post("/api/v2/app/version", self.qb_text("v4.6.0"))
+        r.add_get("/api/v2/app/webapiVersion", self.qb_text("2.9.3"))
+        r.add_post("/api/v2/app/webapiVersion", self.qb_text("2.9.3"))
+        r.add_get("/api/v2/torrents/info", self.qb_torrents)
+        r.add_post("/api/v2/torrents/info", self.qb_torrents)
+        r.add_get("/api/v2/sync/maindata", self.qb_maindata)
+        r.add_post("/api/v2/sync/maindata", self.qb_maindata)
+        return app
+
+    async def ok(self, request):
+        return web.Response(status=204)
+
+    # --- Jellyfin ---
+
+    async def jf_users(self, request):
+        return web.json_response(list(self.data.jellyfin_users.values()))
+
+    async def jf_create_user(self, request):
+        body = await request.json()
+        name = body["Name"]
+        with self._lock:
+            if name.lower() in self.data.jellyfin_users:
+                return web.Response(status=400, text=f"A user with the name '{name}' already exists.")
+            user = {"Name": name, "Id": uuid.uuid4().hex}
+            self.data.jellyfin_users[name.lower()] = user
+        return web.json_response(user)
+
+    async def jf_delete_user(self, request):
+        user_id = request.match_info["id"]
+        with self._lock:
+            for key, user in list(self.data.jellyfin_users.items()):
+                if user["Id"] == user_id:
+                    del self.data.jellyfin_users[key]
+                    return web.Response(status=204)
+        return web.Response(status=404)
+
+    async def jf_items(self, request):
+        q = request.query
+        items = self.data.movies if q.get("IncludeItemTypes") == "Movie" else self.data.series
+        if q.get("SortBy") == "Random":
+            page = random.sample(items, min(int(q.get("Limit", 5)), len(items)))
+        else:
+            start = int(q.get("StartIndex", 0))
+            limit = int(q.get("Limit", len(items)))
+            page = items[start:start + limit]
+        return web.json_response({
+            "Items": [{k: v for k, v in i.items() if k != "_arr"} for i in page],
+            "TotalRecordCount": len(items),
+        })
+
+    async def jf_sessions(self, request):
+        return web.json_response(self.data.sessions)
+
+    async def prom_query(self, request):
+        return web.json_response({"status": "success", "data": {"result": [{"value": [time.time(), "1"]}]}})
+
+    # --- Jellyseerr ---
+
+    async def js_users(self, request):
+        take = int(request.query.get("take", 10))
+        skip = int(request.query.get("skip", 0))
+        users = list(self.data.jellyseerr_users.values())
+        return web.json_response({
+            "pageInfo": {"pages": -(-len(users) // take), "pageSize": take, "results": len(users), "page": skip // take + 1},
+            "results": users[skip:skip + take],
+        })
+
+    async def js_import(self, request):
+        body = await request.json()
+        known = {u["jellyfinUserId"] for u in self.data.jellyseerr_users.values()}
+        created = []
+        with self._lock:
+            for jf_id in body.get("jellyfinUserIds", []):
+                if jf_id in known:
+                    continue
+                js_id = max(self.data.jellyseerr_users, default=0) + 1
+                user = {"id": js_id, "jellyfinUserId": jf_id}
+                self.data.jellyseerr_users[js_id] = user
+                created.append(user)
+        return web.json_response(created, status=201)
+
+    async def js_delete(self, request):
+        js_id = int(request.match_info["id"])
+        with self._lock:
+            found = self.data.jellyseerr_users.pop(js_id, None)
+        return web.Response(status=204 if found else 404)
+
+    # --- JFA-Go ---
+
+    async def jfa_login(self, request):
+        return web.json_response({"token": "bench-token"})
+
+    async def jfa_invites(self, request):
+        return web.json_response({"invites": self.data.invites})
+
+    # --- Radarr / Sonarr ---
+
+    def arr_list(self, items):
+        async def handler(request):
+            return web.json_response([i["_arr"] for i in items])
+        return handler
+
+    def arr_item(self, items):
+        async def handler(request):
+            idx = int(request.match_info["id"]) - 1
+            if 0 <= idx < len(items):
+                return web.json_response(items[idx]["_arr"])
+            return web.Response(status=404)
+        return handler
+
+    async def arr_history(self, request):
+        return web.json_response([])
+
+    # --- qBittorrent ---
+
+    async def qb_login(self, request):
+        resp = web.Response(text="Ok.")
+        resp.set_cookie("SID", "bench")
+        return resp
+
+    def qb_text(self, text):
+        async def handler(request):
+            return web.Response(text=text)
+        return handler
+
+    async def qb_torrents(self, request):
+        return web.json_response(self.data.torrents)
+
+    async def qb_maindata(self, request):
+        params = request.query if request.method == "GET" else await request.post()
+        if int(params.get("rid", 0)) == 1:
+            # The synthetic torrents never change: every later poll is an empty delta
+            return web.json_response({"rid": 1, "torrents": {}, "server_state": {}})
+        return web.json_response({
+            "rid": 1, "full_update": True,
+            "torrents": {t["hash"]: t for t in self.data.torrents},
+            "server_state": {"dl_info_speed": 0, "up_info_speed": 0},
+        })
+
+
+# =====================
+# DATABASE STAND-IN
+# =====================
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    discord_id INTEGER PRIMARY KEY,
+    jellyfin_username TEXT NOT NULL UNIQUE,
+    jellyfin_id TEXT NOT NULL,
+    jellyseerr_id TEXT
+);
+CREATE TABLE IF NOT EXISTS trial_accounts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    discord_id INTEGER NOT NULL UNIQUE,
+    jellyfin_username TEXT,
+    jellyfin_id TEXT,
+    trial_created_at DATETIME NOT NULL,
+    expired BOOLEAN DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_trial_expiry ON trial_accounts (expired, trial_created_at);
+CREATE TABLE IF NOT EXISTS cleanup_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_at DATETIME NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bot_metadata (
+    key_name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS provisioning_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    discord_id INTEGER NOT NULL,
+    jellyfin_username TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    jellyfin_id TEXT,
+    jellyseerr_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at DATETIME NOT NULL,
+    claimed_by TEXT,
+    claimed_at DATETIME,
+    last_error TEXT,
+    active_discord_id INTEGER UNIQUE,
+    active_username TEXT UNIQUE,
+    submitted_by TEXT,
+    create_attempted INTEGER NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL,
+    finished_at DATETIME
+);
+CREATE INDEX IF NOT EXISTS idx_provisioning_claim ON provisioning_jobs (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_provisioning_claimed_by ON provisioning_jobs (claimed_by);
+CREATE TABLE IF NOT EXISTS command_claims (
+    message_id INTEGER PRIMARY KEY,
+    instance_id TEXT NOT NULL,
+    claimed_at DATETIME NOT NULL
+);
+"""
+
+_SQL_REWRITES = [
+    # MySQL's single-statement claim; SQLite serializes writes, so the subquery form is just as atomic
+    (re.compile(r"UPDATE\s+(\w+)\s+(SET\s.*?)\s+WHERE\s+(.*?)\s+ORDER BY\s+(\w+)\s+LIMIT 1", re.I | re.S),
+     r"UPDATE \1 \2 WHERE id = (SELECT id FROM \1 WHERE \3 ORDER BY \4 LIMIT 1)"),
+    (re.compile(r"NOW\(\)\s*-\s*INTERVAL\s+%s\s+DAY", re.I), "datetime('now', '-' || ? || ' days')"),
+    (re.compile(r"NOW\(\)\s*\+\s*INTERVAL\s+%s\s+SECOND", re.I), "datetime('now', '+' || ? || ' seconds')"),
+    (re.compile(r"NOW\(\)\s*-\s*INTERVAL\s+%s\s+HOUR", re.I), "datetime('now', '-' || ? || ' hours')"),
+    (re.compile(r"INSERT IGNORE", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"NOW\(\)", re.I), "CURRENT_TIMESTAMP"),
+    (re.compile(r"%s"), "?"),
+]
+
+
+def _to_sqlite(query: str) -> str:
+    for pattern, replacement in _SQL_REWRITES:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+sqlite3.register_converter("DATETIME", lambda b: datetime.datetime.fromisoformat(b.decode()))
+
+
+class SQLiteCursor:
+    """Enough of the mysql.connector cursor API for app.db_execute."""
+
+    def __init__(self, conn: sqlite3.Connection, dictionary: bool):
+        self._cur = conn.cursor()
+        self.dictionary = dictionary
+
+    def execute(self, query, params=()):
+        try:
+            self._cur.execute(_to_sqlite(query), tuple(params))
+        except sqlite3.IntegrityError as e:
+            raise mysql.connector.errors.IntegrityError(msg=str(e)) from e
+
+    def executemany(self, query, seq):
+        self._cur.executemany(_to_sqlite(query), [tuple(p) for p in seq])
+
+    def _row(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return {d[0]: v for d, v in zip(self._cur.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cur.fetchone())
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cur.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self):
+        self._cur.close()
+
+
+class SQLiteConnection:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Named locks only exist on MySQL; a single benchmark process never sees another instance
+        self._conn.create_function("IS_USED_LOCK", 1, lambda name: None)
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self._conn, dictionary)
+
+    def ping(self, reconnect=True, attempts=1, delay=0):
+        pass
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self._conn.close()
+
+
+def use_sqlite(app, path: str | None = None) -> str:
+    """Point app.db_pool at a fresh SQLite file and create the schema init_db would."""
+    path = path or os.path.join(tempfile.mkdtemp(prefix="jellycord-bench-"), "bench.db")
+    setup = sqlite3.connect(path)
+    setup.executescript(SQLITE_SCHEMA)
+    setup.close()
+    app.db_pool._connect = lambda: SQLiteConnection(path)
+    app._db_initialized = True
+    return path
+
+
+def seed_accounts(app, accounts):
+    app.db_execute(
+        "REPLACE INTO accounts (discord_id, jellyfin_username, jellyfin_id, jellyseerr_id) VALUES (%s, %s, %s, %s)",
+        accounts,
+        many=True
+    )
+
+
+# =====================
+# APP LOADING
+# =====================
+BENCH_ENV = {
+    "DISCORD_TOKEN": "bench",
+    "GUILD_IDS": "1",
+    "REQUIRED_ROLE_IDS": "2",
+    "ADMIN_ROLE_IDS": "3",
+    "SYNC_LOG_CHANNEL_ID": "4",
+    "JELLYFIN_API_KEY": "bench",
+    "JELLYSEERR_API_KEY": "bench",
+    "JFA_USERNAME": "bench",
+    "JFA_PASSWORD": "bench",
+    "JFA_API_KEY": "bench",
+    "RADARR_API_KEY": "bench",
+    "SONARR_API_KEY": "bench",
+    "QBIT_USERNAME": "bench",
+    "QBIT_PASSWORD": "bench",
+    "ENABLE_TRIAL_ACCOUNTS": "true",
+    "TRACKING_ENABLED": "false",
+    "DB_HOST": "127.0.0.1",
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_NAME": "jellycord_bench",
+}
+
+
+def load_app(upstreams: FakeUpstreams, use_mysql: bool = False, extra_env: dict | None = None):
+    """Import app.py configured against the fake upstreams."""
+    env = dict(BENCH_ENV)
+    if use_mysql:
+        # Keep the caller's DB_* so a real throwaway database can be used
+        env = {k: v for k, v in env.items() if not k.startswith("DB_")}
+    env.update(upstreams.env())
+    env.update(extra_env or {})
+    os.environ.update(env)
+
+    sys.path.insert(0, ROOT)
+    import app
+    app.PROMETHEUS_URL = f"http://127.0.0.1:{upstreams.ports['main']}/prometheus/api/v1/query"
+    if use_mysql:
+        app.init_db()
+    else:
+        use_sqlite(app)
+    return app
+
+
+def grant_roles(app, eligible_ids=(), admin_ids=()):
+    """Fill the role index directly instead of from a guild member cache."""
+    for user_id in eligible_ids:
+        app.role_index._eligible.setdefault(user_id, set()).add(1)
+    for user_id in admin_ids:
+        app.role_index._admin.setdefault(user_id, set()).add(1)
+    app.role_index.ready = True
+
+
+# =====================
+# FAKE DISCORD CONTEXT
+# =====================
+class FakeMessage:
+    def __init__(self, content=None, embed=None):
+        self.content = content
+        self.embed = embed
+
+    async def delete(self):
+        pass
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        self.content = content if content is not None else self.content
+        self.embed = embed if embed is not None else self.embed
+        return self
+
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str = None):
+        self.id = user_id
+        self.name = name or f"user{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.avatar = None
+        self.bot = False
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, content=None, embed=None, **kwargs):
+        return FakeMessage(content, embed)
+
+
+class FakeDMChannel(discord.DMChannel):
+    """Passes the isinstance(ctx.channel, discord.DMChannel) checks in DM-only commands."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, embed=None, **kwargs):
+        msg = FakeMessage(content, embed)
+        self.sent.append(msg)
+        return msg
+
+
+class FakeTextChannel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, embed=None, **kwargs):
+        msg = FakeMessage(content, embed)
+        self.sent.append(msg)
+        return msg
+
+
+class FakeGuild:
+    id = 1
+
+    def get_member(self, user_id):
+        # Role checks go through app.role_index, so any Snowflake-like object will do
+        return FakeUser(user_id)
+
+
+class FakeContext:
+    def __init__(self, author: FakeUser, dm: bool = False):
+        self.author = author
+        self.channel = FakeDMChannel() if dm else FakeTextChannel()
+        self.guild = None if dm else FakeGuild()
+        self.message = FakeMessage()
+        self.command = None
+        self.command_failed = False
+
+    @property
+    def sent(self):
+        return self.channel.sent
+
+    async def send(self, content=None, embed=None, **kwargs):
+        return await self.channel.send(content, embed=embed, **kwargs)
+
+    async def final_reply(self, timeout: float = 120):
+        """Wait past the "⏳" acknowledgement for the provisioning worker's answer."""
+        deadline = time.monotonic() + timeout
+        while not self.sent or self.sent[-1].content.startswith("⏳"):
+            if time.monotonic() > deadline:
+                raise TimeoutError("No final reply")
+            await asyncio.sleep(0.005)
+        return self.sent[-1]
+
+    def check_replies(self):
+        """Raise if the command answered with an error, so the run counts as failed."""
+        for msg in self.sent:
+            if msg.content and msg.content.lstrip().startswith(("❌", f"{self.author.mention} ❌")):
+                raise RuntimeError(msg.content)
+
+
+# =====================
+# TIMING
+# =====================
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+@dataclass
+class Timing:
+    name: str
+    samples: list = field(default_factory=list)
+    wall: float = 0.0
+    errors: int = 0
+
+    def summary(self) -> dict:
+        s = self.samples
+        return {
+            "name": self.name,
+            "runs": len(s),
+            "errors": self.errors,
+            "p50_ms": percentile(s, 50) * 1000,
+            "p95_ms": percentile(s, 95) * 1000,
+            "p99_ms": percentile(s, 99) * 1000,
+            "max_ms": max(s, default=0) * 1000,
+            "mean_ms": (statistics.fmean(s) if s else 0) * 1000,
+            "ops_per_s": len(s) / self.wall if self.wall else 0.0,
+        }
+
+
+async def measure(name: str, make_call, runs: int, concurrency: int = 1) -> Timing:
+    """Await `make_call(i)` `runs` times with up to `concurrency` in flight."""
+    timing = Timing(name)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await make_call(i)
+            except Exception as e:
+                timing.errors += 1
+                print(f"[bench] {name} run {i} failed: {e!r}", file=sys.stderr)
+            timing.samples.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(runs)))
+    timing.wall = time.perf_counter() - started
+    return timing
+
+
+def print_table(rows: list[dict]):
+    headers = ["name", "runs", "errors", "p50_ms", "p95_ms", "p99_ms", "max_ms", "ops_per_s"]
+    widths = {h: max(len(h), *(len(_fmt(r[h])) for r in rows)) for h in headers}
+    print("  ".join(h.ljust(widths[h]) for h in headers))
+    for r in rows:
+        print("  ".join(_fmt(r[h]).ljust(widths[h]) for h in headers))
+
+
+def _fmt(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
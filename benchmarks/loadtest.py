@@ -0,0 +1,186 @@
+"""
+Launch-day load test: N users DM createaccount / trialaccount at (nearly) the same time.
+
+Runs against the same local stand-ins as run.py and reports latency percentiles (until the
+final DM, plus the immediate acknowledgement), outcome counts, event loop lag, and any races:
+- the same username confirmed to two different Discord users
+- Jellyfin users the bot created but never recorded (orphans)
+- Discord users who ended up owning more than one Jellyfin account
+
+    python benchmarks/loadtest.py --users 500
+    python benchmarks/loadtest.py --users 1000 --ramp-seconds 10 --latency-ms 30 --trial-ratio 0.3
+    python benchmarks/loadtest.py --users 300 --duplicate-rate 0.1 --double-submit-rate 0.05
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+from harness import (
+    Dataset, FakeUpstreams, FakeContext, FakeUser, Timing,
+    load_app, grant_roles, seed_accounts, percentile
+)
+
+FIRST_USER_ID = 50_000_000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent account creation load test")
+    parser.add_argument("--users", type=int, default=300, help="Simulated users sending a DM")
+    parser.add_argument("--ramp-seconds", type=float, default=0.0, help="Spread the burst over this many seconds")
+    parser.add_argument("--trial-ratio", type=float, default=0.0, help="Fraction using trialaccount instead of createaccount")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="Fraction of users picking an already-chosen username")
+    parser.add_argument("--double-submit-rate", type=float, default=0.02, help="Fraction of users sending the command twice")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Added latency per fake upstream request")
+    parser.add_argument("--existing-accounts", type=int, default=5_000, help="Accounts already linked before the burst")
+    parser.add_argument("--workers", type=int, default=4, help="PROVISION_WORKERS for the run")
+    parser.add_argument("--mysql", action="store_true", help="Use the MySQL server from DB_* instead of SQLite")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's own console output")
+    return parser.parse_args()
+
+
+def classify(ctx) -> str:
+    """Map the bot's last reply to an outcome bucket."""
+    if not ctx.sent:
+        return "no reply"
+    text = ctx.sent[-1].content or ""
+    if text.startswith("✅"):
+        return "created"
+    if text.startswith("⚠️"):
+        return "created (warning)"
+    if "already exist" in text:
+        return "rejected: username taken"
+    if "already being created" in text:
+        return "rejected: already in progress"
+    if "already have" in text or "already used" in text:
+        return "rejected: already has account"
+    return "error: " + text[:60]
+
+
+def plan(args) -> list[tuple]:
+    """(delay, command, discord_id, username) for every simulated DM."""
+    rnd = random.Random(args.seed)
+    jobs, names = [], []
+    for i in range(args.users):
+        discord_id = FIRST_USER_ID + i
+        if names and rnd.random() < args.duplicate_rate:
+            username = rnd.choice(names)
+        else:
+            username = f"launch_{i}"
+            names.append(username)
+        command = "trialaccount" if rnd.random() < args.trial_ratio else "createaccount"
+        delay = rnd.uniform(0, args.ramp_seconds)
+        jobs.append((delay, command, discord_id, username))
+        if rnd.random() < args.double_submit_rate:
+            # Impatient user: same command again a moment later with a new name
+            jobs.append((delay + rnd.uniform(0, 0.05), command, discord_id, f"{username}_again"))
+    return jobs
+
+
+async def lag_probe(samples: list, interval: float = 0.01):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def run(args):
+    data = Dataset.build(items=1_000, accounts=args.existing_accounts, sessions=0, torrents=0)
+    upstreams = FakeUpstreams(data, latency_ms=args.latency_ms).start()
+    app = load_app(upstreams, use_mysql=args.mysql, extra_env={"PROVISION_WORKERS": str(args.workers)})
+
+    seed_accounts(app, data.accounts)
+    jobs = plan(args)
+    grant_roles(app, eligible_ids=[a[0] for a in data.accounts] + [discord_id for _, _, discord_id, _ in jobs])
+    await app.jellyfin_directory.refresh()
+    await app.jellyseerr_index.refresh()
+    app.provisioning.start()
+    jellyfin_before = {u["Id"] for u in data.jellyfin_users.values()}
+
+    timings = {"createaccount": Timing("createaccount"), "trialaccount": Timing("trialaccount")}
+    acks = Timing("ack")
+    outcomes = Counter()
+    confirmed = defaultdict(set)  # username -> discord ids told it was created
+
+    async def one(delay, command, discord_id, username):
+        await asyncio.sleep(delay)
+        ctx = FakeContext(FakeUser(discord_id), dm=True)
+        start = time.perf_counter()
+        try:
+            await getattr(app, command).callback(ctx, username, "password123")
+            acks.samples.append(time.perf_counter() - start)
+            if ctx.sent and ctx.sent[-1].content.startswith("⏳"):
+                await ctx.final_reply()
+            outcome = classify(ctx)
+        except Exception as e:
+            outcome = f"exception: {type(e).__name__}"
+        timings[command].samples.append(time.perf_counter() - start)
+        outcomes[(command, outcome)] += 1
+        if outcome.startswith("created"):
+            confirmed[username.lower()].add(discord_id)
+
+    lag_samples = []
+    probe = asyncio.create_task(lag_probe(lag_samples))
+    print(f"[load] {len(jobs)} DMs from {args.users} users over {args.ramp_seconds}s "
+          f"({args.latency_ms} ms upstream latency, {args.workers} provisioning workers)")
+
+    bot_output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    with bot_output:
+        await asyncio.gather(*(one(*job) for job in jobs))
+        await app.provisioning.drain()
+    wall = time.perf_counter() - started
+    probe.cancel()
+
+    # --- invariants ---
+    accounts = await app.async_get_accounts()
+    trials = app.db_execute("SELECT discord_id, jellyfin_id FROM trial_accounts", fetch="all")
+    recorded_ids = {row[2] for row in accounts} | {row[1] for row in trials}
+    created_ids = {u["Id"] for u in data.jellyfin_users.values()} - jellyfin_before
+    orphans = created_ids - recorded_ids
+
+    owners = Counter(row[0] for row in accounts) + Counter(row[0] for row in trials)
+    multi_owned = [d for d, n in owners.items() if n > 1]
+    username_races = {name: ids for name, ids in confirmed.items() if len(ids) > 1}
+
+    # --- report ---
+    print(f"\n[load] Finished in {wall:.2f}s ({len(jobs) / wall:.1f} commands/s)")
+    for name, timing in (*timings.items(), ("ack", acks)):
+        s = timing.samples
+        if not s:
+            continue
+        print(f"  {name:<14} n={len(s):<5} p50={percentile(s, 50) * 1000:8.1f} ms  "
+              f"p95={percentile(s, 95) * 1000:8.1f} ms  p99={percentile(s, 99) * 1000:8.1f} ms  "
+              f"max={max(s) * 1000:8.1f} ms")
+
+    print("\n[load] Outcomes:")
+    for (command, outcome), count in sorted(outcomes.items()):
+        print(f"  {command:<14} {outcome:<34} {count}")
+    errors = sum(n for (_, o), n in outcomes.items() if o.startswith(("error", "exception", "no reply")))
+    print(f"  error rate: {errors / len(jobs):.1%}")
+
+    print(f"\n[load] Event loop lag: p50={percentile(lag_samples, 50) * 1000:.1f} ms  "
+          f"p99={percentile(lag_samples, 99) * 1000:.1f} ms  max={max(lag_samples, default=0) * 1000:.1f} ms")
+    print(f"[load] Upstream requests: {upstreams.requests}   DB pool: {app.db_pool.stats()}")
+
+    print("\n[load] Races:")
+    print(f"  usernames confirmed to more than one user: {len(username_races)}")
+    for name, ids in list(username_races.items())[:10]:
+        print(f"    {name}: {sorted(ids)}")
+    print(f"  orphaned Jellyfin users (created, never recorded): {len(orphans)}")
+    print(f"  Discord users holding more than one account: {len(multi_owned)}")
+
+    await app.close_http_clients()
+    upstreams.stop()
+    app.DB_EXECUTOR.shutdown(wait=False)
+    return 1 if (username_races or orphans or multi_owned or errors) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(parse_args())))
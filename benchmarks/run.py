@@ -0,0 +1,196 @@
+"""
+Offline benchmark suite for Jellycord.
+
+Starts local stand-ins for Jellyfin, Jellyseerr, JFA-Go, Radarr, Sonarr and qBittorrent,
+loads app.py against them with a SQLite stand-in for MySQL (or a real throwaway MySQL
+with --mysql), then drives command handlers and cleanup_task over a synthetic library.
+
+    python benchmarks/run.py                               # 10k items, 5k accounts
+    python benchmarks/run.py --items 100000 --latency-ms 20
+    python benchmarks/run.py --json results.json
+    python benchmarks/run.py --compare results.json        # exit 1 on a >25% p50 regression
+
+--mysql uses DB_HOST/DB_USER/DB_PASSWORD/DB_NAME from the environment. Point it at a
+database you don't mind losing: accounts are inserted and deleted.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+
+from harness import (
+    Dataset, FakeUpstreams, FakeContext, FakeUser,
+    load_app, grant_roles, seed_accounts, measure, print_table
+)
+
+ADMIN_ID = 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Jellycord offline benchmarks")
+    parser.add_argument("--items", type=int, default=10_000, help="Movies in the synthetic library (series = items / 5)")
+    parser.add_argument("--accounts", type=int, default=5_000, help="Linked accounts / Jellyfin users")
+    parser.add_argument("--runs", type=int, default=50, help="Invocations per command scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="Invocations in flight per scenario")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per fake upstream request")
+    parser.add_argument("--ineligible", type=float, default=0.1, help="Fraction of accounts cleanup should remove")
+    parser.add_argument("--workers", type=int, default=4, help="PROVISION_WORKERS for account creation")
+    parser.add_argument("--mysql", action="store_true", help="Use the MySQL server from DB_* instead of SQLite")
+    parser.add_argument("--only", nargs="*", help="Run only these scenarios")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's own console output")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline JSON from a previous --json run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p50 slowdown vs. baseline")
+    return parser.parse_args()
+
+
+def scenarios(app, data, args):
+    """name -> (make_call(i), runs). Each call invokes a command callback the way discord.py would."""
+    admin = FakeUser(ADMIN_ID, "admin")
+
+    def command(cmd, *cmd_args, user=admin, dm=False):
+        async def call(i):
+            ctx = FakeContext(user, dm=dm)
+            await cmd.callback(ctx, *cmd_args)
+            ctx.check_replies()
+        return call
+
+    async def createaccount(i):
+        user = FakeUser(20_000_000 + i)
+        grant_roles(app, eligible_ids=[user.id])
+        ctx = FakeContext(user, dm=True)
+        await app.createaccount.callback(ctx, f"bench_new_{i}", "password123")
+        await ctx.final_reply()
+        ctx.check_replies()
+
+    async def trialaccount(i):
+        ctx = FakeContext(FakeUser(30_000_000 + i), dm=True)
+        await app.trialaccount.callback(ctx, f"bench_trial_{i}", "password123")
+        await ctx.final_reply()
+        ctx.check_replies()
+
+    return {
+        "movies2watch": (command(app.movies2watch), args.runs),
+        "shows2watch": (command(app.shows2watch), args.runs),
+        "moviestats": (command(app.moviestats), args.runs),
+        "showstats": (command(app.showstats), args.runs),
+        "validusers": (command(app.validusers), args.runs),
+        "activestreams": (command(app.activestreams), args.runs),
+        "listinvites": (command(app.listinvites), args.runs),
+        "qbview": (command(app.qbview), args.runs),
+        "stats": (command(app.stats), min(args.runs, 10)),
+        "createaccount": (createaccount, args.runs),
+        "trialaccount": (trialaccount, args.runs),
+    }
+
+
+async def bench_cleanup(app, data, args):
+    """One full cleanup_task run; `--ineligible` of the accounts have lost their role."""
+    removed_before = len(data.jellyfin_users)
+    start = time.perf_counter()
+    await app.cleanup_task()
+    elapsed = time.perf_counter() - start
+    removed = removed_before - len(data.jellyfin_users)
+    return {
+        "name": "cleanup_task", "runs": 1, "errors": 0,
+        "p50_ms": elapsed * 1000, "p95_ms": elapsed * 1000, "p99_ms": elapsed * 1000,
+        "max_ms": elapsed * 1000, "mean_ms": elapsed * 1000,
+        "ops_per_s": removed / elapsed if elapsed else 0.0,  # accounts removed per second
+        "removed": removed,
+    }
+
+
+async def warm_up(app):
+    """Fill the caches the background loops would have populated by the time users arrive."""
+    await app.jellyfin_directory.refresh()
+    await app.jellyseerr_index.refresh()
+    await app.movie_catalog.refresh()
+    await app.series_catalog.refresh()
+    await app.radarr_mirror.full_sync()
+    await app.sonarr_mirror.full_sync()
+    await app.system_stats.sample()
+    await app.torrent_monitor.poll()
+    app.provisioning.start()
+
+
+async def main(args):
+    print(f"[bench] Building dataset: {args.items} movies, {args.items // 5} series, {args.accounts} accounts")
+    data = Dataset.build(args.items, args.accounts)
+    upstreams = FakeUpstreams(data, latency_ms=args.latency_ms).start()
+    app = load_app(upstreams, use_mysql=args.mysql, extra_env={"PROVISION_WORKERS": str(args.workers)})
+
+    # Seed the database and the role index: most account owners still hold the role
+    seed_accounts(app, data.accounts)
+    keep = int(len(data.accounts) * (1 - args.ineligible))
+    grant_roles(app, eligible_ids=[a[0] for a in data.accounts[:keep]] + [ADMIN_ID], admin_ids=[ADMIN_ID])
+
+    timings = {}
+    start = time.perf_counter()
+    await warm_up(app)
+    timings["warm_up"] = time.perf_counter() - start
+
+    results = []
+    # The bot prints per-user lines (imports, removals); keep them out of the report
+    bot_output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with bot_output:
+        for name, (make_call, runs) in scenarios(app, data, args).items():
+            if args.only and name not in args.only:
+                continue
+            timing = await measure(name, make_call, runs, args.concurrency)
+            results.append(timing.summary())
+
+        if not args.only or "cleanup_task" in args.only:
+            results.append(await bench_cleanup(app, data, args))
+
+    print()
+    print(f"[bench] Warm-up (directory, indexes, catalogs, mirrors, torrents): {timings['warm_up'] * 1000:.0f} ms")
+    print(f"[bench] Upstream requests served: {upstreams.requests}")
+    print(f"[bench] DB pool: {app.db_pool.stats()}")
+    print()
+    print_table(results)
+
+    await app.close_http_clients()
+    upstreams.stop()
+    app.DB_EXECUTOR.shutdown(wait=False)
+
+    report = {
+        "items": args.items, "accounts": args.accounts, "latency_ms": args.latency_ms,
+        "concurrency": args.concurrency, "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[bench] Results written to {args.json}")
+
+    if args.compare:
+        return compare(report, args.compare, args.threshold)
+    return 0
+
+
+def compare(report, baseline_path, threshold) -> int:
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\n[bench] Compared with {baseline_path}:")
+    for r in report["results"]:
+        base = baseline.get(r["name"])
+        if not base or not base["p50_ms"]:
+            continue
+        change = r["p50_ms"] / base["p50_ms"] - 1
+        flag = "  <-- REGRESSION" if change > threshold else ""
+        print(f"  {r['name']:<16} p50 {base['p50_ms']:.2f} -> {r['p50_ms']:.2f} ms ({change:+.0%}){flag}")
+        if flag:
+            regressions.append(r["name"])
+
+    if regressions:
+        print(f"[bench] {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))